@@ -0,0 +1,281 @@
+# async_rpc.py
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from endpoint_health import get_health_registry
+from rpc_client import (
+    RPC_CONFIG, RpcClientError, RpcConnectionError, RpcError, RpcHttpError, RpcTimeoutError,
+    accept_encoding, build_payload, call_rpc, call_rpc_batch, get_cache, get_cassette, notify_batch, notify_call,
+    parse_batch_response, parse_retry_after, parse_rpc_response
+)
+from rpc_decode import loads
+
+from lazy_import import lazy_module, module_available
+
+AIOHTTP_AVAILABLE = module_available("aiohttp")
+aiohttp = lazy_module("aiohttp")
+
+ASYNC_CONFIG = {
+    # Hedge delay used until an endpoint has latency samples
+    "default_hedge_delay": 0.5,
+    # Worker threads for the requests fallback when aiohttp is not installed
+    "thread_workers": 16
+}
+
+_executor = None
+
+
+def hedge_delay(endpoint, method=None):
+    """p95 response time of an endpoint from the health registry, or the default"""
+
+    delay = get_health_registry().latency_percentile(endpoint, method, 95)
+    if delay is None and method is not None:
+        delay = get_health_registry().latency_percentile(endpoint, None, 95)
+    return delay if delay is not None else ASYNC_CONFIG["default_hedge_delay"]
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=ASYNC_CONFIG["thread_workers"], thread_name_prefix="rpc"
+        )
+    return _executor
+
+
+class AsyncRpcClient:
+    """Asyncio RPC client that can race or hedge one request across several endpoints
+
+    Uses aiohttp when installed. Otherwise, and while a cassette is
+    installed, requests are run on worker threads over the shared keep-alive
+    sessions from rpc_client; losing requests are then abandoned rather than
+    aborted. Both transports decode through rpc_decode and read and fill the
+    response cache the same way as the blocking calls.
+    """
+
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+        self._session = None
+
+    async def __aenter__(self):
+        if AIOHTTP_AVAILABLE:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=RPC_CONFIG["pool_maxsize"]),
+                headers={
+                    "Content-Type": "application/json",
+                    "Accept-Encoding": accept_encoding(),
+                    "User-Agent": RPC_CONFIG["user_agent"]
+                },
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _run_in_thread(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), functools.partial(func, *args))
+
+    def _threaded(self):
+        # Cassettes record and replay inside rpc_client.post_rpc only
+        return self._session is None or get_cassette() is not None
+
+    async def _post(self, endpoint, payload):
+        """(body decoded by rpc_decode, response_time)"""
+
+        start_time = time.time()
+        try:
+            async with self._session.post(endpoint, json=payload) as response:
+                if response.status != 200:
+                    raise RpcHttpError(
+                        response.status, endpoint, time.time() - start_time,
+                        retry_after=parse_retry_after(response.headers.get("Retry-After"))
+                    )
+                content = await response.read()
+            body = loads(content)
+        except asyncio.TimeoutError:
+            response_time = time.time() - start_time
+            raise RpcTimeoutError(f"Timeout after {response_time:.2f} seconds", endpoint, response_time)
+        except aiohttp.ClientConnectionError:
+            raise RpcConnectionError("Connection Error", endpoint, time.time() - start_time)
+        return body, time.time() - start_time
+
+    async def call(self, endpoint, method, params=None):
+        """Call a JSON-RPC method and return (result, response_time)"""
+
+        if self._threaded():
+            return await self._run_in_thread(call_rpc, endpoint, method, params, self.timeout)
+
+        start_time = time.time()
+        cache = get_cache()
+        if cache is not None:
+            cached = cache.get(method, params)
+            if cached is not None:
+                return cached, time.time() - start_time
+
+        try:
+            body, response_time = await self._post(endpoint, build_payload(method, params))
+            result = parse_rpc_response(body, endpoint, response_time)
+        except RpcClientError as e:
+            notify_call(endpoint, method, e.response_time, e)
+            raise
+
+        notify_call(endpoint, method, response_time)
+        if cache is not None:
+            cache.put(method, params, result)
+        return result, response_time
+
+    async def call_batch(self, endpoint, calls, strict=False):
+        """Send a JSON-RPC batch and return (results, response_time)
+
+        With strict=True any per-item error fails the whole call, which makes
+        a partially failed batch lose a race instead of winning it.
+        """
+
+        if self._threaded():
+            results, response_time = await self._run_in_thread(call_rpc_batch, endpoint, calls, self.timeout)
+        else:
+            results, response_time = await self._post_batch(endpoint, calls)
+
+        if strict:
+            for result in results:
+                if isinstance(result, RpcError):
+                    raise result
+
+        return results, response_time
+
+    async def _post_batch(self, endpoint, calls):
+        """aiohttp counterpart of rpc_client.call_rpc_batch: cached calls are left out of the request"""
+
+        start_time = time.time()
+        cache = get_cache()
+        results = [None] * len(calls)
+        pending = list(range(len(calls)))
+        if cache is not None:
+            pending = []
+            for index, (method, params) in enumerate(calls):
+                results[index] = cache.get(method, params)
+                if results[index] is None:
+                    pending.append(index)
+            if not pending:
+                return results, time.time() - start_time
+
+        sent_calls = [calls[index] for index in pending]
+        payloads = [build_payload(method, params) for method, params in sent_calls]
+        try:
+            body, response_time = await self._post(endpoint, payloads)
+            sent_results = parse_batch_response(payloads, body, endpoint, response_time)
+        except RpcClientError as e:
+            notify_batch(endpoint, sent_calls, e.response_time, error=e)
+            raise
+        notify_batch(endpoint, sent_calls, response_time, sent_results)
+
+        for index, result in zip(pending, sent_results):
+            results[index] = result
+            if cache is not None and not isinstance(result, RpcError):
+                cache.put(calls[index][0], calls[index][1], result)
+        return results, response_time
+
+    async def race_calls(self, endpoints, make_call, hedge=False, method=None):
+        """Run make_call(endpoint) on several endpoints and return the first success
+
+        Returns (result, response_time, endpoint). Without hedge every endpoint
+        is started at once. With hedge the next endpoint is only started once
+        the current one exceeds its p95 latency (for method) or fails.
+        Endpoints are tried in health-registry rank order.
+        """
+
+        queue = get_health_registry().rank(list(endpoints), method)
+        if not queue:
+            raise RpcClientError("No endpoints to race")
+
+        pending = {}
+        errors = []
+        start_time = time.time()
+
+        def launch():
+            endpoint = queue.pop(0)
+            pending[asyncio.ensure_future(make_call(endpoint))] = endpoint
+            return endpoint
+
+        last_launched = launch()
+        while queue and not hedge:
+            launch()
+
+        try:
+            while pending:
+                wait_timeout = hedge_delay(last_launched, method) if hedge and queue else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    # Slower than usual, hedge to the next endpoint
+                    last_launched = launch()
+                    continue
+
+                for task in done:
+                    endpoint = pending.pop(task)
+                    try:
+                        result, _ = task.result()
+                    except Exception as e:
+                        errors.append(f"{endpoint}: {e}")
+                        continue
+                    return result, time.time() - start_time, endpoint
+
+                # Every finished request failed, move on without waiting
+                if hedge and queue:
+                    last_launched = launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise RpcClientError(f"All endpoints failed: {'; '.join(errors)}")
+
+    async def race(self, endpoints, method, params=None, hedge=False):
+        """Race one RPC call across endpoints"""
+        return await self.race_calls(
+            endpoints, lambda endpoint: self.call(endpoint, method, params), hedge, method
+        )
+
+    async def race_batch(self, endpoints, calls, hedge=False, method=None):
+        """Race one batch across endpoints; only fully successful batches win
+
+        method keys the hedge delay; it defaults to the batch's most frequent
+        method (the first one on a tie).
+        """
+        return await self.race_calls(
+            endpoints, lambda endpoint: self.call_batch(endpoint, calls, strict=True), hedge,
+            method or batch_method(calls)
+        )
+
+
+def batch_method(calls):
+    """Most frequent method of a batch, the first one on a tie, or None for an empty batch"""
+    methods = [method for method, _ in calls]
+    return max(methods, key=methods.count) if methods else None
+
+
+def race_rpc(endpoints, method, params=None, timeout=60, hedge=False):
+    """Blocking helper: race one RPC call, returns (result, response_time, endpoint)"""
+
+    async def run():
+        async with AsyncRpcClient(timeout) as client:
+            return await client.race(endpoints, method, params, hedge)
+
+    return asyncio.run(run())
+
+
+def race_rpc_batch(endpoints, calls, timeout=60, hedge=False, method=None):
+    """Blocking helper: race one batch, returns (results, response_time, endpoint)"""
+
+    async def run():
+        async with AsyncRpcClient(timeout) as client:
+            return await client.race_batch(endpoints, calls, hedge, method)
+
+    return asyncio.run(run())
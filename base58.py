@@ -0,0 +1,35 @@
+# base58.py
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+B58_INDEX = {char: index for index, char in enumerate(B58_ALPHABET)}
+
+
+def b58encode(data):
+    """Encode raw bytes as a base58 string (Solana public key format)"""
+
+    number = int.from_bytes(data, 'big')
+    encoded = []
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded.append(B58_ALPHABET[remainder])
+
+    # Leading zero bytes are encoded as '1'
+    padding = len(data) - len(data.lstrip(b'\0'))
+    return '1' * padding + ''.join(reversed(encoded))
+
+
+def b58decode(text, length=None):
+    """Decode a base58 string into raw bytes"""
+
+    number = 0
+    for char in text:
+        if char not in B58_INDEX:
+            raise ValueError(f"Invalid base58 character: {char!r}")
+        number = number * 58 + B58_INDEX[char]
+
+    padding = len(text) - len(text.lstrip('1'))
+    body = number.to_bytes((number.bit_length() + 7) // 8, 'big') if number else b''
+    data = b'\0' * padding + body
+
+    if length is not None and len(data) != length:
+        raise ValueError(f"Expected {length} bytes, got {len(data)}")
+    return data
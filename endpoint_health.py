@@ -0,0 +1,277 @@
+# endpoint_health.py
+import atexit
+import json
+import os
+import threading
+import time
+
+from retry_policy import ERROR_RATE_LIMITED, ERROR_RETRYABLE, classify_error
+from rpc_client import RpcClientError, add_call_observer, call_rpc
+
+HEALTH_CONFIG = {
+    "state_file": os.path.join("output", "endpoint_health.json"),
+    "latency_window": 100,
+    # Latency assumed for endpoints/methods without samples, so new ones get tried
+    "unknown_latency": 1.0,
+    # Consecutive failures before the circuit opens
+    "failure_threshold": 3,
+    "open_seconds": 60,
+    "rate_limit_open_seconds": 30,
+    "persist": True
+}
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def is_rate_limit_error(error):
+    """True if an RPC client error means the endpoint rate-limited the call"""
+    return classify_error(error) == ERROR_RATE_LIMITED
+
+
+def is_endpoint_failure(error):
+    """True if an error reflects endpoint health rather than a bad request"""
+    return classify_error(error) in (ERROR_RETRYABLE, ERROR_RATE_LIMITED)
+
+
+class EndpointHealthRegistry:
+    """Rolling latency, error and circuit-breaker state per RPC endpoint"""
+
+    def __init__(self, state_file=None):
+        self.state_file = state_file
+        self.endpoints = {}
+        # Only a run that observed calls has anything new to save
+        self.changed = False
+        self._lock = threading.Lock()
+
+    def _endpoint(self, endpoint):
+        state = self.endpoints.get(endpoint)
+        if state is None:
+            state = self.endpoints[endpoint] = {
+                "methods": {},
+                "consecutive_failures": 0,
+                "circuit": CIRCUIT_CLOSED,
+                "open_until": 0
+            }
+        return state
+
+    def _method(self, endpoint, method):
+        methods = self._endpoint(endpoint)["methods"]
+        stats = methods.get(method)
+        if stats is None:
+            stats = methods[method] = {
+                "latencies": [],
+                "successes": 0,
+                "errors": 0,
+                "rate_limited": 0
+            }
+        return stats
+
+    def _count(self, stats, key):
+        stats[key] += 1
+        # Halve old counts so error rates follow recent behaviour
+        if stats["successes"] + stats["errors"] + stats["rate_limited"] > 2 * HEALTH_CONFIG["latency_window"]:
+            for counter in ("successes", "errors", "rate_limited"):
+                stats[counter] //= 2
+
+    def record_success(self, endpoint, method, response_time):
+        """Record a successful call and close the circuit"""
+
+        with self._lock:
+            stats = self._method(endpoint, method)
+            self._count(stats, "successes")
+            stats["latencies"].append(round(response_time, 4))
+            del stats["latencies"][:-HEALTH_CONFIG["latency_window"]]
+
+            state = self._endpoint(endpoint)
+            state["consecutive_failures"] = 0
+            state["circuit"] = CIRCUIT_CLOSED
+
+    def record_failure(self, endpoint, method, error):
+        """Record a failed call; endpoint-side failures may open the circuit"""
+
+        with self._lock:
+            stats = self._method(endpoint, method)
+            state = self._endpoint(endpoint)
+            now = time.time()
+
+            if is_rate_limit_error(error):
+                self._count(stats, "rate_limited")
+                cooldown = getattr(error, "retry_after", None) or HEALTH_CONFIG["rate_limit_open_seconds"]
+                state["circuit"] = CIRCUIT_OPEN
+                state["open_until"] = max(state["open_until"], now + cooldown)
+                return
+
+            self._count(stats, "errors")
+            if not is_endpoint_failure(error):
+                return
+
+            state["consecutive_failures"] += 1
+            if state["circuit"] == CIRCUIT_HALF_OPEN or \
+                    state["consecutive_failures"] >= HEALTH_CONFIG["failure_threshold"]:
+                state["circuit"] = CIRCUIT_OPEN
+                state["open_until"] = now + HEALTH_CONFIG["open_seconds"]
+
+    def observe(self, endpoint, method, response_time, error=None):
+        """rpc_client call observer"""
+        self.changed = True
+        if error is None:
+            self.record_success(endpoint, method, response_time)
+        else:
+            self.record_failure(endpoint, method, error)
+
+    def circuit_state(self, endpoint):
+        """Current circuit state; an expired open circuit becomes half-open"""
+
+        with self._lock:
+            state = self._endpoint(endpoint)
+            if state["circuit"] == CIRCUIT_OPEN and time.time() >= state["open_until"]:
+                state["circuit"] = CIRCUIT_HALF_OPEN
+            return state["circuit"]
+
+    def is_available(self, endpoint):
+        """True unless the endpoint's circuit is open"""
+        return self.circuit_state(endpoint) != CIRCUIT_OPEN
+
+    def latency_percentile(self, endpoint, method=None, q=50):
+        """Latency percentile for one method, or across all methods when method is None"""
+
+        with self._lock:
+            methods = self._endpoint(endpoint)["methods"]
+            if method is not None:
+                samples = methods.get(method, {}).get("latencies", [])
+            else:
+                samples = [sample for stats in methods.values() for sample in stats["latencies"]]
+            return percentile(samples, q)
+
+    def error_rate(self, endpoint, method=None):
+        """Share of failed or rate-limited calls"""
+
+        with self._lock:
+            methods = self._endpoint(endpoint)["methods"]
+            selected = [methods[method]] if method in methods else list(methods.values())
+            total = failed = 0
+            for stats in selected:
+                failed += stats["errors"] + stats["rate_limited"]
+                total += stats["successes"] + stats["errors"] + stats["rate_limited"]
+            return failed / total if total else 0.0
+
+    def score(self, endpoint, method=None):
+        """Expected cost of sending method to endpoint (lower is better)"""
+
+        latency = self.latency_percentile(endpoint, method, 50)
+        if latency is None:
+            latency = self.latency_percentile(endpoint, None, 50)
+        if latency is None:
+            latency = HEALTH_CONFIG["unknown_latency"]
+
+        # Each failure costs roughly a retry, so inflate latency by the error rate
+        score = latency / max(0.05, 1 - self.error_rate(endpoint, method))
+        if self.circuit_state(endpoint) == CIRCUIT_HALF_OPEN:
+            score *= 2
+        return score
+
+    def rank(self, endpoints, method=None):
+        """Order endpoints fastest-healthy first; open circuits go last as a last resort"""
+
+        available = [endpoint for endpoint in endpoints if self.is_available(endpoint)]
+        unavailable = [endpoint for endpoint in endpoints if endpoint not in available]
+        available.sort(key=lambda endpoint: self.score(endpoint, method))
+        return available + unavailable
+
+    def summary(self, endpoint):
+        """Compact per-endpoint health summary for reports"""
+        return {
+            "circuit": self.circuit_state(endpoint),
+            "p50": self.latency_percentile(endpoint, None, 50),
+            "p95": self.latency_percentile(endpoint, None, 95),
+            "error_rate": self.error_rate(endpoint),
+            "rate_limited": sum(
+                stats["rate_limited"] for stats in self._endpoint(endpoint)["methods"].values()
+            )
+        }
+
+    def load(self):
+        """Load persisted state; a missing or corrupt file starts fresh"""
+
+        if not self.state_file or not os.path.exists(self.state_file):
+            return self
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as state_file:
+                self.endpoints = json.load(state_file)
+        except (OSError, ValueError):
+            self.endpoints = {}
+        return self
+
+    def save(self):
+        """Persist state so the next run starts with what this one learned"""
+
+        if not self.state_file or not self.changed:
+            return
+        with self._lock:
+            data = json.dumps(self.endpoints, separators=(',', ':'))
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f"{self.state_file}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as state_file:
+            state_file.write(data)
+        os.replace(temp_file, self.state_file)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_health_registry():
+    """Process-wide registry, loaded from disk and tracking every RPC call"""
+
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                state_file = HEALTH_CONFIG["state_file"] if HEALTH_CONFIG["persist"] else None
+                registry = EndpointHealthRegistry(state_file).load()
+                add_call_observer(registry.observe)
+                if state_file:
+                    atexit.register(registry.save)
+                _registry = registry
+    return _registry
+
+
+def route_endpoints(endpoints, method=None):
+    """Rank endpoint dicts ({"url": ...}) or URLs for a method by current health"""
+
+    registry = get_health_registry()
+    urls = [endpoint["url"] if isinstance(endpoint, dict) else endpoint for endpoint in endpoints]
+    ranked = registry.rank(urls, method)
+    return sorted(endpoints, key=lambda endpoint: ranked.index(
+        endpoint["url"] if isinstance(endpoint, dict) else endpoint
+    ))
+
+
+def call_rpc_routed(endpoints, method, params=None, timeout=60):
+    """Send method to the fastest healthy endpoint, falling over in rank order
+
+    Returns (result, response_time, endpoint).
+    """
+
+    errors = []
+    for endpoint in route_endpoints(endpoints, method):
+        url = endpoint["url"] if isinstance(endpoint, dict) else endpoint
+        try:
+            result, response_time = call_rpc(url, method, params, timeout=timeout)
+            return result, response_time, endpoint
+        except RpcClientError as e:
+            errors.append(f"{url}: {e}")
+
+    raise RpcClientError(f"All endpoints failed: {'; '.join(errors)}")
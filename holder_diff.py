@@ -0,0 +1,150 @@
+# holder_diff.py
+import json
+
+from holder_stats import holder_statistics
+
+DIFF_CONFIG = {
+    "top_n": 20,
+    # Concentration metrics compared between the two sides
+    "metrics": (
+        "total_holders_analyzed", "top_5_percentage", "top_10_percentage", "top_20_percentage",
+        "gini_coefficient", "theil_index", "hhi", "nakamoto_coefficient"
+    )
+}
+
+EVENT_SNAPSHOT = "snapshot"
+EVENT_NEW_HOLDER = "new_holder"
+EVENT_EXIT = "exit"
+EVENT_BALANCE_CHANGE = "balance_change"
+EVENT_RANK_CHANGE = "rank_change"
+# Top-N polling only sees the largest accounts, so moving across that cutoff says nothing about the balance
+EVENT_ENTERED_TOP = "entered_top"
+EVENT_LEFT_TOP = "left_top"
+EVENT_ERROR = "error"
+EVENT_DISTRIBUTION = "distribution"
+
+
+def classify_change(address, old_amount, new_amount):
+    """Event dict for one account's amount change, or None if unchanged"""
+
+    if old_amount == new_amount:
+        return None
+    if not new_amount:
+        event_type = EVENT_EXIT
+    elif not old_amount:
+        event_type = EVENT_NEW_HOLDER
+    else:
+        event_type = EVENT_BALANCE_CHANGE
+    return {"type": event_type, "address": address, "old_amount": old_amount, "new_amount": new_amount}
+
+
+def join_amounts(old, new, old_index=None):
+    """Hash join two HolderTables on address, yielding only rows that differ
+
+    Yields (address, new row or None, old amount, new amount). Addresses
+    missing from new count as 0. One pass over each table, so the cost is
+    linear in the number of accounts.
+    """
+
+    old_index = old.build_index() if old_index is None else old_index
+    old_amounts, new_amounts = old.amounts, new.amounts
+    seen = set()
+
+    for row, address in enumerate(new.addresses):
+        seen.add(address)
+        known = old_index.get(address)
+        old_amount = old_amounts[known] if known is not None else 0
+        if old_amount != new_amounts[row]:
+            yield address, row, old_amount, new_amounts[row]
+
+    for address, row in old_index.items():
+        if old_amounts[row] and address not in seen:
+            yield address, None, old_amounts[row], 0
+
+
+def diff_amounts(old, new, min_delta=0):
+    """Account-level events between two tables, largest absolute change first"""
+
+    events = []
+    for address, _, old_amount, new_amount in join_amounts(old, new):
+        if abs(new_amount - old_amount) < min_delta:
+            continue
+        events.append(classify_change(address, old_amount, new_amount))
+    events.sort(key=lambda event: abs(event["new_amount"] - event["old_amount"]), reverse=True)
+    return events
+
+
+def top_ranks(table, top_n):
+    """{address: rank} for the top_n funded rows of a table"""
+    return {
+        table.addresses[index]: rank
+        for rank, index in enumerate(table.top_indices(top_n), 1)
+        if table.amounts[index]
+    }
+
+
+def compare_ranks(old_ranks, new_ranks):
+    """Rank movement events between two {address: rank} maps (None = outside the top N)"""
+
+    events = []
+    for address in set(old_ranks) | set(new_ranks):
+        old_rank, new_rank = old_ranks.get(address), new_ranks.get(address)
+        if old_rank != new_rank:
+            events.append({"type": EVENT_RANK_CHANGE, "address": address, "old_rank": old_rank, "new_rank": new_rank})
+    events.sort(key=lambda event: event["new_rank"] or event["old_rank"])
+    return events
+
+
+def compare_metrics(old_stats, new_stats, metrics=None):
+    """{metric: {"old", "new", "delta"}} for the concentration metrics of both sides"""
+
+    changes = {}
+    for metric in metrics or DIFF_CONFIG["metrics"]:
+        old_value, new_value = old_stats.get(metric), new_stats.get(metric)
+        delta = new_value - old_value if old_value is not None and new_value is not None else None
+        changes[metric] = {"old": old_value, "new": new_value, "delta": delta}
+    return changes
+
+
+def diff_tables(old, new, total_supply_raw=0, decimals=0, top_n=None, min_delta=0,
+                old_slot=None, new_slot=None):
+    """Compare two holder tables (live or loaded from the snapshot store)
+
+    Returns a JSON-serializable report with account events (new holders,
+    exits, balance deltas), top-N rank movements and concentration metric
+    changes. Amounts stay raw integers; min_delta suppresses smaller moves.
+    """
+
+    top_n = top_n or DIFF_CONFIG["top_n"]
+    events = diff_amounts(old, new, min_delta)
+
+    counts = {EVENT_NEW_HOLDER: 0, EVENT_EXIT: 0, EVENT_BALANCE_CHANGE: 0}
+    for event in events:
+        counts[event["type"]] += 1
+
+    return {
+        "old_slot": old_slot,
+        "new_slot": new_slot,
+        "decimals": decimals,
+        "summary": {
+            "new_holders": counts[EVENT_NEW_HOLDER],
+            "exits": counts[EVENT_EXIT],
+            "balance_changes": counts[EVENT_BALANCE_CHANGE],
+            "net_amount_change": new.total_amount() - old.total_amount()
+        },
+        "changes": events,
+        "rank_changes": compare_ranks(top_ranks(old, top_n), top_ranks(new, top_n)),
+        "concentration": compare_metrics(
+            holder_statistics(old, total_supply_raw, decimals), holder_statistics(new, total_supply_raw, decimals)
+        )
+    }
+
+
+def diff_to_ndjson(report):
+    """Serialize a diff report as NDJSON: one summary line, then one line per event"""
+
+    header = {key: report[key] for key in ("old_slot", "new_slot", "decimals", "summary", "concentration")}
+    lines = [json.dumps(dict(header, type="summary"), separators=(',', ':'))]
+    for event in report["changes"] + report["rank_changes"]:
+        lines.append(json.dumps(event, separators=(',', ':')))
+    return "\n".join(lines)
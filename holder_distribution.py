@@ -0,0 +1,152 @@
+# holder_distribution.py
+import bisect
+import math
+
+from holder_stats import (
+    descending_cumsum, gini_coefficient, herfindahl_index, median_amount, nakamoto_coefficient, sort_amounts,
+    theil_index
+)
+from holder_table import is_ndarray, np
+
+DISTRIBUTION_CONFIG = {
+    # Histogram bins per power of ten of the balance (4 -> edges at 1, 1.78, 3.16, 5.62, 10, ...)
+    "bins_per_decade": 4,
+    # Evenly spaced holder shares the Lorenz curve is sampled at, 0 and 1 included (0 = every holder)
+    "lorenz_points": 101
+}
+
+
+def _search(ordered, values, side='left'):
+    """Insertion points of several values in ascending raw amounts"""
+    if is_ndarray(ordered):
+        return np.searchsorted(ordered, np.array(values, dtype=np.uint64), side=side).tolist()
+    search = bisect.bisect_left if side == 'left' else bisect.bisect_right
+    return [search(ordered, value) for value in values]
+
+
+def strip_zero_amounts(ordered, cumulative):
+    """(ordered, cumulative) without the zero amounts of emptied accounts
+
+    Zeros sort first and add nothing to the running totals, so both are a
+    slice: the top end of ordered and the leading totals of cumulative.
+    """
+    zeros = _search(ordered, [0], side='right')[0]
+    if not zeros:
+        return ordered, cumulative
+    return ordered[zeros:], cumulative[:len(ordered) - zeros]
+
+
+def ascending_sums(cumulative, positions):
+    """Exact sums of ordered[:i] for each i in positions, from the descending running totals"""
+
+    count = len(cumulative)
+    if not count:
+        return [0] * len(positions)
+    total = int(cumulative[-1])
+    if is_ndarray(cumulative):
+        tops = np.concatenate((np.zeros(1, np.uint64), cumulative))
+        return (np.uint64(total) - tops[count - np.asarray(positions, dtype=np.int64)]).tolist()
+    return [total - (int(cumulative[count - i - 1]) if i < count else 0) for i in positions]
+
+
+def _edge(exponent, bins_per_decade):
+    """Smallest raw amount at or above 10 ** (exponent / bins_per_decade)"""
+    if exponent % bins_per_decade == 0:
+        return 10 ** (exponent // bins_per_decade)
+    return math.ceil(10 ** (exponent / bins_per_decade))
+
+
+def log_histogram(ordered, cumulative, bins_per_decade=None):
+    """Log-scale histogram of nonzero ascending-sorted raw amounts
+
+    Returns (edges, counts, amounts): len(counts) + 1 raw-amount bin edges
+    with bin i covering edges[i] <= amount < edges[i + 1], the holders in
+    each bin and their exact total. The data is already sorted, so every
+    bin is a contiguous run found by one binary search per edge, and bin
+    totals are differences of the running totals.
+    """
+
+    bins_per_decade = bins_per_decade or DISTRIBUTION_CONFIG["bins_per_decade"]
+    count = len(ordered)
+    if not count:
+        return [], [], []
+    low, high = int(ordered[0]), int(ordered[-1])
+
+    first = math.floor(math.log10(low) * bins_per_decade)
+    while _edge(first, bins_per_decade) > low:
+        first -= 1
+    last = math.floor(math.log10(high) * bins_per_decade) + 1
+    while _edge(last, bins_per_decade) <= high:
+        last += 1
+    edges = [_edge(exponent, bins_per_decade) for exponent in range(first, last + 1)]
+
+    # edges[0] <= low and edges[-1] > high, so only the inner edges need a search
+    positions = [0] + _search(ordered, edges[1:-1]) + [count]
+    sums = ascending_sums(cumulative, positions)
+    counts = [stop - start for start, stop in zip(positions, positions[1:])]
+    amounts = [stop - start for start, stop in zip(sums, sums[1:])]
+    return edges, counts, amounts
+
+
+def lorenz_curve(cumulative, points=None):
+    """Lorenz curve of nonzero holders as (holder shares, amount shares)
+
+    Holders are taken smallest first; the curve is sampled at points evenly
+    spaced holder shares from 0 to 1, or at every holder when points is 0.
+    """
+
+    points = DISTRIBUTION_CONFIG["lorenz_points"] if points is None else points
+    count = len(cumulative)
+    if not count:
+        return [], []
+    if not points or points > count + 1:
+        positions = list(range(count + 1))
+    else:
+        positions = [round(count * step / (points - 1)) for step in range(points)]
+    total = int(cumulative[-1])
+    shares = [amount / total for amount in ascending_sums(cumulative, positions)]
+    return [position / count for position in positions], shares
+
+
+def holder_distribution(table, total_supply_raw=0, decimals=0, ordered=None, cumulative=None,
+                        bins_per_decade=None, lorenz_points=None):
+    """Balance histogram, Lorenz curve and inequality indices over a HolderTable
+
+    One sort and one running-total pass feed everything: the histogram
+    and the Lorenz curve are binary searches and lookups into the running
+    totals, Gini, Theil and HHI one vectorized pass each. Pass ordered and
+    cumulative (e.g. from a HolderIndex) to skip the sort. Zero amounts are
+    left out. Arrays are short lists (balances in token units) ready for
+    JSON export or plotting.
+    """
+
+    if ordered is None:
+        ordered = sort_amounts(table.amounts_view())
+    if cumulative is None:
+        cumulative = descending_cumsum(ordered)
+    ordered, cumulative = strip_zero_amounts(ordered, cumulative)
+
+    count = len(ordered)
+    if not count:
+        return {"holders": 0}
+    scale = 10 ** decimals
+    total = int(cumulative[-1])
+    edges, counts, amounts = log_histogram(ordered, cumulative, bins_per_decade)
+    population, share = lorenz_curve(cumulative, lorenz_points)
+
+    return {
+        "holders": count,
+        "total_balance": total / scale,
+        "mean_balance": total / count / scale,
+        "median_balance": median_amount(ordered) / scale,
+        "gini_coefficient": gini_coefficient(ordered),
+        "theil_index": theil_index(ordered, total),
+        "hhi": herfindahl_index(ordered, total),
+        "nakamoto_coefficient": nakamoto_coefficient(cumulative, total_supply_raw or total),
+        "histogram": {
+            "edges": [edge / scale for edge in edges],
+            "counts": counts,
+            "balances": [amount / scale for amount in amounts]
+        },
+        "lorenz": {"holders": population, "share": share}
+    }
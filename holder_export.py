@@ -0,0 +1,190 @@
+# holder_export.py
+import contextlib
+import csv
+import gzip
+import io
+import json
+import sys
+
+from base58 import b58encode
+from holder_table import PUBKEY_LENGTH
+from lazy_import import lazy_module, module_available
+
+ZSTD_AVAILABLE = module_available("zstandard")
+zstandard = lazy_module("zstandard")
+
+EXPORT_CONFIG = {
+    "gzip_level": 6,
+    "zstd_level": 3,
+    # Rows written between flushes of the output stream
+    "flush_rows": 10000
+}
+
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+
+CSV_HEADER = ["address", "owner", "amount", "balance"]
+
+_EMPTY_OWNER = bytes(PUBKEY_LENGTH)
+
+
+def detect_format(path, compression=None):
+    """(format, compression) implied by a file name like holders.ndjson.gz"""
+
+    name = path.lower() if isinstance(path, str) else ""
+    if compression is None:
+        if name.endswith(".gz"):
+            compression = "gzip"
+            name = name[:-3]
+        elif name.endswith(".zst"):
+            compression = "zstd"
+            name = name[:-4]
+    export_format = FORMAT_CSV if name.endswith(".csv") else FORMAT_NDJSON
+    return export_format, compression
+
+
+@contextlib.contextmanager
+def open_output(path, compression=None):
+    """Text stream for writing to a path, "-" (stdout) or an open text stream
+
+    compression is None, "gzip" or "zstd". Streams such as stdout are flushed
+    but never closed, so callers can keep using them.
+    """
+
+    if path == "-":
+        path = sys.stdout
+    to_stream = not isinstance(path, str)
+    if to_stream and compression is None:
+        yield path
+        path.flush()
+        return
+
+    raw = path.buffer if to_stream else open(path, 'wb')
+    try:
+        if compression == "gzip":
+            stream = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=EXPORT_CONFIG["gzip_level"])
+        elif compression == "zstd":
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError("zstandard is not installed")
+            stream = zstandard.ZstdCompressor(level=EXPORT_CONFIG["zstd_level"]).stream_writer(raw, closefd=False)
+        elif compression is None:
+            stream = raw
+        else:
+            raise ValueError(f"Unknown compression: {compression}")
+
+        text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        try:
+            yield text
+        finally:
+            # Ends the compressed frame; raw is closed separately below
+            text.flush()
+            if stream is raw:
+                text.detach()
+            else:
+                text.close()
+    finally:
+        if to_stream:
+            raw.flush()
+        else:
+            raw.close()
+
+
+def format_balance(amount, decimals):
+    """Exact decimal string of a raw amount (no float rounding)"""
+    if not decimals:
+        return str(amount)
+    whole, fraction = divmod(amount, 10 ** decimals)
+    return f"{whole}.{fraction:0{decimals}d}"
+
+
+def iter_table_rows(table, ranked=True):
+    """Yield (address, owner bytes or None, raw amount) rows of a HolderTable
+
+    ranked=True yields the largest balances first; rows are produced one at a
+    time, nothing but the row order is materialized.
+    """
+
+    rows = table.top_indices() if ranked else range(len(table))
+    owners, amounts, addresses = table.owners, table.amounts, table.addresses
+    for row in rows:
+        owner = bytes(owners[row * PUBKEY_LENGTH:(row + 1) * PUBKEY_LENGTH])
+        yield addresses[row], None if owner == _EMPTY_OWNER else owner, amounts[row]
+
+
+def write_ndjson(rows, stream, decimals=0):
+    """Write rows as JSON Lines, returns the row count"""
+
+    flush_rows = EXPORT_CONFIG["flush_rows"]
+    dumps = json.dumps
+    count = 0
+    for address, owner, amount in rows:
+        record = {
+            "address": address,
+            "owner": b58encode(owner) if owner else None,
+            "amount": amount,
+            "balance": format_balance(amount, decimals)
+        }
+        stream.write(dumps(record, separators=(',', ':')))
+        stream.write("\n")
+        count += 1
+        if count % flush_rows == 0:
+            stream.flush()
+    return count
+
+
+def write_csv(rows, stream, decimals=0, header=True):
+    """Write rows as CSV (with a header line unless header is False), returns the row count"""
+
+    writer = csv.writer(stream)
+    if header:
+        writer.writerow(CSV_HEADER)
+    flush_rows = EXPORT_CONFIG["flush_rows"]
+    count = 0
+    for address, owner, amount in rows:
+        writer.writerow([address, b58encode(owner) if owner else "", amount, format_balance(amount, decimals)])
+        count += 1
+        if count % flush_rows == 0:
+            stream.flush()
+    return count
+
+
+class ExportWriter:
+    """Rows handed over in batches as they become available, e.g. one per scan shard"""
+
+    def __init__(self, stream, export_format=FORMAT_NDJSON, decimals=0):
+        self.stream = stream
+        self.export_format = export_format
+        self.decimals = decimals
+        self.rows = 0
+        self._header = export_format == FORMAT_CSV
+
+    def write(self, rows):
+        """Write a batch of (address, owner bytes or None, raw amount) rows, returns its row count"""
+        if self.export_format == FORMAT_CSV:
+            count = write_csv(rows, self.stream, self.decimals, header=self._header)
+            self._header = False
+        else:
+            count = write_ndjson(rows, self.stream, self.decimals)
+        self.rows += count
+        self.stream.flush()
+        return count
+
+
+@contextlib.contextmanager
+def open_export(path, decimals=0, export_format=None, compression=None):
+    """ExportWriter on a file, "-" or an open text stream, format and compression as in stream_export"""
+
+    detected_format, compression = detect_format(path, compression)
+    with open_output(path, compression) as stream:
+        yield ExportWriter(stream, export_format or detected_format, decimals)
+
+
+def stream_export(rows, path, decimals=0, export_format=None, compression=None):
+    """Stream rows to a file, "-" or an open text stream without building the output in memory
+
+    Format and compression default to what the file name implies
+    (.ndjson/.jsonl/.csv, optionally .gz/.zst). Returns the row count.
+    """
+
+    with open_export(path, decimals, export_format, compression) as writer:
+        return writer.write(rows)
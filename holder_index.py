@@ -0,0 +1,158 @@
+# holder_index.py
+import bisect
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal
+
+from holder_stats import descending_cumsum, sort_amounts
+from holder_table import is_ndarray, np
+
+
+# Raw amounts are u64; query bounds outside that range match all or nothing
+MAX_RAW_AMOUNT = 2 ** 64 - 1
+
+
+def _search(ordered, amount, side):
+    """bisect over ascending raw amounts (NumPy array or list), any integer amount"""
+    if amount < 0:
+        return 0
+    if amount > MAX_RAW_AMOUNT:
+        return len(ordered)
+    if is_ndarray(ordered):
+        return int(np.searchsorted(ordered, np.uint64(amount), side=side))
+    return bisect.bisect_right(ordered, amount) if side == 'right' else bisect.bisect_left(ordered, amount)
+
+
+def to_raw_amount(balance, decimals, rounding=ROUND_FLOOR):
+    """Raw amount of a token balance given as str, int, float or Decimal
+
+    Balances finer than the mint's decimals are rounded down, or up with
+    rounding=ROUND_CEILING (for lower bounds). Raises ValueError for NaN
+    and infinity.
+    """
+    value = Decimal(str(balance))
+    if not value.is_finite():
+        raise ValueError(f"Balance must be a finite number: {balance}")
+    return int(value.scaleb(decimals).to_integral_value(rounding))
+
+
+def _balance_text(balance):
+    return format(Decimal(str(balance)), 'f')
+
+
+class HolderIndex:
+    """Read-only ranking index over a HolderTable for ad-hoc distribution queries
+
+    Built once in O(n log n): the amounts sorted ascending, their running
+    totals from the largest down (so any top-N sum is one lookup), the rows
+    in rank order and an address -> rank dict. After that, range counts and
+    sums, percentile shares and balance thresholds are O(log n), rank
+    lookups and top-N sums O(1). Amounts are raw integers throughout.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.count = len(table)
+        self.ordered = sort_amounts(table.amounts_view())
+        self.cumulative = descending_cumsum(self.ordered)
+        self.total = int(self.cumulative[-1]) if self.count else 0
+        # Rank 1 is the largest holder
+        self.order = table.top_indices()
+        self.ranks = {table.addresses[row]: rank for rank, row in enumerate(self.order, 1)}
+
+    def __len__(self):
+        return self.count
+
+    def top_sum(self, n):
+        """Exact sum of the n largest amounts"""
+        n = min(n, self.count)
+        return int(self.cumulative[n - 1]) if n > 0 else 0
+
+    def rank(self, address):
+        """1-based rank of address by amount, or None if it is not in the table"""
+        return self.ranks.get(address)
+
+    def row_at_rank(self, rank):
+        """Table row of the holder at a 1-based rank"""
+        return self.order[rank - 1]
+
+    def amount_of(self, address):
+        rank = self.ranks.get(address)
+        return self.table.amounts[self.order[rank - 1]] if rank is not None else None
+
+    def _ascending_sum(self, start, stop):
+        """Sum of ordered[start:stop] from two prefix sums"""
+        return self.top_sum(self.count - start) - self.top_sum(self.count - stop)
+
+    def count_above(self, amount):
+        """Holders with strictly more than amount"""
+        return self.count - _search(self.ordered, amount, 'right')
+
+    def range_stats(self, low=None, high=None):
+        """(holders, total amount) with low <= amount <= high; None leaves a side open"""
+        start = _search(self.ordered, low, 'left') if low is not None else 0
+        stop = _search(self.ordered, high, 'right') if high is not None else self.count
+        if stop <= start:
+            return 0, 0
+        return stop - start, self._ascending_sum(start, stop)
+
+    def percentile_range(self, low, high):
+        """(holders, total amount) of holders between two percentiles, ranked smallest first
+
+        percentile_range(1, 99) leaves out the smallest and the largest 1%.
+        """
+        start = max(int(self.count * low / 100), 0)
+        stop = min(int(self.count * high / 100), self.count)
+        if stop <= start:
+            return 0, 0
+        return stop - start, self._ascending_sum(start, stop)
+
+    def holders_for_share(self, share):
+        """Fewest holders (largest first) whose amounts exceed share (0-1) of the indexed total"""
+        threshold = min(max(int(self.total * share), 0), MAX_RAW_AMOUNT)
+        if is_ndarray(self.cumulative):
+            index = int(np.searchsorted(self.cumulative, np.uint64(threshold), side='right'))
+        else:
+            index = bisect.bisect_right(self.cumulative, threshold)
+        return index + 1 if index < self.count else None
+
+
+def answer_queries(index, queries, decimals=0, total_supply_raw=0):
+    """Answers to holder queries as a JSON-ready dict
+
+    queries may hold "above" (balances), "between" ((low, high) balances),
+    "percentiles" ((low, high) percentiles), "top" (holder counts) and
+    "ranks" (addresses). Balances are in token units; shares are of
+    total_supply_raw, or of the indexed total when the supply is unknown.
+    """
+
+    scale = 10 ** decimals
+    supply = total_supply_raw or index.total
+
+    def share(amount, **fields):
+        return dict(fields, balance=amount / scale, percentage=amount * 100 / supply if supply else None)
+
+    answers = {}
+    for balance in queries.get("above") or []:
+        # More than 0.5 of a 0-decimals token is more than 0
+        raw = to_raw_amount(balance, decimals)
+        holders = index.count_above(raw)
+        answers.setdefault("above", []).append(share(
+            index.top_sum(holders), min_balance=_balance_text(balance), holders=holders
+        ))
+    for low, high in queries.get("between") or []:
+        # Only whole raw amounts fall in the range: the low bound rounds up, the high bound down
+        holders, amount = index.range_stats(
+            to_raw_amount(low, decimals, ROUND_CEILING), to_raw_amount(high, decimals)
+        )
+        answers.setdefault("between", []).append(share(
+            amount, low=_balance_text(low), high=_balance_text(high), holders=holders
+        ))
+    for low, high in queries.get("percentiles") or []:
+        holders, amount = index.percentile_range(low, high)
+        answers.setdefault("percentiles", []).append(share(amount, low=low, high=high, holders=holders))
+    for n in queries.get("top") or []:
+        answers.setdefault("top", []).append(share(index.top_sum(n), n=n, holders=min(n, len(index))))
+    for address in queries.get("ranks") or []:
+        answers.setdefault("ranks", []).append(share(
+            index.amount_of(address) or 0, address=address, rank=index.rank(address), of=len(index)
+        ))
+    return answers
@@ -0,0 +1,337 @@
+# holder_service.py
+import asyncio
+import hashlib
+import json
+import time
+from collections import deque
+from email.utils import formatdate
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from holder_diff import diff_tables
+from holder_distribution import holder_distribution
+from holder_export import format_balance
+from holder_index import HolderIndex
+from holder_stats import holder_statistics
+
+SERVICE_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8080,
+    # Seconds between background snapshot refreshes
+    "refresh_interval": 60,
+    # Snapshots kept in memory as /diff baselines (the current one included)
+    "history": 5,
+    "default_top": 20,
+    "max_top": 1000,
+    "keepalive_timeout": 30,
+    # Seconds clients are told to wait while the first snapshot is loading
+    "retry_after": 5
+}
+
+STATUS_TEXT = {
+    200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 503: "Service Unavailable"
+}
+
+
+def encode_json(payload):
+    return json.dumps(payload, separators=(',', ':'), default=str).encode()
+
+
+class CachedResponse:
+    """Encoded response body with its strong ETag, built once per snapshot"""
+
+    __slots__ = ("status", "body", "etag")
+
+    def __init__(self, status, payload):
+        self.status = status
+        self.body = encode_json(payload)
+        self.etag = f'"{hashlib.blake2b(self.body, digest_size=12).hexdigest()}"'
+
+
+class ServiceSnapshot:
+    """One refreshed holder snapshot and the responses derived from it
+
+    Built on the refresh thread: the full ranking, /stats, /distribution
+    and (via add_diffs) every /diff response are encoded here, so no
+    request runs a whole-table pass on the event loop. /holders bodies are
+    memoized per top (at most max_top of them); /holder/{address} is one
+    dict lookup and built per request.
+    """
+
+    def __init__(self, metadata, table, max_top):
+        self.metadata = metadata
+        self.table = table
+        self.slot = metadata.get('slot')
+        self.decimals = metadata['decimals']
+        self.refreshed_at = time.time()
+        self.statistics = holder_statistics(table, metadata['total_supply_raw'], self.decimals)
+
+        # Full ranking once, so /holder/{address} is a dict lookup
+        self.index = HolderIndex(table)
+        self.order = self.index.order
+        self.ranks = self.index.ranks
+        self.top = [self.holder_entry(row, rank) for rank, row in enumerate(self.order[:max_top], 1)]
+        self.responses = {
+            "stats": CachedResponse(200, self.envelope(
+                metadata=metadata, statistics=self.statistics, total_holders=len(table)
+            )),
+            "distribution": CachedResponse(200, self.envelope(distribution=holder_distribution(
+                table, metadata['total_supply_raw'], self.decimals,
+                ordered=self.index.ordered, cumulative=self.index.cumulative
+            )))
+        }
+
+    def holder_entry(self, row, rank):
+        table = self.table
+        amount = table.amounts[row]
+        supply = self.metadata['total_supply_raw']
+        return {
+            "rank": rank,
+            "address": table.addresses[row],
+            "owner": table.owner_at(row),
+            "amount": amount,
+            "balance": format_balance(amount, self.decimals),
+            "percentage": amount * 100 / supply if supply else None
+        }
+
+    def envelope(self, **payload):
+        return dict(slot=self.slot, mint=self.metadata.get('mint_address'), **payload)
+
+    def add_diffs(self, baselines):
+        """Encode the /diff response against each baseline snapshot (this one included)"""
+        supply = self.metadata['total_supply_raw']
+        for base in baselines:
+            if base.slot is not None:
+                self.responses[("diff", base.slot)] = CachedResponse(200, diff_tables(
+                    base.table, self.table, supply, self.decimals, old_slot=base.slot, new_slot=self.slot
+                ))
+
+    def response(self, key, build):
+        """Memoized CachedResponse for key, built by build() on first request"""
+        cached = self.responses.get(key)
+        if cached is None:
+            cached = self.responses[key] = build()
+        return cached
+
+
+class HolderService:
+    """In-memory holder analytics served over a small asyncio HTTP/1.1 server
+
+    fetch_snapshot() must return (metadata, HolderTable) with metadata
+    carrying mint_address, decimals, total_supply_raw and slot. It runs on a
+    worker thread every refresh_interval seconds; requests are answered
+    from the latest snapshot and never reach the RPC. Every response has a
+    strong ETag and If-None-Match revalidation answers 304.
+
+    Routes: /holders?top=N, /holder/{address}, /stats, /distribution,
+    /diff?since=SLOT and /health. on_event receives {"type": "refresh", ...} and {"type": "error",
+    ...} dicts, like HolderWatcher events.
+    """
+
+    def __init__(self, fetch_snapshot, refresh_interval=None, history=None, max_top=None, on_event=None):
+        self.fetch_snapshot = fetch_snapshot
+        self.refresh_interval = refresh_interval or SERVICE_CONFIG["refresh_interval"]
+        self.max_top = max_top or SERVICE_CONFIG["max_top"]
+        self.history = deque(maxlen=history or SERVICE_CONFIG["history"])
+        self.on_event = on_event or (lambda event: None)
+        self.snapshot = None
+        self.last_error = None
+
+    def refresh(self):
+        """Fetch a new snapshot and swap it in (blocking; safe to run on a worker thread)"""
+
+        start_time = time.time()
+        try:
+            metadata, table = self.fetch_snapshot()
+            snapshot = ServiceSnapshot(metadata, table, self.max_top)
+        except Exception as e:
+            self.last_error = str(e)
+            self.on_event({"type": "error", "error": f"Refresh failed: {e}"})
+            return None
+
+        # A lagging endpoint must not move the service back in time
+        current = self.snapshot
+        if current is not None and None not in (current.slot, snapshot.slot) and snapshot.slot < current.slot:
+            self.on_event({"type": "error", "error": f"Ignored snapshot at older slot {snapshot.slot}"})
+            return current
+
+        try:
+            # Before the swap, so every baseline /diff can name already has its response
+            snapshot.add_diffs(list(self.history) + [snapshot])
+        except Exception as e:
+            self.last_error = str(e)
+            self.on_event({"type": "error", "error": f"Refresh failed: {e}"})
+            return None
+
+        self.history.append(snapshot)
+        self.snapshot = snapshot
+        self.last_error = None
+        self.on_event({
+            "type": "refresh", "slot": snapshot.slot, "holders": len(table),
+            "duration": time.time() - start_time
+        })
+        return snapshot
+
+    async def refresh_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await loop.run_in_executor(None, self.refresh)
+            await asyncio.sleep(max(0.0, self.refresh_interval - (loop.time() - started)))
+
+    # Routes
+
+    def route(self, path, query):
+        """CachedResponse for a GET of path, or a (status, payload) tuple for errors"""
+
+        snapshot = self.snapshot
+        if path == "/health":
+            return 200, {
+                "status": "ok" if snapshot is not None else "loading",
+                "slot": snapshot.slot if snapshot is not None else None,
+                "age": time.time() - snapshot.refreshed_at if snapshot is not None else None,
+                "last_error": self.last_error
+            }
+        if snapshot is None:
+            return 503, {"error": "No snapshot loaded yet"}
+
+        if path == "/holders":
+            try:
+                top = int(query.get("top", [SERVICE_CONFIG["default_top"]])[0])
+            except ValueError:
+                return 400, {"error": "top must be an integer"}
+            top = min(max(top, 1), self.max_top)
+            return snapshot.response(("holders", top), lambda: CachedResponse(200, snapshot.envelope(
+                holders=snapshot.top[:top], total_holders=len(snapshot.table)
+            )))
+
+        if path.startswith("/holder/"):
+            address = unquote(path[len("/holder/"):])
+            rank = snapshot.ranks.get(address)
+            if rank is None:
+                return 404, snapshot.envelope(error=f"Unknown holder: {address}")
+            # Not memoized: one entry is cheap to encode, and a memo per address would grow without bound
+            return CachedResponse(200, snapshot.envelope(
+                holder=snapshot.holder_entry(snapshot.order[rank - 1], rank)
+            ))
+
+        if path in ("/stats", "/distribution"):
+            return snapshot.responses[path[1:]]
+
+        if path == "/diff":
+            try:
+                since = int(query["since"][0])
+            except (KeyError, ValueError):
+                return 400, {"error": "since must be a slot number"}
+            base = self.baseline(since)
+            cached = snapshot.responses.get(("diff", base.slot)) if base is not None else None
+            if cached is None:
+                return 404, snapshot.envelope(error=f"No snapshot held at or before slot {since}")
+            return cached
+
+        return 404, {"error": f"Unknown path: {path}"}
+
+    def baseline(self, since):
+        """Newest held snapshot taken at or before slot since"""
+        # list() copies in one step while the refresh thread may append
+        for snapshot in reversed(list(self.history)):
+            if snapshot.slot is not None and snapshot.slot <= since:
+                return snapshot
+        return None
+
+    def respond(self, method, target, headers):
+        """(status, body, extra headers) for one request"""
+
+        if method not in ("GET", "HEAD"):
+            return 405, encode_json({"error": "Only GET is supported"}), {"Allow": "GET, HEAD"}
+
+        url = urlsplit(target)
+        result = self.route(url.path.rstrip("/") or "/", parse_qs(url.query))
+        if not isinstance(result, CachedResponse):
+            status, payload = result
+            extra = {"Retry-After": str(SERVICE_CONFIG["retry_after"])} if status == 503 else {}
+            return status, encode_json(payload), extra
+
+        extra = {"ETag": result.etag, "Cache-Control": "no-cache"}
+        if result.etag in (tag.strip() for tag in headers.get("if-none-match", "").split(",")):
+            # Body kept so Content-Length matches the 200 response; it is not sent
+            return 304, result.body, extra
+        return result.status, result.body, extra
+
+    # HTTP/1.1 transport
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(
+                        reader.readline(), SERVICE_CONFIG["keepalive_timeout"]
+                    )
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get("content-length"):
+                    await reader.readexactly(int(headers["content-length"]))
+
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    status, body, extra = 400, encode_json({"error": "Malformed request line"}), {}
+                    keep_alive = False
+                else:
+                    method, target, version = parts
+                    status, body, extra = self.respond(method, target, headers)
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                head = [
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                    f"Date: {formatdate(usegmt=True)}",
+                    "Content-Type: application/json",
+                    f"Content-Length: {len(body)}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}"
+                ]
+                head.extend(f"{name}: {value}" for name, value in extra.items())
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+                if parts and parts[0] != "HEAD" and status != 304:
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=None, port=None, on_listening=None):
+        """Refresh in the background and serve until cancelled"""
+
+        server = await asyncio.start_server(
+            self.handle_connection, host or SERVICE_CONFIG["host"], port or SERVICE_CONFIG["port"]
+        )
+        refresher = asyncio.create_task(self.refresh_loop())
+        if on_listening is not None:
+            on_listening(server.sockets[0].getsockname()[:2])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            refresher.cancel()
+
+
+def run_service(fetch_snapshot, host=None, port=None, refresh_interval=None, on_event=None, on_listening=None):
+    """Run a HolderService until interrupted"""
+
+    service = HolderService(fetch_snapshot, refresh_interval=refresh_interval, on_event=on_event)
+    try:
+        asyncio.run(service.serve(host, port, on_listening))
+    except KeyboardInterrupt:
+        pass
+    return service
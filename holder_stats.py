@@ -0,0 +1,177 @@
+# holder_stats.py
+import bisect
+import heapq
+import itertools
+import math
+
+from holder_table import is_ndarray, np
+
+STATS_CONFIG = {
+    "top_ns": (5, 10, 20),
+    "percentiles": (10, 25, 50, 75, 90, 99)
+}
+
+
+def top_n_sum(amounts, n):
+    """Exact sum of the n largest raw amounts using a partial sort"""
+
+    if n <= 0 or not len(amounts):
+        return 0
+    if is_ndarray(amounts):
+        if n >= len(amounts):
+            return int(amounts.sum(dtype=np.uint64))
+        kth = len(amounts) - n
+        return int(np.partition(amounts, kth)[kth:].sum(dtype=np.uint64))
+    return sum(heapq.nlargest(n, amounts))
+
+
+def sort_amounts(amounts):
+    """Raw amounts sorted ascending (NumPy array or list)"""
+    if is_ndarray(amounts):
+        return np.sort(amounts)
+    return sorted(amounts)
+
+
+def descending_cumsum(ordered):
+    """Exact running totals of an ascending-sorted array taken from the largest down"""
+    if is_ndarray(ordered):
+        return np.cumsum(ordered[::-1], dtype=np.uint64)
+    return list(itertools.accumulate(reversed(ordered)))
+
+
+def median_amount(ordered):
+    """Exact median of ascending-sorted raw amounts (mean of the middle pair for even counts)"""
+
+    count = len(ordered)
+    if not count:
+        return 0
+    middle = count // 2
+    if count % 2:
+        return int(ordered[middle])
+    pair_sum = int(ordered[middle - 1]) + int(ordered[middle])
+    return pair_sum // 2 if pair_sum % 2 == 0 else pair_sum / 2
+
+
+def percentile_amounts(ordered, percentiles=None):
+    """Nearest-rank percentiles of ascending-sorted raw amounts"""
+
+    percentiles = percentiles or STATS_CONFIG["percentiles"]
+    count = len(ordered)
+    if not count:
+        return {}
+    ranks = [max(0, math.ceil(q / 100 * count) - 1) for q in percentiles]
+    if is_ndarray(ordered):
+        values = ordered[ranks].tolist()
+    else:
+        values = [ordered[rank] for rank in ranks]
+    return {q: int(value) for q, value in zip(percentiles, values)}
+
+
+def gini_coefficient(ordered):
+    """Gini coefficient of ascending-sorted amounts (0 = equal, 1 = one holder owns all)"""
+
+    count = len(ordered)
+    if is_ndarray(ordered):
+        values = ordered.astype(np.float64)
+        total = values.sum()
+        if not count or total <= 0:
+            return 0.0
+        weighted = np.dot(np.arange(1, count + 1, dtype=np.float64), values)
+    else:
+        total = sum(ordered)
+        if not count or total <= 0:
+            return 0.0
+        weighted = sum(rank * value for rank, value in enumerate(ordered, 1))
+    return float(2 * weighted / (count * total) - (count + 1) / count)
+
+
+def theil_index(amounts, total):
+    """Theil T index of raw amounts (0 = equal, ln(count) = one holder owns all)
+
+    Zero amounts contribute nothing to the sum but still count as holders.
+    """
+
+    count = len(amounts)
+    if not count or not total:
+        return 0.0
+    mean = total / count
+    if is_ndarray(amounts):
+        shares = amounts[amounts > 0].astype(np.float64) / mean
+        return float(np.dot(shares, np.log(shares)) / count)
+    return sum(amount / mean * math.log(amount / mean) for amount in amounts if amount) / count
+
+
+def herfindahl_index(amounts, total):
+    """Herfindahl-Hirschman index on the 0-10,000 scale"""
+
+    if not total:
+        return 0.0
+    if is_ndarray(amounts):
+        shares = amounts.astype(np.float64) / total
+        return float(np.dot(shares, shares) * 10000)
+    return sum((amount / total) ** 2 for amount in amounts) * 10000
+
+
+def nakamoto_coefficient(cumulative, total):
+    """Smallest number of holders controlling more than half of total, or None"""
+
+    if not total or not len(cumulative):
+        return None
+    half = total // 2
+    if is_ndarray(cumulative):
+        index = int(np.searchsorted(cumulative, np.uint64(half), side='right'))
+    else:
+        index = bisect.bisect_right(cumulative, half)
+    return index + 1 if index < len(cumulative) else None
+
+
+def holder_statistics(table, total_supply_raw=0, decimals=0):
+    """Exact, vectorized holder statistics over a HolderTable
+
+    Raw amounts stay integers; *_balance values are converted to token units
+    only at the end. One sort serves median, percentiles, Gini and the top-N
+    and Nakamoto running totals.
+    """
+
+    amounts = table.amounts_view()
+    count = len(amounts)
+    if not count:
+        return {}
+
+    scale = 10 ** decimals
+    ordered = sort_amounts(amounts)
+    cumulative = descending_cumsum(ordered)
+    total_held = int(cumulative[-1])
+
+    stats = {"total_holders_analyzed": count}
+    for top in STATS_CONFIG["top_ns"]:
+        raw = int(cumulative[min(top, count) - 1])
+        stats[f"top_{top}_amount"] = raw
+        stats[f"top_{top}_balance"] = raw / scale
+
+    median = median_amount(ordered)
+    stats.update({
+        "total_held_amount": total_held,
+        "largest_holder_amount": int(ordered[-1]),
+        "largest_holder_balance": int(ordered[-1]) / scale,
+        "smallest_analyzed_amount": int(ordered[0]),
+        "smallest_analyzed_balance": int(ordered[0]) / scale,
+        "average_balance": total_held / count / scale,
+        "median_amount": median,
+        "median_balance": median / scale,
+        "percentile_balances": {
+            f"p{q}": value / scale for q, value in percentile_amounts(ordered).items()
+        },
+        "gini_coefficient": gini_coefficient(ordered),
+        "theil_index": theil_index(amounts, total_held),
+        "hhi": herfindahl_index(amounts, total_held),
+        "nakamoto_coefficient": nakamoto_coefficient(cumulative, total_supply_raw or total_held)
+    })
+
+    # Calculate percentages
+    if total_supply_raw > 0:
+        for top in STATS_CONFIG["top_ns"]:
+            stats[f"top_{top}_percentage"] = stats[f"top_{top}_amount"] * 100 / total_supply_raw
+        stats["largest_holder_percentage"] = stats["largest_holder_amount"] * 100 / total_supply_raw
+
+    return stats
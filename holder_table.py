@@ -0,0 +1,142 @@
+# holder_table.py
+import heapq
+from array import array
+
+from base58 import b58encode
+from lazy_import import is_loaded, lazy_module, module_available
+
+# Imported on first use, so small tables never pay for loading NumPy
+NUMPY_AVAILABLE = module_available("numpy")
+np = lazy_module("numpy")
+
+PUBKEY_LENGTH = 32
+
+# Below this many rows the array('Q') paths are faster than importing NumPy
+NUMPY_MIN_ROWS = 4096
+
+
+def use_numpy(count):
+    """True if vectorizing over count values is worth the NumPy import"""
+    return NUMPY_AVAILABLE and (count >= NUMPY_MIN_ROWS or is_loaded("numpy"))
+
+
+def is_ndarray(values):
+    """True for NumPy arrays, checked without importing NumPy"""
+    return is_loaded("numpy") and isinstance(values, np.ndarray)
+
+
+class HolderTable:
+    """Compact array-backed table of token accounts (address, owner, raw amount)
+
+    Raw u64 amounts live in an array('Q'); with NumPy installed the same
+    buffer is exposed zero-copy as a uint64 array for vectorized statistics.
+    """
+
+    def __init__(self):
+        # Parallel columns, one row per token account
+        self.addresses = []
+        self.owners = bytearray()
+        self.amounts = array('Q')
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def append(self, address, owner, amount):
+        """Append one token account row (owner may be None when unknown)"""
+        self.addresses.append(address)
+        self.owners += owner or bytes(PUBKEY_LENGTH)
+        self.amounts.append(amount)
+
+    def extend(self, table):
+        """Append every row of another table, column by column"""
+        self.addresses.extend(table.addresses)
+        self.owners += table.owners
+        self.amounts.extend(table.amounts)
+
+    def select(self, rows):
+        """New table holding the given rows, in that order"""
+        owners = self.owners
+        table = HolderTable()
+        table.addresses = [self.addresses[index] for index in rows]
+        table.owners = bytearray().join(owners[index * PUBKEY_LENGTH:(index + 1) * PUBKEY_LENGTH] for index in rows)
+        table.amounts = array('Q', (self.amounts[index] for index in rows))
+        return table
+
+    @classmethod
+    def from_largest_accounts(cls, largest_accounts):
+        """Build a table from a getTokenLargestAccounts result (owners unknown)"""
+        table = cls()
+        for account in largest_accounts['value']:
+            table.append(account['address'], None, int(account['amount']))
+        return table
+
+    def amounts_view(self):
+        """Raw amounts as a zero-copy NumPy uint64 array, or the array('Q') itself"""
+        if use_numpy(len(self.amounts)):
+            return np.frombuffer(self.amounts, dtype=np.uint64) if len(self.amounts) else np.zeros(0, np.uint64)
+        return self.amounts
+
+    def build_index(self):
+        """Map address -> row for incremental updates"""
+        return {address: index for index, address in enumerate(self.addresses)}
+
+    def compact(self):
+        """Drop rows whose amount fell to zero"""
+
+        keep = [index for index, amount in enumerate(self.amounts) if amount]
+        if len(keep) == len(self.amounts):
+            return
+        kept = self.select(keep)
+        self.addresses, self.owners, self.amounts = kept.addresses, kept.owners, kept.amounts
+
+    def owner_at(self, index):
+        """Return the base58 owner of the row at index, None when unknown (all zero)"""
+        start = index * PUBKEY_LENGTH
+        owner = bytes(self.owners[start:start + PUBKEY_LENGTH])
+        return b58encode(owner) if any(owner) else None
+
+    def total_amount(self):
+        """Exact sum of all raw amounts"""
+        if len(self.amounts) and use_numpy(len(self.amounts)):
+            # The sum of one mint's balances is bounded by its u64 supply
+            return int(self.amounts_view().sum(dtype=np.uint64))
+        return sum(self.amounts)
+
+    def top_indices(self, n=None):
+        """Row indices ordered by amount, largest first; equal amounts keep row order"""
+        amounts = self.amounts
+        if len(amounts) and use_numpy(len(amounts)):
+            view = self.amounts_view()
+            # ~amount sorts uint64 descending without overflow, stable keeps ties in row order
+            if n is None or n >= len(view):
+                return np.argsort(~view, kind='stable').tolist()
+            if n <= 0:
+                return []
+            # Partial sort: select the top n (earliest rows among ties at the cutoff), then order only those
+            kth = len(view) - n
+            threshold = np.partition(view, kth)[kth]
+            above = np.flatnonzero(view > threshold)
+            ties = np.flatnonzero(view == threshold)[:n - len(above)]
+            top = np.concatenate((above, ties))
+            return top[np.argsort(~view[top], kind='stable')].tolist()
+        if n is None or n >= len(amounts):
+            return sorted(range(len(amounts)), key=amounts.__getitem__, reverse=True)
+        return heapq.nlargest(n, range(len(amounts)), key=amounts.__getitem__)
+
+    def to_holders(self, decimals, limit=None):
+        """Build the holder list used by the reports, largest first"""
+        scale = 10 ** decimals
+        holders = []
+        for index in self.top_indices(limit):
+            if not self.amounts[index]:
+                break
+            holder = {
+                'address': self.addresses[index],
+                'amount': self.amounts[index],
+                'balance': self.amounts[index] / scale
+            }
+            owner = self.owner_at(index)
+            if owner is not None:
+                holder['owner'] = owner
+            holders.append(holder)
+        return holders
@@ -0,0 +1,314 @@
+# holder_watch.py
+import asyncio
+import json
+import time
+
+from endpoint_health import route_endpoints
+from holder_diff import (
+    EVENT_DISTRIBUTION, EVENT_ENTERED_TOP, EVENT_ERROR, EVENT_LEFT_TOP, EVENT_SNAPSHOT, classify_change,
+    compare_ranks, join_amounts, top_ranks
+)
+from holder_distribution import holder_distribution
+from holder_table import PUBKEY_LENGTH, HolderTable
+from program_scan import scan_all_holders
+from retry_policy import backoff_delay, call_rpc_with_retry
+from rpc_client import RpcClientError
+from token_accounts import MINT_OFFSET, TOKEN_ACCOUNT_SIZE, TOKEN_PROGRAM_ID, decode_token_account
+
+try:
+    import websockets
+    WEBSOCKETS_AVAILABLE = True
+except ImportError:
+    WEBSOCKETS_AVAILABLE = False
+
+WATCH_CONFIG = {
+    "interval": 60,
+    "top_n": 20,
+    "timeout": 120,
+    # Subscription notifications are applied in batches this often (seconds)
+    "flush_interval": 1.0,
+    # Compact the table once this share of rows has dropped to zero
+    "compact_ratio": 0.25
+}
+
+
+def websocket_url(endpoint):
+    """Derive the PubSub WebSocket URL from an HTTP RPC endpoint"""
+    if endpoint.startswith("https://"):
+        return "wss://" + endpoint[len("https://"):]
+    if endpoint.startswith("http://"):
+        return "ws://" + endpoint[len("http://"):]
+    return endpoint
+
+
+class HolderWatcher:
+    """Keeps a mint's holder table in memory and emits only what changed
+
+    Polls getTokenLargestAccounts (top 20) or a full sharded getProgramAccounts
+    scan (program_scan) every interval, or follows programSubscribe notifications when the
+    websockets package is installed. on_event receives one dict per change.
+    With distribution set, every snapshot and every applied batch of changes
+    is followed by a distribution event (see holder_distribution), balances
+    in token units of decimals.
+    """
+
+    def __init__(self, endpoints, token_mint, full_scan=False, top_n=None, interval=None, on_event=None,
+                 distribution=False, decimals=0):
+        self.endpoints = endpoints
+        self.token_mint = token_mint
+        self.full_scan = full_scan
+        self.top_n = top_n or WATCH_CONFIG["top_n"]
+        self.interval = interval or WATCH_CONFIG["interval"]
+        self.on_event = on_event or (lambda event: print(json.dumps(event)))
+        self.table = HolderTable()
+        self.index = {}
+        self.ranks = {}
+        self.slot = None
+        # Set once the current WebSocket connection's subscription is confirmed
+        self.subscription_id = None
+        self.distribution = distribution
+        self.decimals = decimals
+
+    def _emit(self, event):
+        self.on_event(event)
+
+    def _fetch(self, method, params, typed=False):
+        """Fetch from the healthiest endpoint, bypassing cached results"""
+
+        errors = []
+        for endpoint in route_endpoints(self.endpoints, method):
+            url = endpoint["url"] if isinstance(endpoint, dict) else endpoint
+            try:
+                result, _ = call_rpc_with_retry(
+                    url, method, params, timeout=WATCH_CONFIG["timeout"], use_cache=False, typed=typed
+                )
+                return result
+            except RpcClientError as e:
+                errors.append(f"{url}: {e}")
+        raise RpcClientError(f"All endpoints failed: {'; '.join(errors)}")
+
+    def fetch_state(self):
+        """Current accounts as (HolderTable, context slot)"""
+
+        if self.full_scan:
+            # Sharded like the one-off full scan, so large mints stay within provider limits
+            scan = scan_all_holders(self.endpoints, self.token_mint)
+            return scan.to_table(), scan.max_slot
+
+        result = self._fetch("getTokenLargestAccounts", [self.token_mint, {"commitment": "confirmed"}])
+        table = HolderTable()
+        for account in result['value']:
+            amount = int(account['amount'])
+            if amount:
+                # Owners are not part of getTokenLargestAccounts
+                table.append(account['address'], None, amount)
+        return table, result['context']['slot']
+
+    def load(self):
+        """Load the initial holder table"""
+
+        self.table, self.slot = self.fetch_state()
+        self.index = self.table.build_index()
+        self.ranks = top_ranks(self.table, self.top_n)
+        self._emit({
+            "type": EVENT_SNAPSHOT,
+            "slot": self.slot,
+            "holders": len(self.table),
+            "total_amount": self.table.total_amount()
+        })
+        if self.distribution:
+            self._emit(self.distribution_event())
+
+    def distribution_event(self):
+        event = holder_distribution(self.table, decimals=self.decimals)
+        event.update({"type": EVENT_DISTRIBUTION, "slot": self.slot})
+        return event
+
+    def apply_changes(self, changes, slot=None):
+        """Apply changed accounts [(address, owner bytes, raw amount)] and emit diff events
+
+        An amount of 0 means the account was emptied or closed.
+        """
+
+        table, index = self.table, self.index
+        if slot is not None:
+            self.slot = slot
+        events = []
+
+        for address, owner, amount in changes:
+            row = index.get(address)
+            if row is None:
+                if not amount:
+                    continue
+                index[address] = len(table)
+                table.append(address, owner, amount)
+                events.append(classify_change(address, 0, amount))
+                continue
+
+            event = classify_change(address, table.amounts[row], amount)
+            if event is None:
+                continue
+            table.amounts[row] = amount
+            events.append(event)
+
+        return self._publish(events)
+
+    def apply_top_accounts(self, current, slot=None):
+        """Replace the table with a new getTokenLargestAccounts result and emit diff events
+
+        Accounts outside the result may still hold tokens, so one that
+        dropped out is reported as left_top (not emptied) and one that
+        appeared as entered_top (not new). Only accounts in both results
+        get balance change events.
+        """
+
+        if slot is not None:
+            self.slot = slot
+        events = []
+        for address, row, old_amount, amount in join_amounts(self.table, current, self.index):
+            if row is None:
+                events.append({"type": EVENT_LEFT_TOP, "address": address, "old_amount": old_amount})
+            elif address not in self.index:
+                events.append({"type": EVENT_ENTERED_TOP, "address": address, "new_amount": amount})
+            else:
+                events.append(classify_change(address, old_amount, amount))
+
+        self.table, self.index = current, current.build_index()
+        return self._publish(events)
+
+    def _publish(self, events):
+        """Add rank movements (and the distribution) to account events, then emit them"""
+
+        # Rank movements within the top N
+        if events:
+            ranks = top_ranks(self.table, self.top_n)
+            events.extend(compare_ranks(self.ranks, ranks))
+            self.ranks = ranks
+            self._maybe_compact()
+            if self.distribution:
+                events.append(self.distribution_event())
+
+        for event in events:
+            event["slot"] = self.slot
+            self._emit(event)
+        return events
+
+    def _maybe_compact(self):
+        zero_rows = sum(1 for amount in self.table.amounts if not amount)
+        if zero_rows and zero_rows >= WATCH_CONFIG["compact_ratio"] * len(self.table):
+            self.table.compact()
+            self.index = self.table.build_index()
+
+    def poll_once(self):
+        """Fetch the current state and apply only the accounts that differ"""
+
+        current, slot = self.fetch_state()
+        if not self.full_scan:
+            return self.apply_top_accounts(current, slot)
+
+        # Accounts missing from a full enumeration were emptied or closed
+        changes = []
+        for address, row, _, amount in join_amounts(self.table, current, self.index):
+            owner = None
+            if row is not None:
+                owner = bytes(current.owners[row * PUBKEY_LENGTH:(row + 1) * PUBKEY_LENGTH])
+            changes.append((address, owner, amount))
+
+        return self.apply_changes(changes, slot)
+
+    def run(self, subscribe=False, max_ticks=None):
+        """Run until interrupted (or for max_ticks polls)"""
+
+        if subscribe and not WEBSOCKETS_AVAILABLE:
+            self._emit({"type": EVENT_ERROR, "error": "websockets not installed, falling back to polling"})
+            subscribe = False
+        if subscribe:
+            # Notifications cover every account, so start from a full enumeration
+            self.full_scan = True
+
+        self.load()
+        if subscribe:
+            asyncio.run(self._run_subscription())
+            return
+
+        ticks = 0
+        next_tick = time.monotonic()
+        while max_ticks is None or ticks < max_ticks:
+            next_tick += self.interval
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+            try:
+                self.poll_once()
+            except RpcClientError as e:
+                self._emit({"type": EVENT_ERROR, "error": str(e)})
+            ticks += 1
+
+    async def _run_subscription(self):
+        attempt = 0
+        while True:
+            endpoint = route_endpoints(self.endpoints, "programSubscribe")[0]
+            url = endpoint["url"] if isinstance(endpoint, dict) else endpoint
+            self.subscription_id = None
+            try:
+                await self._subscribe(websocket_url(url))
+            except (OSError, websockets.WebSocketException) as e:
+                self._emit({"type": EVENT_ERROR, "error": f"{url}: {e}"})
+                if self.subscription_id is not None:
+                    # The connection worked before it dropped, so back off from the start again
+                    attempt = 0
+                await asyncio.sleep(backoff_delay(attempt))
+                attempt += 1
+                # Catch up on anything missed while disconnected
+                try:
+                    await asyncio.to_thread(self.poll_once)
+                except RpcClientError as e:
+                    self._emit({"type": EVENT_ERROR, "error": str(e)})
+
+    async def _subscribe(self, url):
+        loop = asyncio.get_running_loop()
+        async with websockets.connect(url, max_size=None) as websocket:
+            await websocket.send(json.dumps({
+                "jsonrpc": "2.0",
+                "id": 1,
+                "method": "programSubscribe",
+                "params": [TOKEN_PROGRAM_ID, {
+                    "encoding": "base64",
+                    "commitment": "confirmed",
+                    "filters": [
+                        {"dataSize": TOKEN_ACCOUNT_SIZE},
+                        {"memcmp": {"offset": MINT_OFFSET, "bytes": self.token_mint}}
+                    ]
+                }]
+            }))
+
+            pending = {}
+            slot = None
+            flush_at = loop.time() + WATCH_CONFIG["flush_interval"]
+            while True:
+                try:
+                    message = await asyncio.wait_for(websocket.recv(), max(0.0, flush_at - loop.time()))
+                except asyncio.TimeoutError:
+                    message = None
+
+                if message is not None:
+                    try:
+                        message = json.loads(message)
+                        if message.get('method') == 'programNotification':
+                            result = message['params']['result']
+                            value = result['value']
+                            owner, amount = decode_token_account(value['account']['data'][0])
+                            pending[value['pubkey']] = (owner, amount)
+                            slot = result['context']['slot']
+                        elif message.get('id') == 1 and 'result' in message:
+                            self.subscription_id = message['result']
+                    except (ValueError, KeyError, TypeError, IndexError, AttributeError) as e:
+                        # One malformed message must not end the subscription
+                        self._emit({"type": EVENT_ERROR, "error": f"Malformed notification skipped: {e!r}"})
+
+                # Apply notifications in batches so ranks are recomputed once per flush
+                if loop.time() >= flush_at:
+                    if pending:
+                        self.apply_changes(
+                            [(address, owner, amount) for address, (owner, amount) in pending.items()], slot
+                        )
+                        pending.clear()
+                    flush_at = loop.time() + WATCH_CONFIG["flush_interval"]
@@ -0,0 +1,248 @@
+# instrumentation.py
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+INSTRUMENTATION_CONFIG = {
+    "enabled": False,
+    # Finished spans kept for trace export; aggregates are always complete
+    "max_spans": 10000,
+    "service_name": "roacore-token-stats",
+    "metric_prefix": "roacore"
+}
+
+_local = threading.local()
+_lock = threading.Lock()
+_finished = deque(maxlen=INSTRUMENTATION_CONFIG["max_spans"])
+# name -> [count, total seconds, max seconds]
+_aggregates = {}
+
+
+class _NoopSpan:
+    """Shared stand-in returned while instrumentation is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, key, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """One timed stage; nests per thread, parent and trace ids follow the stack"""
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = random.getrandbits(64)
+        self.parent_id = None
+        self.trace_id = None
+        self.start_ns = 0
+        self.end_ns = 0
+        self._start = 0.0
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        if stack:
+            self.parent_id = stack[-1].span_id
+            self.trace_id = stack[-1].trace_id
+        else:
+            self.trace_id = random.getrandbits(128)
+        stack.append(self)
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self._start
+        self.end_ns = self.start_ns + int(duration * 1e9)
+        _local.stack.pop()
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        with _lock:
+            _finished.append(self)
+            aggregate = _aggregates.get(self.name)
+            if aggregate is None:
+                _aggregates[self.name] = [1, duration, duration]
+            else:
+                aggregate[0] += 1
+                aggregate[1] += duration
+                if duration > aggregate[2]:
+                    aggregate[2] = duration
+        return False
+
+
+def span(name, **attributes):
+    """Context manager timing one stage; a shared no-op object when disabled"""
+    if not INSTRUMENTATION_CONFIG["enabled"]:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def is_enabled():
+    return INSTRUMENTATION_CONFIG["enabled"]
+
+
+def enable(max_spans=None):
+    """Turn span recording on (call before sessions are created to time connects)"""
+
+    global _finished
+    if max_spans is not None and max_spans != _finished.maxlen:
+        with _lock:
+            _finished = deque(_finished, maxlen=max_spans)
+    INSTRUMENTATION_CONFIG["enabled"] = True
+
+
+def disable():
+    INSTRUMENTATION_CONFIG["enabled"] = False
+
+
+def reset():
+    """Drop recorded spans and aggregates"""
+    with _lock:
+        _finished.clear()
+        _aggregates.clear()
+
+
+def timing_breakdown():
+    """{stage: {"count", "total", "mean", "max"}} in seconds, slowest total first"""
+
+    with _lock:
+        items = [(name, list(values)) for name, values in _aggregates.items()]
+    items.sort(key=lambda item: item[1][1], reverse=True)
+    return {
+        name: {"count": count, "total": total, "mean": total / count, "max": maximum}
+        for name, (count, total, maximum) in items
+    }
+
+
+def _metric_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    """Span aggregates in the Prometheus text exposition format"""
+
+    prefix = INSTRUMENTATION_CONFIG["metric_prefix"]
+    breakdown = timing_breakdown()
+    lines = [
+        f"# HELP {prefix}_stage_seconds Time spent per instrumented stage",
+        f"# TYPE {prefix}_stage_seconds summary"
+    ]
+    for name, stats in breakdown.items():
+        label = _metric_label(name)
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{label}"}} {stats["total"]:.9f}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{label}"}} {stats["count"]}')
+    lines.append(f"# HELP {prefix}_stage_seconds_max Slowest single run per instrumented stage")
+    lines.append(f"# TYPE {prefix}_stage_seconds_max gauge")
+    for name, stats in breakdown.items():
+        lines.append(f'{prefix}_stage_seconds_max{{stage="{_metric_label(name)}"}} {stats["max"]:.9f}')
+    return "\n".join(lines) + "\n"
+
+
+def _otel_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otel_trace():
+    """Recorded spans as an OTLP/JSON trace export request (ExportTraceServiceRequest)"""
+
+    with _lock:
+        spans = list(_finished)
+
+    otel_spans = []
+    for recorded in spans:
+        otel_span = {
+            "traceId": f"{recorded.trace_id:032x}",
+            "spanId": f"{recorded.span_id:016x}",
+            "name": recorded.name,
+            "kind": 1,
+            "startTimeUnixNano": str(recorded.start_ns),
+            "endTimeUnixNano": str(recorded.end_ns),
+            "attributes": [{"key": key, "value": _otel_value(value)} for key, value in recorded.attributes.items()]
+        }
+        if recorded.parent_id is not None:
+            otel_span["parentSpanId"] = f"{recorded.parent_id:016x}"
+        if "error" in recorded.attributes:
+            otel_span["status"] = {"code": 2, "message": recorded.attributes["error"]}
+        otel_spans.append(otel_span)
+
+    return {"resourceSpans": [{
+        "resource": {"attributes": [
+            {"key": "service.name", "value": {"stringValue": INSTRUMENTATION_CONFIG["service_name"]}}
+        ]},
+        "scopeSpans": [{"scope": {"name": "instrumentation"}, "spans": otel_spans}]
+    }]}
+
+
+def write_prometheus(path):
+    """Write metrics for the node_exporter textfile collector (atomic replace)"""
+    _write_atomic(path, prometheus_text())
+    return path
+
+
+def write_otel_trace(path):
+    """Write the OTLP/JSON trace, e.g. for an OpenTelemetry collector file receiver"""
+    _write_atomic(path, json.dumps(otel_trace(), separators=(',', ':')))
+    return path
+
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as output:
+        output.write(data)
+    os.replace(temp_file, path)
+
+
+def timed_pool_classes():
+    """urllib3 pool classes whose connections record connect and TLS handshake spans
+
+    rpc.connect covers DNS resolution, TCP and (for HTTPS) the TLS handshake;
+    the nested rpc.tcp_connect span is DNS + TCP only, so TLS is the difference.
+    """
+
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    def timed(connection_class):
+        class TimedConnection(connection_class):
+            def _new_conn(self):
+                with span("rpc.tcp_connect", host=self.host):
+                    return super()._new_conn()
+
+            def connect(self):
+                with span("rpc.connect", host=self.host):
+                    return super().connect()
+
+        return TimedConnection
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = timed(HTTPConnection)
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = timed(HTTPSConnection)
+
+    return {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
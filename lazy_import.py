@@ -0,0 +1,35 @@
+# lazy_import.py
+import importlib
+import importlib.util
+import sys
+
+
+def module_available(name):
+    """True if a module can be imported, found without importing it"""
+    return name in sys.modules or importlib.util.find_spec(name) is not None
+
+
+def is_loaded(name):
+    """True once a module has actually been imported"""
+    return name in sys.modules
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access
+
+    Keeps optional heavy dependencies (NumPy, requests, aiohttp, pyarrow,
+    zstandard) off the import path of commands that never touch them.
+    """
+
+    def __init__(self, name):
+        self.__dict__["_lazy_name"] = name
+
+    def __getattr__(self, attribute):
+        return getattr(importlib.import_module(self._lazy_name), attribute)
+
+    def __repr__(self):
+        return f"<lazy module {self._lazy_name}>"
+
+
+def lazy_module(name):
+    return LazyModule(name)
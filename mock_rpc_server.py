@@ -0,0 +1,284 @@
+# mock_rpc_server.py
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from base58 import b58decode, b58encode
+from token_accounts import AMOUNT_OFFSET, TOKEN_ACCOUNT_SIZE
+
+MOCK_CONFIG = {
+    # Seconds added to every HTTP response, plus uniform jitter
+    "latency": 0.0,
+    "jitter": 0.0,
+    # Share of HTTP requests answered with 503, 429 (with Retry-After) or a JSON-RPC error
+    "error_rate": 0.0,
+    "rate_limit_rate": 0.0,
+    "rpc_error_rate": 0.0,
+    "retry_after": 1,
+    # Share of slot-bound results answered by a node lag_slots behind the tip
+    "lag_rate": 0.0,
+    "lag_slots": 3,
+    "holders": 1000,
+    "decimals": 6,
+    "start_slot": 250000000,
+    "seed": 42
+}
+
+# Like on a real node, these take only a commitment and ignore minContextSlot
+UNPINNED_METHODS = ("getTokenSupply", "getTokenLargestAccounts")
+
+SYSTEM_PROGRAM_ID = "11111111111111111111111111111111"
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+
+
+class MockRpcError(Exception):
+    """JSON-RPC error answered for one call"""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+def _pubkey(seed, label, index):
+    return hashlib.sha256(f"{seed}:{label}:{index}".encode()).digest()
+
+
+class MockChain:
+    """Deterministic token holder data served by the mock server
+
+    Balances follow a 1/rank curve so statistics look realistic, and every
+    token account has full 165-byte SPL layout data so dataSlice and memcmp
+    filters behave like on a real node.
+    """
+
+    def __init__(self, holders, decimals, start_slot, seed, lag_rate=0.0, lag_slots=0):
+        self.decimals = decimals
+        self.start_slot = start_slot
+        self.lag_rate = lag_rate
+        self.lag_slots = lag_slots
+        self.started = time.monotonic()
+        mint = _pubkey(seed, "mint", 0)
+        self.mint = b58encode(mint)
+
+        self.accounts = []
+        self.by_address = {}
+        for index in range(holders):
+            address = b58encode(_pubkey(seed, "account", index))
+            # Every tenth wallet holds a second token account
+            owner = _pubkey(seed, "owner", index - index % 10 if index % 10 == 1 else index)
+            amount = 10 ** (decimals + 9) // (index + 1)
+            data = mint + owner + amount.to_bytes(8, 'little')
+            data += bytes(TOKEN_ACCOUNT_SIZE - len(data))
+            self.accounts.append((address, data))
+            self.by_address[address] = data
+        self.supply = sum(int.from_bytes(data[AMOUNT_OFFSET:AMOUNT_OFFSET + 8], 'little') for _, data in self.accounts)
+
+    def slot(self):
+        # Roughly one slot per 400ms, like mainnet
+        return self.start_slot + int((time.monotonic() - self.started) / 0.4)
+
+    def context(self, value, config=None):
+        slot = self.slot()
+        if self.lag_slots and random.random() < self.lag_rate:
+            # Answered by a lagging node, unless minContextSlot rules it out
+            slot = max(slot - self.lag_slots, (config or {}).get("minContextSlot", 0))
+        return {"context": {"slot": slot}, "value": value}
+
+    @staticmethod
+    def encode(data, config):
+        data_slice = config.get("dataSlice")
+        if data_slice:
+            data = data[data_slice["offset"]:data_slice["offset"] + data_slice["length"]]
+        return [base64.b64encode(data).decode(), "base64"]
+
+    def token_account(self, data, config):
+        return {
+            "data": self.encode(data, config), "executable": False, "lamports": 2039280,
+            "owner": TOKEN_PROGRAM_ID, "rentEpoch": 0, "space": TOKEN_ACCOUNT_SIZE
+        }
+
+    @staticmethod
+    def matches(data, filters):
+        for account_filter in filters:
+            if "dataSize" in account_filter and len(data) != account_filter["dataSize"]:
+                return False
+            memcmp = account_filter.get("memcmp")
+            if memcmp:
+                expected = b58decode(memcmp["bytes"])
+                if data[memcmp["offset"]:memcmp["offset"] + len(expected)] != expected:
+                    return False
+        return True
+
+    def call(self, method, params):
+        """Result of one JSON-RPC call; raises KeyError for unknown methods"""
+
+        config = params[-1] if params and isinstance(params[-1], dict) else {}
+        if method in UNPINNED_METHODS:
+            config = {key: value for key, value in config.items() if key != "minContextSlot"}
+        if config.get("minContextSlot", 0) > self.slot():
+            raise MockRpcError(-32016, "Minimum context slot has not been reached")
+        if method == "getHealth":
+            return "ok"
+        if method == "getVersion":
+            return {"solana-core": "mock", "feature-set": 0}
+        if method == "getSlot":
+            return self.slot()
+        if method == "getTokenSupply":
+            return self.context({
+                "amount": str(self.supply), "decimals": self.decimals,
+                "uiAmountString": str(self.supply / 10 ** self.decimals)
+            }, config)
+        if method == "getAccountInfo":
+            return self.context({
+                "data": {"parsed": {"info": {
+                    "decimals": self.decimals, "freezeAuthority": None, "isInitialized": True,
+                    "mintAuthority": None, "supply": str(self.supply)
+                }, "type": "mint"}, "program": "spl-token", "space": 82},
+                "executable": False, "lamports": 1461600, "owner": TOKEN_PROGRAM_ID
+            }, config)
+        if method == "getTokenLargestAccounts":
+            return self.context([
+                {"address": address, "amount": str(amount), "decimals": self.decimals}
+                for address, amount in (
+                    (address, int.from_bytes(data[AMOUNT_OFFSET:AMOUNT_OFFSET + 8], 'little'))
+                    for address, data in self.accounts[:20]
+                )
+            ], config)
+        if method == "getMultipleAccounts":
+            accounts = []
+            for address in params[0]:
+                data = self.by_address.get(address)
+                if data is not None:
+                    accounts.append(self.token_account(data, config))
+                else:
+                    # Anything else is a funded system wallet
+                    accounts.append({
+                        "data": self.encode(b"", config), "executable": False, "lamports": 10 ** 9,
+                        "owner": SYSTEM_PROGRAM_ID, "rentEpoch": 0, "space": 0
+                    })
+            return self.context(accounts, config)
+        if method == "getProgramAccounts":
+            filters = config.get("filters", [])
+            value = [
+                {"pubkey": address, "account": self.token_account(data, config)}
+                for address, data in self.accounts if self.matches(data, filters)
+            ]
+            return self.context(value, config) if config.get("withContext") else value
+        raise KeyError(method)
+
+
+class MockRpcHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, delayed ACKs add ~40ms per call
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body, separators=(',', ':')).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _answer(self, request):
+        config = self.server.config
+        if random.random() < config["rpc_error_rate"]:
+            return {"jsonrpc": "2.0", "id": request.get("id"),
+                    "error": {"code": -32005, "message": "Node is behind (mock)"}}
+        try:
+            result = self.server.chain.call(request["method"], request.get("params") or [])
+        except KeyError:
+            return {"jsonrpc": "2.0", "id": request.get("id"),
+                    "error": {"code": -32601, "message": "Method not found"}}
+        except MockRpcError as e:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": e.code, "message": str(e)}}
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    def do_POST(self):
+        config = self.server.config
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        delay = config["latency"] + random.uniform(0, config["jitter"])
+        if delay > 0:
+            time.sleep(delay)
+
+        roll = random.random()
+        if roll < config["rate_limit_rate"]:
+            self._send(429, {"jsonrpc": "2.0", "error": {"code": 429, "message": "Too many requests"}},
+                       {"Retry-After": str(config["retry_after"])})
+        elif roll < config["rate_limit_rate"] + config["error_rate"]:
+            self._send(503, {"jsonrpc": "2.0", "error": {"code": -32603, "message": "Service unavailable"}})
+        elif isinstance(body, list):
+            self._send(200, [self._answer(request) for request in body])
+        else:
+            self._send(200, self._answer(body))
+
+
+def create_mock_server(port=0, host="127.0.0.1", **overrides):
+    """Create (but do not start) a mock JSON-RPC server; port 0 picks a free one"""
+
+    config = dict(MOCK_CONFIG, **overrides)
+    server = ThreadingHTTPServer((host, port), MockRpcHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.chain = MockChain(
+        config["holders"], config["decimals"], config["start_slot"], config["seed"],
+        config["lag_rate"], config["lag_slots"]
+    )
+    return server
+
+
+def start_mock_server(port=0, **overrides):
+    """Serve a mock JSON-RPC server on a background thread, returns (server, url)
+
+    Call server.shutdown() to stop it. The mock mint address is server.chain.mint.
+    """
+
+    server = create_mock_server(port, **overrides)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local mock Solana JSON-RPC server for offline benchmarks')
+    parser.add_argument('--port', type=int, default=8899, help='Port to listen on (default: 8899)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random latency up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with HTTP 503')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0,
+                        help='Share of requests answered with HTTP 429')
+    parser.add_argument('--rpc-error-rate', type=float, default=0.0,
+                        help='Share of calls answered with a JSON-RPC error')
+    parser.add_argument('--lag-rate', type=float, default=0.0,
+                        help='Share of slot-bound results answered from a lagging node')
+    parser.add_argument('--holders', type=int, default=MOCK_CONFIG["holders"],
+                        help='Number of token accounts of the mock mint')
+    args = parser.parse_args()
+
+    server = create_mock_server(
+        args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, rpc_error_rate=args.rpc_error_rate, lag_rate=args.lag_rate,
+        holders=args.holders
+    )
+    print(f"Mock RPC listening on http://127.0.0.1:{args.port} (mint {server.chain.mint})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
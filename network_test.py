@@ -1,49 +1,37 @@
 # network_test_en.py
-import requests
-import time
+import argparse
 
+from rpc_benchmark import append_results, benchmark_endpoints, print_benchmark_report
 
-def test_rpc_endpoints():
-    """Test connections to various RPC endpoints"""
 
-    endpoints = [
-        "https://api.mainnet-beta.solana.com"
-    ]
+def run_endpoint_benchmark(endpoints=None, iterations=10, concurrency=2):
+    """Benchmark basic connectivity to various RPC endpoints"""
+
+    if not endpoints:
+        from rpc_endpoints import endpoint_urls
+        endpoints = endpoint_urls()
 
     print("Solana RPC Endpoint Connection Test")
     print("=" * 60)
 
-    for endpoint in endpoints:
-        try:
-            print(f"Testing: {endpoint}")
-
-            # Simple getHealth request
-            response = requests.post(
-                endpoint,
-                json={
-                    "jsonrpc": "2.0",
-                    "id": 1,
-                    "method": "getHealth"
-                },
-                timeout=10
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                print(f"✅ Success - Response: {result}")
-            else:
-                print(f"❌ HTTP Error: {response.status_code}")
-
-        except requests.exceptions.Timeout:
-            print(f"❌ Timeout: {endpoint}")
-        except requests.exceptions.ConnectionError:
-            print(f"❌ Connection Error: {endpoint}")
-        except Exception as e:
-            print(f"❌ Other Error: {e}")
-
-        print("-" * 60)
-        time.sleep(1)
+    # Health and slot only: cheap for the provider, still shows latency spread and 429s
+    report = benchmark_endpoints(
+        endpoints, [("health", "getHealth", None), ("slot", "getSlot", None)],
+        iterations=iterations, concurrency=concurrency
+    )
+    print_benchmark_report(report)
+    append_results(report)
+    return report
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Solana RPC endpoint connection test')
+    parser.add_argument('endpoints', nargs='*', help='Endpoint URLs (default: configured endpoints)')
+    parser.add_argument('--iterations', type=int, default=10, help='Requests per call (default: 10)')
+    parser.add_argument('--concurrency', type=int, default=2, help='Requests in flight (default: 2)')
+    args = parser.parse_args(argv)
+    return run_endpoint_benchmark(args.endpoints, iterations=args.iterations, concurrency=args.concurrency)
 
 
 if __name__ == "__main__":
-    test_rpc_endpoints()
+    main()
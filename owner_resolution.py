@@ -0,0 +1,290 @@
+# owner_resolution.py
+import base64
+import json
+import os
+import threading
+
+from base58 import b58decode, b58encode
+from holder_table import PUBKEY_LENGTH, HolderTable
+from retry_policy import call_with_retry
+from rpc_client import call_rpc_batch, unwrap_batch_result
+from token_accounts import OWNER_OFFSET
+
+OWNER_CONFIG = {
+    "cache_file": os.path.join("output", "owner_cache.json"),
+    "persist": True,
+    # getMultipleAccounts accepts at most 100 keys per call
+    "chunk_size": 100,
+    # getMultipleAccounts calls sent per JSON-RPC batch
+    "batch_calls": 10,
+    "timeout": 60,
+    # Programs whose accounts (or PDAs) commonly hold tokens on behalf of users
+    "known_programs": {
+        "11111111111111111111111111111111": "System Program",
+        "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA": "Token Program",
+        "675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8": "Raydium AMM",
+        "CAMMCzo5YL8w4VFF8KVHrK22GGUsp5VTaW7grrKgrWqK": "Raydium CLMM",
+        "whirLbMiicVdio4qvUfM5KAg6Ct8VwpYzGff3uctyCc": "Orca Whirlpool",
+        "LBUZKhRxPF3XUpBCjp4YzTKgLccjZhTSDM9YuVaPwxo": "Meteora DLMM",
+        "JUP6LkbZbjS1jKKwapdHNy74zcZ3tLUZoi5QNyVTaV4": "Jupiter",
+        "SMPLecH534NA9acpos4G6x7uf3LWbCAwZQE9e8ZekMu": "Squads Multisig"
+    }
+}
+
+SYSTEM_PROGRAM_ID = "11111111111111111111111111111111"
+
+OWNER_WALLET = "wallet"
+OWNER_PDA = "pda"
+OWNER_PROGRAM = "program"
+
+# Owner pubkey only, skipping mint and amount
+OWNER_SLICE = {"offset": OWNER_OFFSET, "length": PUBKEY_LENGTH}
+# Account existence and owning program only
+EMPTY_SLICE = {"offset": 0, "length": 0}
+
+# Curve25519 in Edwards form, used to tell PDAs (off-curve) from keypair wallets
+_FIELD_PRIME = 2 ** 255 - 19
+_CURVE_D = -121665 * pow(121666, _FIELD_PRIME - 2, _FIELD_PRIME) % _FIELD_PRIME
+
+
+def is_on_curve(pubkey):
+    """True if a 32-byte public key is a valid ed25519 point (PDAs never are)"""
+
+    y = int.from_bytes(pubkey, 'little') & ((1 << 255) - 1)
+    y2 = y * y % _FIELD_PRIME
+    u = (y2 - 1) % _FIELD_PRIME
+    v = (_CURVE_D * y2 + 1) % _FIELD_PRIME
+    x2 = u * pow(v, _FIELD_PRIME - 2, _FIELD_PRIME) % _FIELD_PRIME
+    # The point exists iff x^2 has a square root (Euler's criterion)
+    return x2 == 0 or pow(x2, (_FIELD_PRIME - 1) // 2, _FIELD_PRIME) == 1
+
+
+def chunked(items, size):
+    """Split a list into consecutive chunks of at most size items"""
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+class OwnerCache:
+    """Persistent token account -> owner and owner -> label mappings
+
+    Token account owners only change on an explicit SetAuthority, and owner
+    classification effectively never does, so entries never expire.
+    """
+
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file
+        self.account_owners = {}
+        self.owner_labels = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def load(self):
+        """Load persisted mappings; a missing or corrupt file starts fresh"""
+
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return self
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as cache_file:
+                data = json.load(cache_file)
+            self.account_owners = data.get("account_owners", {})
+            self.owner_labels = data.get("owner_labels", {})
+        except (OSError, ValueError, AttributeError):
+            self.account_owners, self.owner_labels = {}, {}
+        return self
+
+    def save(self):
+        """Persist mappings if anything was learned during this run"""
+
+        if not self.cache_file or not self._dirty:
+            return
+        with self._lock:
+            data = json.dumps(
+                {"account_owners": self.account_owners, "owner_labels": self.owner_labels}, separators=(',', ':')
+            )
+            self._dirty = False
+        directory = os.path.dirname(self.cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f"{self.cache_file}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as cache_file:
+            cache_file.write(data)
+        os.replace(temp_file, self.cache_file)
+
+    def update_owners(self, owners):
+        with self._lock:
+            self.account_owners.update(owners)
+            self._dirty = True
+
+    def update_labels(self, labels):
+        with self._lock:
+            self.owner_labels.update(labels)
+            self._dirty = True
+
+
+_owner_cache = None
+_owner_cache_lock = threading.Lock()
+
+
+def get_owner_cache():
+    """Process-wide owner cache, loaded from disk on first use"""
+
+    global _owner_cache
+    if _owner_cache is None:
+        with _owner_cache_lock:
+            if _owner_cache is None:
+                cache_file = OWNER_CONFIG["cache_file"] if OWNER_CONFIG["persist"] else None
+                _owner_cache = OwnerCache(cache_file).load()
+    return _owner_cache
+
+
+def fetch_multiple_accounts(endpoint, addresses, data_slice, timeout=None):
+    """getMultipleAccounts over any number of addresses, chunked and batched
+
+    Returns {address: account or None}. Each JSON-RPC batch carries up to
+    batch_calls chunks of chunk_size keys and runs under the retry policy.
+    """
+
+    timeout = timeout or OWNER_CONFIG["timeout"]
+    config = {"encoding": "base64", "dataSlice": data_slice, "commitment": "confirmed"}
+    chunks = chunked(list(addresses), OWNER_CONFIG["chunk_size"])
+
+    accounts = {}
+    for batch in chunked(chunks, OWNER_CONFIG["batch_calls"]):
+        calls = [("getMultipleAccounts", [chunk, config]) for chunk in batch]
+        results, _ = call_with_retry(
+            lambda attempt_timeout: call_rpc_batch(endpoint, calls, timeout=attempt_timeout),
+            endpoint, timeout=timeout
+        )
+        for chunk, result in zip(batch, results):
+            accounts.update(zip(chunk, unwrap_batch_result(result)['value']))
+    return accounts
+
+
+def decode_account_data(account):
+    """Raw bytes of a base64-encoded account from getMultipleAccounts"""
+    return base64.b64decode(account['data'][0])
+
+
+def resolve_account_owners(endpoint, addresses, cache=None):
+    """Map token account addresses to base58 owner wallets, fetching only unknown ones"""
+
+    cache = cache or get_owner_cache()
+    missing = [address for address in addresses if address not in cache.account_owners]
+    if missing:
+        fetched = {}
+        for address, account in fetch_multiple_accounts(endpoint, missing, OWNER_SLICE).items():
+            if account is not None:
+                fetched[address] = b58encode(decode_account_data(account))
+        cache.update_owners(fetched)
+    return {address: cache.account_owners[address] for address in addresses if address in cache.account_owners}
+
+
+def owner_label(owner, owner_account):
+    """Classify an owner as wallet, pda or program and name the program if known"""
+
+    known = OWNER_CONFIG["known_programs"]
+    program = owner_account['owner'] if owner_account else None
+    if not is_on_curve(b58decode(owner, PUBKEY_LENGTH)):
+        kind = OWNER_PDA
+    elif owner_account and (owner_account.get('executable') or program != SYSTEM_PROGRAM_ID):
+        kind = OWNER_PROGRAM
+    else:
+        kind = OWNER_WALLET
+
+    label = {"kind": kind}
+    if program and program != SYSTEM_PROGRAM_ID:
+        label["program"] = program
+        if program in known:
+            label["name"] = known[program]
+    if owner in known:
+        label["name"] = known[owner]
+    return label
+
+
+def resolve_owner_labels(endpoint, owners, cache=None):
+    """Label owner wallets, looking up the owning program of unknown ones"""
+
+    cache = cache or get_owner_cache()
+    missing = [owner for owner in owners if owner not in cache.owner_labels]
+    if missing:
+        accounts = fetch_multiple_accounts(endpoint, missing, EMPTY_SLICE)
+        cache.update_labels({owner: owner_label(owner, accounts.get(owner)) for owner in missing})
+    return {owner: cache.owner_labels[owner] for owner in owners}
+
+
+def aggregate_by_owner(table):
+    """Merge token account rows into one row per owner
+
+    Hash-grouped reduction over the owner column: returns (owner table,
+    token account count per owner row). Rows with an unknown owner stay
+    separate under their token account address.
+    """
+
+    groups = {}
+    counts = []
+    owner_table = HolderTable()
+    owners, amounts, addresses = table.owners, table.amounts, table.addresses
+    empty = bytes(PUBKEY_LENGTH)
+
+    for row in range(len(table)):
+        start = row * PUBKEY_LENGTH
+        owner = bytes(owners[start:start + PUBKEY_LENGTH])
+        key = addresses[row] if owner == empty else owner
+        group = groups.get(key)
+        if group is None:
+            groups[key] = len(owner_table)
+            owner_table.append(b58encode(owner) if owner != empty else addresses[row], owner, amounts[row])
+            counts.append(1)
+        else:
+            owner_table.amounts[group] += amounts[row]
+            counts[group] += 1
+
+    return owner_table, counts
+
+
+def fill_missing_owners(endpoint, table, cache=None):
+    """Resolve owners for rows that were built without them (e.g. getTokenLargestAccounts)"""
+
+    empty = bytes(PUBKEY_LENGTH)
+    missing = [
+        row for row in range(len(table))
+        if table.owners[row * PUBKEY_LENGTH:(row + 1) * PUBKEY_LENGTH] == empty
+    ]
+    if not missing:
+        return 0
+
+    resolved = resolve_account_owners(endpoint, [table.addresses[row] for row in missing], cache)
+    filled = 0
+    for row in missing:
+        owner = resolved.get(table.addresses[row])
+        if owner is not None:
+            start = row * PUBKEY_LENGTH
+            table.owners[start:start + PUBKEY_LENGTH] = b58decode(owner, PUBKEY_LENGTH)
+            filled += 1
+    return filled
+
+
+def aggregate_holders(endpoint, table, label_top=None, cache=None):
+    """Resolve, merge and label token accounts as wallet-level holders
+
+    Only the label_top largest owners are labeled (all when None). Returns
+    (owner table, {owner address: {"token_accounts", "kind", ...}}).
+    """
+
+    cache = cache or get_owner_cache()
+    fill_missing_owners(endpoint, table, cache)
+    owner_table, counts = aggregate_by_owner(table)
+
+    known_owners = [
+        owner_table.addresses[row] for row in owner_table.top_indices(label_top)
+        if owner_table.owner_at(row) is not None
+    ]
+    labels = resolve_owner_labels(endpoint, known_owners, cache)
+    cache.save()
+
+    details = {}
+    for row, address in enumerate(owner_table.addresses):
+        detail = {"token_accounts": counts[row]}
+        detail.update(labels.get(address, {"kind": None}))
+        details[address] = detail
+    return owner_table, details
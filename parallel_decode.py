@@ -0,0 +1,143 @@
+# parallel_decode.py
+import base64
+import multiprocessing
+import os
+import threading
+from array import array
+
+from holder_table import PUBKEY_LENGTH, HolderTable, np, use_numpy
+
+DECODE_POOL_CONFIG = {
+    # Fewer accounts than this are decoded in-process; pickling would cost more than it saves
+    "min_accounts": 50000,
+    "min_chunk_accounts": 10000,
+    # None = one worker per CPU; 1 disables the pool
+    "max_workers": None,
+    # fork is unsafe while scan threads hold locks, so workers come from a clean process
+    "start_method": "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+}
+
+# Owner pubkey followed by the u64 amount (the holder dataSlice)
+SLICE_LENGTH = PUBKEY_LENGTH + 8
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def decode_slices(encoded, skip_zero=True):
+    """Decode base64 owner+amount slices (a list, or one "\\n"-joined str) into compact columns
+
+    Returns (owners bytes, amounts bytes of native u64, kept rows) where kept
+    rows is None when no row was dropped, otherwise an array('I') of the
+    positions that survived skip_zero. Runs in pool workers, so everything
+    returned pickles as a few flat buffers; the joined str form keeps the
+    request to a worker a single buffer as well.
+    """
+
+    if isinstance(encoded, str):
+        slices = encoded.split("\n") if encoded else []
+    else:
+        slices = encoded
+    b64decode = base64.b64decode
+    raw = b"".join([b64decode(data) for data in slices])
+    if len(raw) != len(slices) * SLICE_LENGTH:
+        raise ValueError("account data is not an owner+amount slice")
+
+    if use_numpy(len(slices)):
+        records = np.frombuffer(raw, dtype=[('owner', f'V{PUBKEY_LENGTH}'), ('amount', '<u8')])
+        kept = None
+        if skip_zero:
+            nonzero = records['amount'] != 0
+            if not nonzero.all():
+                kept = np.flatnonzero(nonzero)
+                records = records[kept]
+                kept = array('I', kept.astype(np.uint32).tobytes())
+        return records['owner'].tobytes(), records['amount'].astype(np.uint64).tobytes(), kept
+
+    view = memoryview(raw)
+    owners = bytearray()
+    amounts = array('Q')
+    kept = array('I')
+    from_bytes = int.from_bytes
+    for row, offset in enumerate(range(0, len(raw), SLICE_LENGTH)):
+        amount = from_bytes(view[offset + PUBKEY_LENGTH:offset + SLICE_LENGTH], 'little')
+        if skip_zero and not amount:
+            continue
+        owners += view[offset:offset + PUBKEY_LENGTH]
+        amounts.append(amount)
+        kept.append(row)
+    return bytes(owners), amounts.tobytes(), kept if len(kept) != len(slices) else None
+
+
+def get_decode_pool():
+    """Shared process pool for decoding, or None when it would have a single worker"""
+
+    global _pool, _pool_workers
+    workers = DECODE_POOL_CONFIG["max_workers"] or os.cpu_count() or 1
+    if workers <= 1:
+        return None
+    from concurrent.futures import ProcessPoolExecutor
+
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            context = multiprocessing.get_context(DECODE_POOL_CONFIG["start_method"])
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_decode_pool():
+    """Stop the worker processes (a later decode starts a new pool)"""
+
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _split(count, parts):
+    """(start, stop) ranges splitting count rows into at most parts chunks"""
+    size = max(-(-count // parts), DECODE_POOL_CONFIG["min_chunk_accounts"])
+    return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+
+def decode_holder_slices(addresses, slices, skip_zero=True, table=None):
+    """Decode base64 owner+amount slices into a HolderTable, across processes when large
+
+    addresses and slices are parallel sequences. Inputs under min_accounts,
+    or machines with one CPU, decode in-process. Workers return flat
+    owner/amount buffers that are appended column-wise, never per-row objects.
+    """
+
+    if table is None:
+        table = HolderTable()
+
+    count = len(slices)
+    pool = get_decode_pool() if count >= DECODE_POOL_CONFIG["min_accounts"] else None
+    ranges = _split(count, _pool_workers) if pool is not None else [(0, count)]
+    results = None
+    if len(ranges) > 1:
+        from concurrent.futures.process import BrokenProcessPool
+
+        try:
+            results = list(pool.map(decode_slices, ["\n".join(slices[start:stop]) for start, stop in ranges],
+                                    [skip_zero] * len(ranges)))
+        except (BrokenProcessPool, OSError):
+            # Workers could not start or died; the next call gets a fresh pool
+            shutdown_decode_pool()
+    if results is None:
+        ranges = [(0, count)]
+        results = [decode_slices(slices, skip_zero)]
+
+    for (start, stop), (owners, amounts, kept) in zip(ranges, results):
+        if kept is None:
+            table.addresses.extend(addresses[start:stop])
+        else:
+            table.addresses.extend([addresses[start + row] for row in kept])
+        table.owners += owners
+        table.amounts.frombytes(amounts)
+    return table
@@ -0,0 +1,210 @@
+# program_scan.py
+import itertools
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from base58 import b58encode
+from endpoint_health import route_endpoints
+from holder_table import HolderTable
+from instrumentation import span
+from retry_policy import ERROR_FATAL, ERROR_RETRYABLE, call_rpc_with_retry, classify_error
+from rpc_client import RpcClientError, RpcHttpError, RpcTimeoutError
+from rpc_decode import context_slot
+from token_accounts import OWNER_OFFSET, build_holder_scan_params, decode_program_accounts
+
+SCAN_CONFIG = {
+    # Owner-key prefix bytes per initial shard: 0 = one request, 1 = 256 shards
+    "shard_bytes": 0,
+    # A shard that still fails after retries is split by one more prefix byte up to this depth
+    "max_shard_bytes": 2,
+    # Splits stop once the scan would exceed this many shards (65,536 at depth 2 is ~2 hours at 10 req/s)
+    "max_shards": 2048,
+    "max_workers": 8,
+    "timeout": 300,
+    # Extra passes over failed shards before giving up
+    "resume_rounds": 2
+}
+
+
+def response_too_large(error):
+    """True for errors a provider returns when a getProgramAccounts answer exceeds its limits"""
+    if isinstance(error, RpcHttpError):
+        return error.status_code == 413
+    message = str(error).lower()
+    return "too large" in message or "exceeded the limit" in message
+
+
+def split_signal(error):
+    """True for errors that a narrower shard avoids rather than a retry of the same one"""
+    return isinstance(error, RpcTimeoutError) or response_too_large(error)
+
+
+def owner_prefix_filter(prefix):
+    """memcmp filter selecting token accounts whose owner key starts with prefix"""
+    return {"memcmp": {"offset": OWNER_OFFSET, "bytes": b58encode(prefix)}}
+
+
+def owner_prefixes(prefix_bytes):
+    """All owner-key prefixes of the given length (b'' for an unsharded scan)"""
+    return [bytes(prefix) for prefix in itertools.product(range(256), repeat=prefix_bytes)]
+
+
+class ShardedHolderScan:
+    """getProgramAccounts holder scan split into independent owner-prefix shards
+
+    Shards run concurrently on a bounded thread pool, each under the shared
+    retry policy and rate limiters and falling over across routed endpoints.
+    A shard that still fails with a response too large or too slow for the
+    provider (or another retryable error) is split into 256 narrower shards;
+    a shard that can still split does so on its first timeout or response
+    too large, without retrying. Splits stop at max_shard_bytes deep or
+    once the scan would exceed max_shards. Shards that fail at the deepest level are kept in failed and re-run by
+    the next call to run(), so a scan resumes without repeating finished
+    shards. A fatal error, such as invalid params, ends the scan at once.
+    """
+
+    def __init__(self, endpoints, token_mint, shard_bytes=None, max_workers=None, timeout=None):
+        self.endpoints = endpoints
+        self.token_mint = token_mint
+        self.max_workers = max_workers or SCAN_CONFIG["max_workers"]
+        self.timeout = timeout or SCAN_CONFIG["timeout"]
+        shard_bytes = SCAN_CONFIG["shard_bytes"] if shard_bytes is None else shard_bytes
+
+        self.pending = owner_prefixes(shard_bytes)
+        self.shard_count = len(self.pending)
+        self.failed = {}
+        self.completed = set()
+        # prefix -> (slot, HolderTable) of every finished shard, kept columnar until to_table
+        self.shards = {}
+        self.min_slot = None
+        self.max_slot = None
+        self.requests = 0
+
+    @property
+    def complete(self):
+        return not self.pending and not self.failed
+
+    def _fetch(self, prefix):
+        """Scan one shard, returns (slot, HolderTable)"""
+
+        extra_filters = [owner_prefix_filter(prefix)] if prefix else None
+        params = build_holder_scan_params(self.token_mint, extra_filters=extra_filters, with_context=True)
+
+        errors = []
+        for endpoint in route_endpoints(self.endpoints, "getProgramAccounts"):
+            url = endpoint["url"] if isinstance(endpoint, dict) else endpoint
+            try:
+                result, _ = call_rpc_with_retry(
+                    url, "getProgramAccounts", params, timeout=self.timeout, use_cache=False, typed=True,
+                    give_up=split_signal if self._can_split(prefix) else None
+                )
+                slot = context_slot(result)
+                with span("holders.decode", shard=prefix.hex()):
+                    # Columnar, and process-parallel for large shards
+                    return slot, decode_program_accounts(result)
+            except RpcClientError as e:
+                errors.append(e)
+        # Keep the type of an error run() can act on, a combined message would read as fatal
+        actionable = [error for error in errors if response_too_large(error) or classify_error(error) != ERROR_FATAL]
+        if len(errors) == 1 or actionable:
+            raise (actionable or errors)[-1]
+        raise RpcClientError(f"All endpoints failed: {'; '.join(str(error) for error in errors)}")
+
+    def _merge(self, prefix, slot, table):
+        self.shards[prefix] = (slot, table)
+        if slot is not None:
+            self.min_slot = slot if self.min_slot is None else min(self.min_slot, slot)
+            self.max_slot = slot if self.max_slot is None else max(self.max_slot, slot)
+
+    def _can_split(self, prefix):
+        return (len(prefix) < SCAN_CONFIG["max_shard_bytes"]
+                and self.shard_count + 255 <= SCAN_CONFIG["max_shards"])
+
+    def _should_split(self, prefix, error):
+        # Rate limiting is not the shard's fault, narrower shards would only add requests
+        return self._can_split(prefix) and (
+            response_too_large(error) or classify_error(error) == ERROR_RETRYABLE
+        )
+
+    def run(self, on_shard=None):
+        """Scan every pending and previously failed shard
+
+        on_shard(prefix, slot, table) is called from this thread with each
+        shard's HolderTable as it finishes, e.g. to stream rows out before the
+        scan completes.
+        """
+
+        queue = self.pending + list(self.failed)
+        self.pending, self.failed = [], {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+            while queue or running:
+                while queue and len(running) < self.max_workers:
+                    prefix = queue.pop()
+                    running[executor.submit(self._fetch, prefix)] = prefix
+                    self.requests += 1
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    prefix = running.pop(future)
+                    try:
+                        slot, table = future.result()
+                    except RpcClientError as e:
+                        if classify_error(e) == ERROR_FATAL and not response_too_large(e):
+                            # Every other shard would fail the same way
+                            for pending in running:
+                                pending.cancel()
+                            self.failed[prefix] = str(e)
+                            raise
+                        if self._should_split(prefix, e):
+                            queue.extend(prefix + bytes([byte]) for byte in range(256))
+                            self.shard_count += 255
+                        else:
+                            self.failed[prefix] = str(e)
+                        continue
+                    self._merge(prefix, slot, table)
+                    self.completed.add(prefix)
+                    if on_shard is not None:
+                        on_shard(prefix, slot, table)
+        return self
+
+    def to_table(self):
+        """Merged, deduplicated accounts as a HolderTable
+
+        Shard columns are concatenated oldest slot first. Owner prefixes are
+        disjoint, so an address only shows up twice when its owner changed
+        between two shard reads; then the row from the newest slot wins.
+        """
+
+        shards = sorted(self.shards.values(), key=lambda shard: -1 if shard[0] is None else shard[0])
+        with span("holders.merge", accounts=sum(len(table) for _, table in shards)):
+            if len(shards) == 1:
+                return shards[0][1]
+            table = HolderTable()
+            for _, shard in shards:
+                table.extend(shard)
+            if len(set(table.addresses)) != len(table):
+                latest = {address: row for row, address in enumerate(table.addresses)}
+                table = table.select([row for row, address in enumerate(table.addresses) if latest[address] == row])
+        return table
+
+
+def scan_all_holders(endpoints, token_mint, shard_bytes=None, max_workers=None, timeout=None, on_shard=None):
+    """Run a sharded holder scan to completion, resuming failed shards
+
+    Returns the finished ShardedHolderScan; raises RpcClientError if shards
+    still fail after resume_rounds extra passes.
+    """
+
+    scan = ShardedHolderScan(endpoints, token_mint, shard_bytes, max_workers, timeout)
+    scan.run(on_shard)
+    for _ in range(SCAN_CONFIG["resume_rounds"]):
+        if scan.complete:
+            break
+        scan.run(on_shard)
+    if not scan.complete:
+        raise RpcClientError(
+            f"{len(scan.failed)} of {len(scan.failed) + len(scan.completed)} shards failed: "
+            f"{next(iter(scan.failed.values()))}"
+        )
+    return scan
@@ -0,0 +1,217 @@
+# retry_policy.py
+import random
+import threading
+import time
+
+from rpc_client import (
+    RpcClientError, RpcConnectionError, RpcError, RpcHttpError, RpcTimeoutError, cache_lookup, call_rpc
+)
+
+RETRY_CONFIG = {
+    "max_attempts": 3,
+    "base_delay": 0.5,
+    "max_delay": 10.0,
+    # Token bucket per endpoint: requests per second and burst size (None disables)
+    "default_rate": 10.0,
+    "default_burst": 10,
+    "endpoint_rates": {
+        # Public mainnet allows roughly 100 requests / 10s per IP
+        "https://api.mainnet-beta.solana.com": (8.0, 10)
+    }
+}
+
+ERROR_RETRYABLE = "retryable"
+ERROR_RATE_LIMITED = "rate_limited"
+ERROR_FATAL = "fatal"
+
+# JSON-RPC errors that will fail the same way on every attempt
+FATAL_RPC_CODES = {
+    -32700,  # Parse error
+    -32600,  # Invalid request
+    -32601,  # Method not found
+    -32602,  # Invalid params
+    -32010,  # Key excluded from secondary indexes
+}
+RATE_LIMIT_RPC_CODES = {429, -32429}
+RETRYABLE_HTTP_STATUSES = {408, 425, 500, 502, 503, 504}
+
+
+def classify_error(error):
+    """Classify an RPC client error as retryable, rate_limited or fatal"""
+
+    if isinstance(error, (RpcTimeoutError, RpcConnectionError)):
+        return ERROR_RETRYABLE
+    if isinstance(error, RpcHttpError):
+        if error.status_code == 429:
+            return ERROR_RATE_LIMITED
+        return ERROR_RETRYABLE if error.status_code in RETRYABLE_HTTP_STATUSES else ERROR_FATAL
+    if isinstance(error, RpcError):
+        if error.code in RATE_LIMIT_RPC_CODES:
+            return ERROR_RATE_LIMITED
+        if error.code in FATAL_RPC_CODES:
+            return ERROR_FATAL
+        # -32603 internal error and the Solana server range (node behind, slot skipped, ...)
+        if error.code == -32603 or (error.code is not None and -32099 <= error.code <= -32000):
+            return ERROR_RETRYABLE
+        return ERROR_FATAL
+    return ERROR_FATAL
+
+
+def backoff_delay(attempt, base_delay=None, max_delay=None):
+    """Capped exponential backoff with full jitter for a zero-based attempt number"""
+
+    base_delay = RETRY_CONFIG["base_delay"] if base_delay is None else base_delay
+    max_delay = RETRY_CONFIG["max_delay"] if max_delay is None else max_delay
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class Deadline:
+    """Overall time budget for a call including all of its retries"""
+
+    def __init__(self, seconds=None):
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self):
+        """Seconds left, or None for an unbounded deadline"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def clamp(self, timeout):
+        """Shrink a per-request timeout so it never outlives the deadline"""
+        remaining = self.remaining()
+        return timeout if remaining is None else min(timeout, remaining)
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Take a token and return how long the caller must wait before using it"""
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.blocked_until - now)
+
+    def acquire(self, deadline=None):
+        """Block until a request may be sent; False if that would overrun the deadline"""
+
+        wait = self.reserve()
+        if deadline is not None:
+            remaining = deadline.remaining()
+            if remaining is not None and wait > remaining:
+                return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def pause(self, seconds):
+        """Hold every request back for a while, e.g. after a 429 with Retry-After"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(endpoint):
+    """Shared token bucket for an endpoint, or None when rate limiting is disabled"""
+
+    limiter = _rate_limiters.get(endpoint)
+    if limiter is None:
+        rate, burst = RETRY_CONFIG["endpoint_rates"].get(
+            endpoint, (RETRY_CONFIG["default_rate"], RETRY_CONFIG["default_burst"])
+        )
+        if rate is None:
+            return None
+        with _rate_limiters_lock:
+            limiter = _rate_limiters.setdefault(endpoint, TokenBucket(rate, burst))
+    return limiter
+
+
+def call_with_retry(func, endpoint, max_attempts=None, deadline=None, timeout=60, on_retry=None,
+                    give_up=None):
+    """Run func(timeout) under the retry policy for one endpoint
+
+    Fatal errors are raised immediately, as are errors give_up(error) is
+    true for. Retryable errors back off with full jitter; rate-limited
+    errors wait at least the server's Retry-After. on_retry(attempt, error,
+    delay) is called before each retry sleep.
+    """
+
+    max_attempts = RETRY_CONFIG["max_attempts"] if max_attempts is None else max_attempts
+    if not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline)
+    limiter = get_rate_limiter(endpoint)
+
+    for attempt in range(max_attempts):
+        if limiter is not None and not limiter.acquire(deadline):
+            raise RpcTimeoutError("Deadline exceeded waiting for rate limiter", endpoint)
+        if deadline.expired():
+            raise RpcTimeoutError("Deadline exceeded", endpoint)
+
+        try:
+            return func(deadline.clamp(timeout))
+        except RpcClientError as e:
+            kind = classify_error(e)
+            if kind == ERROR_FATAL or attempt == max_attempts - 1 or (give_up is not None and give_up(e)):
+                raise
+
+            delay = backoff_delay(attempt)
+            if kind == ERROR_RATE_LIMITED:
+                retry_after = getattr(e, "retry_after", None)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                if limiter is not None:
+                    limiter.pause(delay)
+
+            remaining = deadline.remaining()
+            if remaining is not None and delay >= remaining:
+                raise
+
+            if on_retry is not None:
+                on_retry(attempt, e, delay)
+            time.sleep(delay)
+
+
+def call_rpc_with_retry(endpoint, method, params=None, timeout=60, max_attempts=None,
+                        deadline=None, on_retry=None, use_cache=True, typed=False, give_up=None):
+    """call_rpc under the retry policy, returns (result, response_time)
+
+    use_cache=False always goes to the endpoint (e.g. for polling) but still
+    refreshes the cache with the new result. typed is passed to call_rpc,
+    give_up to call_with_retry.
+    """
+
+    # Cache hits must not spend rate limiter tokens
+    start_time = time.time()
+    cached = cache_lookup(method, params) if use_cache and not typed else None
+    if cached is not None:
+        return cached, time.time() - start_time
+
+    return call_with_retry(
+        lambda attempt_timeout: call_rpc(endpoint, method, params, timeout=attempt_timeout, use_cache=False,
+                                         typed=typed),
+        endpoint, max_attempts=max_attempts, deadline=deadline, timeout=timeout, on_retry=on_retry,
+        give_up=give_up
+    )
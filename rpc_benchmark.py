@@ -0,0 +1,243 @@
+# rpc_benchmark.py
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from endpoint_health import percentile
+from retry_policy import RATE_LIMIT_RPC_CODES
+from rpc_client import RPC_CONFIG, RpcClientError, build_payload, configure_endpoint, post_rpc
+from rpc_decode import DECODE_CONFIG, available_backends, get_backend, loads
+
+BENCH_CONFIG = {
+    "iterations": 20,
+    "concurrency": 4,
+    "timeout": 30,
+    "percentiles": (50, 90, 99),
+    # Every run is appended here so providers can be compared over time
+    "results_file": os.path.join("output", "benchmarks.jsonl")
+}
+
+OUTCOME_OK = "ok"
+OUTCOME_ERROR = "error"
+OUTCOME_RATE_LIMITED = "rate_limited"
+
+
+def default_suite(token_mint):
+    """(name, method, params) calls benchmarked by default"""
+    return [
+        ("health", "getHealth", None),
+        ("slot", "getSlot", None),
+        ("supply", "getTokenSupply", [token_mint]),
+        ("mint_account", "getAccountInfo", [token_mint, {"encoding": "jsonParsed"}]),
+        ("largest_accounts", "getTokenLargestAccounts", [token_mint])
+    ]
+
+
+def measure_call(endpoint, method, params, timeout):
+    """One timed request, bypassing retries, cache and rate limiters
+
+    Returns {"outcome", "latency", "decode_time", "bytes", "wire_bytes"}.
+    latency covers request, server time and download; decode_time is the
+    JSON parse alone.
+    """
+
+    sample = {"outcome": OUTCOME_ERROR, "latency": None, "decode_time": None, "bytes": 0, "wire_bytes": 0}
+    start_time = time.perf_counter()
+    try:
+        response = post_rpc(endpoint, build_payload(method, params), timeout=timeout)
+        content = response.content
+    except RpcClientError:
+        sample["latency"] = time.perf_counter() - start_time
+        return sample
+
+    sample["latency"] = time.perf_counter() - start_time
+    sample["bytes"] = len(content)
+    sample["wire_bytes"] = int(response.headers.get("Content-Length", len(content)))
+    if response.status_code == 429:
+        sample["outcome"] = OUTCOME_RATE_LIMITED
+        return sample
+    if response.status_code != 200:
+        return sample
+
+    decode_start = time.perf_counter()
+    try:
+        body = loads(content)
+    except ValueError:
+        return sample
+    sample["decode_time"] = time.perf_counter() - decode_start
+
+    error = body.get("error") if isinstance(body, dict) else None
+    if error is None:
+        sample["outcome"] = OUTCOME_OK
+    elif error.get("code") in RATE_LIMIT_RPC_CODES:
+        sample["outcome"] = OUTCOME_RATE_LIMITED
+    return sample
+
+
+def summarize(samples, wall_time):
+    """Aggregate samples into latency percentiles, throughput and error rates"""
+
+    count = len(samples)
+    ok = [sample for sample in samples if sample["outcome"] == OUTCOME_OK]
+    latencies = [sample["latency"] for sample in ok]
+    decode_times = [sample["decode_time"] for sample in ok]
+    rate_limited = sum(1 for sample in samples if sample["outcome"] == OUTCOME_RATE_LIMITED)
+
+    summary = {
+        "requests": count,
+        "ok": len(ok),
+        "error_rate": (count - len(ok) - rate_limited) / count if count else 0.0,
+        "rate_limit_rate": rate_limited / count if count else 0.0,
+        "throughput": len(ok) / wall_time if wall_time > 0 else 0.0,
+        "wall_time": wall_time,
+        "mean_latency": sum(latencies) / len(latencies) if latencies else None,
+        "mean_bytes": sum(sample["bytes"] for sample in ok) / len(ok) if ok else 0,
+        "mean_wire_bytes": sum(sample["wire_bytes"] for sample in ok) / len(ok) if ok else 0,
+        "decode_p50": percentile(decode_times, 50)
+    }
+    for q in BENCH_CONFIG["percentiles"]:
+        summary[f"latency_p{q}"] = percentile(latencies, q)
+    return summary
+
+
+def benchmark_call(endpoint, method, params=None, iterations=None, concurrency=None, timeout=None):
+    """Run one call iterations times at the given concurrency and summarize it"""
+
+    iterations = iterations or BENCH_CONFIG["iterations"]
+    concurrency = concurrency or BENCH_CONFIG["concurrency"]
+    timeout = timeout or BENCH_CONFIG["timeout"]
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(
+            lambda _: measure_call(endpoint, method, params, timeout), range(iterations)
+        ))
+    return summarize(samples, time.perf_counter() - start_time)
+
+
+def probe_endpoint(endpoint, suite, timeout=None):
+    """{method: sample} with one measure_call per suite call, all in flight at once
+
+    A capability check: which calls an endpoint answers, how fast and how
+    large, without the repetitions of a benchmark.
+    """
+
+    timeout = timeout or BENCH_CONFIG["timeout"]
+    with ThreadPoolExecutor(max_workers=max(1, len(suite))) as executor:
+        samples = list(executor.map(lambda call: measure_call(endpoint, call[1], call[2], timeout), suite))
+    return {method: sample for (_, method, _), sample in zip(suite, samples)}
+
+
+def benchmark_endpoints(endpoints, suite, iterations=None, concurrency=None, timeout=None):
+    """Benchmark every (name, method, params) in suite against every endpoint"""
+
+    iterations = iterations or BENCH_CONFIG["iterations"]
+    concurrency = concurrency or BENCH_CONFIG["concurrency"]
+
+    results = []
+    for endpoint in endpoints:
+        url = endpoint["url"] if isinstance(endpoint, dict) else endpoint
+        # Enough keep-alive connections that concurrency is not serialized by the pool
+        if concurrency > RPC_CONFIG["pool_maxsize"]:
+            configure_endpoint(url, pool_maxsize=concurrency)
+        for name, method, params in suite:
+            summary = benchmark_call(url, method, params, iterations, concurrency, timeout)
+            summary.update({"endpoint": url, "name": name, "method": method})
+            results.append(summary)
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "decoder": get_backend(),
+        "results": results
+    }
+
+
+def append_results(report, results_file=None):
+    """Append one benchmark report as a JSON line"""
+
+    results_file = results_file or BENCH_CONFIG["results_file"]
+    directory = os.path.dirname(results_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(results_file, 'a', encoding='utf-8') as output:
+        output.write(json.dumps(report, separators=(',', ':')) + "\n")
+    return results_file
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:8.1f}" if seconds is not None else f"{'-':>8}"
+
+
+def print_benchmark_report(report):
+    """Print a benchmark report as a table per endpoint"""
+
+    print(f"\n⏱️  RPC Benchmark ({report['iterations']} iterations, concurrency {report['concurrency']}, "
+          f"{report.get('decoder', 'json')} decoder)")
+    endpoint = None
+    for result in report["results"]:
+        if result["endpoint"] != endpoint:
+            endpoint = result["endpoint"]
+            print(f"\n🌐 {endpoint}")
+            print(f"   {'call':<18}{'p50 ms':>8}{'p90 ms':>8}{'p99 ms':>8}{'req/s':>8}"
+                  f"{'err %':>7}{'429 %':>7}{'KiB':>8}{'dec ms':>8}")
+        print(
+            f"   {result['name']:<18}{_ms(result['latency_p50'])}{_ms(result['latency_p90'])}"
+            f"{_ms(result['latency_p99'])}{result['throughput']:8.1f}{result['error_rate'] * 100:7.1f}"
+            f"{result['rate_limit_rate'] * 100:7.1f}{result['mean_bytes'] / 1024:8.1f}{_ms(result['decode_p50'])}"
+        )
+
+
+def main(argv=None, prog=None):
+    from rpc_endpoints import ROACORE_TOKEN_MINT, RPC_ENDPOINTS
+
+    parser = argparse.ArgumentParser(prog=prog, description='Benchmark Solana RPC endpoints')
+    parser.add_argument('--endpoint', action='append', default=None,
+                        help='Endpoint URL to benchmark (repeatable, default: configured endpoints)')
+    parser.add_argument('--mock', action='store_true', help='Benchmark a local mock server instead')
+    parser.add_argument('--mock-latency', type=float, default=0.0, help='Mock server latency in seconds')
+    parser.add_argument('--mock-error-rate', type=float, default=0.0, help='Mock server HTTP 503 rate')
+    parser.add_argument('--mock-rate-limit-rate', type=float, default=0.0, help='Mock server HTTP 429 rate')
+    parser.add_argument('--iterations', type=int, default=BENCH_CONFIG["iterations"],
+                        help='Requests per call (default: 20)')
+    parser.add_argument('--concurrency', type=int, default=BENCH_CONFIG["concurrency"],
+                        help='Requests in flight (default: 4)')
+    parser.add_argument('--methods', default=None,
+                        help='Comma-separated call names to run (health,slot,supply,mint_account,largest_accounts)')
+    parser.add_argument('--decoder', choices=available_backends(), default=None,
+                        help='JSON backend for response decoding (default: fastest installed)')
+    parser.add_argument('--output', default=None, help='JSON Lines file results are appended to')
+    args = parser.parse_args(argv)
+    DECODE_CONFIG["backend"] = args.decoder
+
+    token_mint = ROACORE_TOKEN_MINT
+    endpoints = args.endpoint or RPC_ENDPOINTS
+    server = None
+    if args.mock:
+        from mock_rpc_server import start_mock_server
+        server, url = start_mock_server(
+            latency=args.mock_latency, error_rate=args.mock_error_rate, rate_limit_rate=args.mock_rate_limit_rate
+        )
+        endpoints, token_mint = [url], server.chain.mint
+
+    suite = default_suite(token_mint)
+    if args.methods:
+        wanted = set(args.methods.split(","))
+        suite = [call for call in suite if call[0] in wanted]
+
+    try:
+        report = benchmark_endpoints(endpoints, suite, args.iterations, args.concurrency)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print_benchmark_report(report)
+    print(f"\n📁 Results appended to: {append_results(report, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# rpc_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_CONFIG = {
+    "max_entries": 1024,
+    # Seconds a result stays valid; methods not listed here are never cached
+    "method_ttls": {
+        # Mint account: decimals and authorities rarely change
+        "getAccountInfo": 3600,
+        "getTokenSupply": 60,
+        "getTokenLargestAccounts": 60,
+        "getProgramAccounts": 60,
+        "getMultipleAccounts": 60,
+        "getVersion": 3600
+    },
+    # Results of these methods are also dropped as soon as a newer slot is observed
+    "slot_bound_methods": {"getTokenSupply", "getTokenLargestAccounts", "getProgramAccounts"},
+    # How many slots an entry may lag behind the newest observed slot
+    "slot_tolerance": 0
+}
+
+DEFAULT_COMMITMENT = "default"
+
+
+def split_commitment(params):
+    """Return (params without commitment, commitment) for cache keying"""
+
+    params = list(params or [])
+    commitment = DEFAULT_COMMITMENT
+    if params and isinstance(params[-1], dict) and "commitment" in params[-1]:
+        config = dict(params[-1])
+        commitment = config.pop("commitment")
+        params[-1] = config
+    return params, commitment
+
+
+def cache_key(method, params):
+    """Stable key for (method, params, commitment)"""
+    params, commitment = split_commitment(params)
+    return f"{method}|{commitment}|{json.dumps(params, sort_keys=True, separators=(',', ':'))}"
+
+
+def result_slot(result):
+    """Context slot carried by an RPC result, if any"""
+    if isinstance(result, dict):
+        context = result.get("context")
+        if isinstance(context, dict):
+            return context.get("slot")
+    return None
+
+
+class SqliteCacheStore:
+    """On-disk second-level cache so back-to-back runs can share results"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS rpc_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, slot INTEGER, expires_at REAL NOT NULL)"
+            )
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, slot, expires_at FROM rpc_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def put(self, key, value, slot, expires_at):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO rpc_cache (key, value, slot, expires_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, separators=(',', ':')), slot, expires_at)
+            )
+
+    def delete(self, key):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM rpc_cache WHERE key = ?", (key,))
+
+    def latest_slot(self):
+        with self._lock:
+            row = self._connection.execute("SELECT MAX(slot) FROM rpc_cache").fetchone()
+        return row[0] if row else None
+
+    def purge_expired(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM rpc_cache WHERE expires_at < ?", (time.time(),))
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class ResponseCache:
+    """Slot-aware LRU cache of RPC results with per-method TTLs"""
+
+    def __init__(self, max_entries=None, sqlite_path=None):
+        self.max_entries = max_entries or CACHE_CONFIG["max_entries"]
+        self.entries = OrderedDict()
+        self.latest_slot = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.store = None
+        if sqlite_path:
+            self.store = SqliteCacheStore(sqlite_path)
+            self.store.purge_expired()
+            self.latest_slot = self.store.latest_slot() or 0
+
+    def is_cacheable(self, method):
+        return method in CACHE_CONFIG["method_ttls"]
+
+    def observe_slot(self, slot):
+        """Advance the newest known slot, invalidating slot-bound entries behind it"""
+        if isinstance(slot, int) and slot > self.latest_slot:
+            self.latest_slot = slot
+
+    def observe_result(self, method, result):
+        """Learn the current slot from any RPC result"""
+        if method == "getSlot":
+            self.observe_slot(result)
+        else:
+            self.observe_slot(result_slot(result))
+
+    def _is_fresh(self, method, slot, expires_at):
+        if time.time() >= expires_at:
+            return False
+        if method in CACHE_CONFIG["slot_bound_methods"] and slot is not None:
+            return slot + CACHE_CONFIG["slot_tolerance"] >= self.latest_slot
+        return True
+
+    def get(self, method, params):
+        """Cached result for a call, or None"""
+
+        if not self.is_cacheable(method):
+            return None
+        key = cache_key(method, params)
+
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+
+        if entry is None and self.store is not None:
+            entry = self.store.get(key)
+            if entry is not None:
+                self._remember(key, entry)
+
+        if entry is not None and self._is_fresh(method, entry[1], entry[2]):
+            self.hits += 1
+            return entry[0]
+
+        if entry is not None:
+            self.invalidate(method, params)
+        self.misses += 1
+        return None
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def put(self, method, params, result):
+        """Store a fresh result"""
+
+        self.observe_result(method, result)
+        if not self.is_cacheable(method):
+            return
+
+        key = cache_key(method, params)
+        entry = (result, result_slot(result), time.time() + CACHE_CONFIG["method_ttls"][method])
+        self._remember(key, entry)
+        if self.store is not None:
+            self.store.put(key, *entry)
+
+    def invalidate(self, method, params):
+        """Drop one cached call"""
+
+        key = cache_key(method, params)
+        with self._lock:
+            self.entries.pop(key, None)
+        if self.store is not None:
+            self.store.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "latest_slot": self.latest_slot
+        }
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
@@ -0,0 +1,151 @@
+# rpc_cassette.py
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict, deque
+
+from rpc_client import RpcClientError
+
+CASSETTE_CONFIG = {
+    # Delay added to every replayed response: None (instant), "recorded" or seconds
+    "latency": None,
+    # gzip level for recorded cassettes; large getProgramAccounts bodies compress ~4x
+    "compression_level": 6
+}
+
+CASSETTE_VERSION = 1
+
+
+class CassetteMissError(RpcClientError):
+    """Replayed request that the cassette has no recording for (never retried)"""
+
+
+def request_key(payload):
+    """Canonical key for a JSON-RPC payload or batch, ignoring request ids"""
+    calls = payload if isinstance(payload, list) else [payload]
+    return json.dumps(
+        [[call["method"], call.get("params")] for call in calls], sort_keys=True, separators=(',', ':')
+    )
+
+
+def _request_ids(payload):
+    return [call.get("id") for call in payload] if isinstance(payload, list) else payload.get("id")
+
+
+class ReplayResponse:
+    """Recorded HTTP response with the attributes rpc_client reads"""
+
+    __slots__ = ("status_code", "headers", "content")
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+
+class Cassette:
+    """Recorded JSON-RPC exchanges for deterministic offline runs
+
+    A cassette is a gzip stream of records, each a JSON header line
+    (endpoint, request key, ids, status, headers, elapsed, body length)
+    followed by the raw response body, so multi-megabyte bodies are stored
+    and replayed byte for byte without being re-encoded.
+
+    In replay mode requests are matched by method and params, not by
+    endpoint or id; identical requests are answered in recorded order and
+    the last recording repeats once they run out. Batch replies get their
+    ids rewritten to the new request ids; single replies are returned as
+    recorded (call_rpc does not check ids).
+    """
+
+    def __init__(self, path, mode="replay", latency=None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = CASSETTE_CONFIG["latency"] if latency is None else latency
+        self._lock = threading.Lock()
+        self._recordings = defaultdict(deque)
+        self._file = None
+        self.records = 0
+        self.misses = 0
+
+        if mode == "record":
+            self._file = gzip.open(path, "wb", compresslevel=CASSETTE_CONFIG["compression_level"])
+            self._write_header({"version": CASSETTE_VERSION, "created": time.time()})
+        else:
+            self._load()
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    def _write_header(self, header):
+        self._file.write(json.dumps(header, separators=(',', ':')).encode() + b"\n")
+
+    def _load(self):
+        with gzip.open(self.path, "rb") as cassette:
+            version = json.loads(cassette.readline()).get("version")
+            if version != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version {version} in {self.path}")
+            for line in cassette:
+                header = json.loads(line)
+                header["body"] = cassette.read(header.pop("length"))
+                self._recordings[header["key"]].append(header)
+                self.records += 1
+
+    def record(self, endpoint, payload, response, elapsed):
+        """Append one exchange (recording mode)"""
+
+        body = response.content
+        header = {
+            "endpoint": endpoint, "key": request_key(payload), "ids": _request_ids(payload),
+            "status": response.status_code, "elapsed": round(elapsed, 6), "length": len(body)
+        }
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            header["headers"] = {"Retry-After": retry_after}
+        with self._lock:
+            self._write_header(header)
+            self._file.write(body)
+            self.records += 1
+
+    def replay(self, endpoint, payload):
+        """Recorded response for a payload (replay mode)"""
+
+        key = request_key(payload)
+        with self._lock:
+            queue = self._recordings.get(key)
+            if not queue:
+                self.misses += 1
+                raise CassetteMissError(f"No recorded response for {key[:200]}", endpoint, 0.0)
+            recording = queue.popleft() if len(queue) > 1 else queue[0]
+
+        delay = recording["elapsed"] if self.latency == "recorded" else self.latency
+        if delay:
+            time.sleep(delay)
+
+        body = recording["body"]
+        new_ids = _request_ids(payload)
+        if isinstance(payload, list) and new_ids != recording["ids"] and recording["status"] == 200:
+            id_map = dict(zip(recording["ids"], new_ids))
+            replies = json.loads(body)
+            if isinstance(replies, list):
+                for reply in replies:
+                    reply["id"] = id_map.get(reply.get("id"), reply.get("id"))
+                body = json.dumps(replies, separators=(',', ':')).encode()
+        return ReplayResponse(recording["status"], recording.get("headers", {}), body)
+
+    def close(self):
+        if self._file is not None:
+            with self._lock:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
@@ -0,0 +1,401 @@
+# rpc_client.py
+import itertools
+import threading
+import time
+
+from instrumentation import is_enabled as instrumentation_enabled, span, timed_pool_classes
+from lazy_import import lazy_module
+from rpc_decode import decode_response, loads
+
+try:
+    import brotli  # noqa: F401  (urllib3 decodes "br" when a brotli module is installed)
+    BROTLI_AVAILABLE = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+
+# Loaded with the first session, so offline commands never import the HTTP stack
+requests = lazy_module("requests")
+
+# Shared client configuration
+RPC_CONFIG = {
+    "pool_connections": 4,
+    "pool_maxsize": 10,
+    "compression": True,
+    "user_agent": "roacore-holder-query",
+    # Per-endpoint overrides: {url: {"pool_connections": n, "pool_maxsize": n}}
+    "endpoint_pools": {}
+}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_request_ids = itertools.count(1)
+_call_observers = []
+_response_cache = None
+_cassette = None
+
+
+class RpcClientError(Exception):
+    """Base class for RPC client failures"""
+
+    def __init__(self, message, endpoint=None, response_time=None):
+        super().__init__(message)
+        self.endpoint = endpoint
+        self.response_time = response_time
+
+
+class RpcTimeoutError(RpcClientError):
+    """Request did not complete within its timeout"""
+
+
+class RpcConnectionError(RpcClientError):
+    """Endpoint could not be reached"""
+
+
+class RpcHttpError(RpcClientError):
+    """Endpoint answered with a non-200 HTTP status"""
+
+    def __init__(self, status_code, endpoint=None, response_time=None, retry_after=None):
+        super().__init__(f"HTTP Error: {status_code}", endpoint, response_time)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class RpcError(RpcClientError):
+    """JSON-RPC error object returned by the endpoint"""
+
+    def __init__(self, error, endpoint=None, response_time=None):
+        super().__init__(f"RPC Error: {error}", endpoint, response_time)
+        self.error = error
+        self.code = error.get('code') if isinstance(error, dict) else None
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds to wait"""
+
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    # HTTP-date form is rare, keep email off the import path
+    import email.utils
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def http_error(response, endpoint, response_time):
+    """Build an RpcHttpError from a non-200 response"""
+    return RpcHttpError(
+        response.status_code, endpoint, response_time,
+        retry_after=parse_retry_after(response.headers.get("Retry-After"))
+    )
+
+
+def accept_encoding():
+    """Accept-Encoding header value for the current compression setting"""
+    if not RPC_CONFIG["compression"]:
+        return "identity"
+    return "gzip, deflate, br" if BROTLI_AVAILABLE else "gzip, deflate"
+
+
+def _pool_settings(endpoint):
+    overrides = RPC_CONFIG["endpoint_pools"].get(endpoint, {})
+    return (
+        overrides.get("pool_connections", RPC_CONFIG["pool_connections"]),
+        overrides.get("pool_maxsize", RPC_CONFIG["pool_maxsize"])
+    )
+
+
+def _create_session(endpoint):
+    from requests.adapters import HTTPAdapter
+
+    pool_connections, pool_maxsize = _pool_settings(endpoint)
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    if instrumentation_enabled():
+        # Time DNS/TCP connect and TLS handshakes of new pooled connections
+        adapter.poolmanager.pool_classes_by_scheme = timed_pool_classes()
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Content-Type": "application/json",
+        "Accept-Encoding": accept_encoding(),
+        "User-Agent": RPC_CONFIG["user_agent"],
+        "Connection": "keep-alive"
+    })
+    return session
+
+
+def get_session(endpoint):
+    """Return the keep-alive session for an endpoint, creating it on first use"""
+
+    session = _sessions.get(endpoint)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(endpoint)
+            if session is None:
+                session = _create_session(endpoint)
+                _sessions[endpoint] = session
+    return session
+
+
+def configure_endpoint(endpoint, pool_connections=None, pool_maxsize=None):
+    """Override connection pool sizes for a single endpoint"""
+
+    overrides = RPC_CONFIG["endpoint_pools"].setdefault(endpoint, {})
+    if pool_connections is not None:
+        overrides["pool_connections"] = pool_connections
+    if pool_maxsize is not None:
+        overrides["pool_maxsize"] = pool_maxsize
+
+    # Rebuild the session so the new pool sizes take effect
+    with _sessions_lock:
+        session = _sessions.pop(endpoint, None)
+    if session is not None:
+        session.close()
+
+
+def close_sessions():
+    """Close every pooled session"""
+
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+def add_call_observer(callback):
+    """Register callback(endpoint, method, response_time, error) to run after every call"""
+    if callback not in _call_observers:
+        _call_observers.append(callback)
+
+
+def remove_call_observer(callback):
+    """Unregister a call observer"""
+    if callback in _call_observers:
+        _call_observers.remove(callback)
+
+
+def notify_call(endpoint, method, response_time, error=None):
+    """Report a finished call (error is None on success) to every observer
+
+    Replayed calls are not reported: their latencies and cassette misses say
+    nothing about the endpoint.
+    """
+    if _cassette is not None and _cassette.replaying:
+        return
+    for callback in _call_observers:
+        callback(endpoint, method, response_time, error)
+
+
+def notify_batch(endpoint, calls, response_time, results=None, error=None):
+    """Report each item of a finished batch to the observers"""
+    for index, (method, _) in enumerate(calls):
+        item_error = error
+        if item_error is None and isinstance(results[index], RpcError):
+            item_error = results[index]
+        notify_call(endpoint, method, response_time, item_error)
+
+
+def install_cache(cache):
+    """Put a response cache (see rpc_cache.ResponseCache) in front of every call; None removes it"""
+    global _response_cache
+    _response_cache = cache
+
+
+def get_cache():
+    """Currently installed response cache, or None"""
+    return _response_cache
+
+
+def cache_lookup(method, params=None):
+    """Cached result for a call, or None on a miss or without a cache"""
+    cache = _response_cache
+    return cache.get(method, params) if cache is not None else None
+
+
+def install_cassette(cassette):
+    """Record or replay all traffic through a cassette (see rpc_cassette.Cassette); None removes it"""
+    global _cassette
+    _cassette = cassette
+
+
+def get_cassette():
+    """Currently installed cassette, or None"""
+    return _cassette
+
+
+def build_payload(method, params=None, request_id=None):
+    """Build a JSON-RPC 2.0 request object"""
+
+    payload = {
+        "jsonrpc": "2.0",
+        "id": request_id if request_id is not None else next(_request_ids),
+        "method": method
+    }
+    if params:
+        payload["params"] = params
+    return payload
+
+
+def post_rpc(endpoint, payload, timeout=60):
+    """POST a JSON-RPC payload over the pooled session and return the raw response
+
+    With a cassette installed the response is recorded, or replayed
+    without touching the network.
+    """
+
+    cassette = _cassette
+    if cassette is not None and cassette.replaying:
+        with span("rpc.replay", endpoint=endpoint):
+            return cassette.replay(endpoint, payload)
+
+    start_time = time.time()
+    try:
+        if not instrumentation_enabled():
+            response = get_session(endpoint).post(endpoint, json=payload, timeout=timeout)
+        else:
+            # Headers first, then the body, so server time and download are timed apart
+            with span("rpc.request", endpoint=endpoint):
+                response = get_session(endpoint).post(endpoint, json=payload, timeout=timeout, stream=True)
+            with span("rpc.download", endpoint=endpoint) as download:
+                download.set("bytes", len(response.content))
+    except requests.exceptions.Timeout:
+        response_time = time.time() - start_time
+        raise RpcTimeoutError(f"Timeout after {response_time:.2f} seconds", endpoint, response_time)
+    except requests.exceptions.ConnectionError:
+        raise RpcConnectionError("Connection Error", endpoint, time.time() - start_time)
+
+    if cassette is not None:
+        cassette.record(endpoint, payload, response, time.time() - start_time)
+    return response
+
+
+def parse_rpc_response(body, endpoint=None, response_time=None):
+    """Return the result of a decoded JSON-RPC response or raise its error"""
+    if 'error' in body:
+        raise RpcError(body['error'], endpoint, response_time)
+    return body['result']
+
+
+def parse_batch_response(payloads, body, endpoint=None, response_time=None):
+    """Match decoded batch replies to their requests by id"""
+
+    # Endpoints without batch support answer with a single error object
+    if isinstance(body, dict):
+        raise RpcError(body.get('error', body), endpoint, response_time)
+
+    # Demultiplex by id, responses may arrive in any order
+    by_id = {item.get('id'): item for item in body}
+    results = []
+    for payload in payloads:
+        item = by_id.get(payload['id'])
+        if item is None:
+            results.append(RpcError({"message": "Missing batch response"}, endpoint, response_time))
+        elif 'error' in item:
+            results.append(RpcError(item['error'], endpoint, response_time))
+        else:
+            results.append(item['result'])
+    return results
+
+
+def call_rpc(endpoint, method, params=None, timeout=60, use_cache=True, typed=False):
+    """Call a JSON-RPC method and return (result, response_time)
+
+    With use_cache=False the cache is not consulted (the caller already
+    missed it) but the fresh result is still stored. typed=True lets bulk
+    methods decode into structs (see rpc_decode); such results bypass the
+    cache entirely.
+    """
+
+    start_time = time.time()
+    cache = _response_cache if not typed else None
+    if cache is not None and use_cache:
+        cached = cache.get(method, params)
+        if cached is not None:
+            return cached, time.time() - start_time
+
+    try:
+        response = post_rpc(endpoint, build_payload(method, params), timeout=timeout)
+
+        if response.status_code != 200:
+            raise http_error(response, endpoint, time.time() - start_time)
+
+        with span("rpc.decode", method=method):
+            body = decode_response(response.content, method, typed)
+        response_time = time.time() - start_time
+        result = parse_rpc_response(body, endpoint, response_time)
+    except RpcClientError as e:
+        notify_call(endpoint, method, e.response_time, e)
+        raise
+
+    notify_call(endpoint, method, response_time)
+    if cache is not None:
+        cache.put(method, params, result)
+    return result, response_time
+
+
+def call_rpc_batch(endpoint, calls, timeout=60, use_cache=True):
+    """Send independent calls as one JSON-RPC batch and return (results, response_time)
+
+    calls is a list of (method, params) tuples. results is aligned with calls;
+    each item is either the method result or an RpcError for that item.
+    Calls answered by the response cache are left out of the request; with
+    use_cache=False every call is sent and fresh results are still stored.
+    """
+
+    start_time = time.time()
+    cache = _response_cache
+    results = [None] * len(calls)
+    pending = list(range(len(calls)))
+    if cache is not None and use_cache:
+        pending = []
+        for index, (method, params) in enumerate(calls):
+            cached = cache.get(method, params)
+            if cached is None:
+                pending.append(index)
+            else:
+                results[index] = cached
+        if not pending:
+            return results, time.time() - start_time
+
+    sent_calls = [calls[index] for index in pending]
+    payloads = [build_payload(method, params) for method, params in sent_calls]
+
+    try:
+        response = post_rpc(endpoint, payloads, timeout=timeout)
+
+        if response.status_code != 200:
+            raise http_error(response, endpoint, time.time() - start_time)
+
+        with span("rpc.decode", method="batch"):
+            body = loads(response.content)
+        response_time = time.time() - start_time
+        sent_results = parse_batch_response(payloads, body, endpoint, response_time)
+    except RpcClientError as e:
+        notify_batch(endpoint, sent_calls, e.response_time, error=e)
+        raise
+
+    notify_batch(endpoint, sent_calls, response_time, sent_results)
+    for index, result in zip(pending, sent_results):
+        results[index] = result
+        if cache is not None and not isinstance(result, RpcError):
+            cache.put(calls[index][0], calls[index][1], result)
+    return results, response_time
+
+
+def unwrap_batch_result(result):
+    """Raise the per-item error of a batch result, otherwise return it"""
+    if isinstance(result, RpcError):
+        raise result
+    return result
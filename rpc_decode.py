@@ -0,0 +1,152 @@
+# rpc_decode.py
+import json
+
+from lazy_import import lazy_module, module_available
+
+# Both are imported by the first decode that uses them
+MSGSPEC_AVAILABLE = module_available("msgspec")
+ORJSON_AVAILABLE = module_available("orjson")
+msgspec = lazy_module("msgspec")
+orjson = lazy_module("orjson")
+
+BACKEND_MSGSPEC = "msgspec"
+BACKEND_ORJSON = "orjson"
+BACKEND_JSON = "json"
+
+DECODE_CONFIG = {
+    # None picks the fastest installed backend: msgspec, then orjson, then json
+    "backend": None
+}
+
+# Methods with typed msgspec responses: payloads reach megabytes only here;
+# small responses such as getTokenSupply gain nothing from structs.
+TYPED_METHODS = ("getProgramAccounts",)
+
+_decoders = {}
+
+
+def available_backends():
+    """Installed JSON backends, fastest first"""
+    backends = []
+    if MSGSPEC_AVAILABLE:
+        backends.append(BACKEND_MSGSPEC)
+    if ORJSON_AVAILABLE:
+        backends.append(BACKEND_ORJSON)
+    backends.append(BACKEND_JSON)
+    return backends
+
+
+def get_backend():
+    """Backend used by loads()"""
+
+    backend = DECODE_CONFIG["backend"]
+    if backend is None:
+        return available_backends()[0]
+    if backend not in available_backends():
+        raise RuntimeError(f"JSON backend {backend} is not installed")
+    return backend
+
+
+def _msgspec_decoder(method=None):
+    """Cached msgspec decoder: generic for None, typed for a TYPED_METHODS entry"""
+
+    decoder = _decoders.get(method)
+    if decoder is not None:
+        return decoder
+    if method is None:
+        decoder = msgspec.json.Decoder()
+    else:
+        decoder = msgspec.json.Decoder(_program_accounts_response_type())
+    return _decoders.setdefault(method, decoder)
+
+
+def _program_accounts_response_type():
+    """Struct types for getProgramAccounts, defined on first use"""
+
+    from typing import Any, Dict, List, Optional, Tuple, Union
+
+    # Only the fields the holder code reads; msgspec skips everything else
+    # (lamports, rentEpoch, space, ...) without building objects for it.
+    class RpcContext(msgspec.Struct):
+        slot: int
+
+    class AccountInfo(msgspec.Struct):
+        # [base64 text, "base64"]; bytes are decoded only where they are consumed
+        data: Tuple[str, str]
+
+    class KeyedAccount(msgspec.Struct):
+        pubkey: str
+        account: AccountInfo
+
+    class KeyedAccountsWithContext(msgspec.Struct):
+        context: RpcContext
+        value: List[KeyedAccount]
+
+    class ProgramAccountsResponse(msgspec.Struct):
+        result: Union[List[KeyedAccount], KeyedAccountsWithContext, None] = None
+        error: Optional[Dict[str, Any]] = None
+
+    return ProgramAccountsResponse
+
+
+def loads(data):
+    """Decode a JSON document (bytes or str) into builtins with the configured backend"""
+
+    backend = get_backend()
+    if backend == BACKEND_MSGSPEC:
+        return _msgspec_decoder().decode(data)
+    if backend == BACKEND_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def supports_typed(method):
+    """True if decode_response(..., typed=True) returns structs for this method"""
+    return method in TYPED_METHODS and get_backend() == BACKEND_MSGSPEC
+
+
+def decode_response(data, method=None, typed=False):
+    """Decode a JSON-RPC response body into a {"result"} or {"error"} dict
+
+    With typed=True, getProgramAccounts results are msgspec structs (read
+    them with iter_keyed_accounts and context_slot) when msgspec is the active
+    backend; anything else, including responses that do not match the
+    structs (e.g. jsonParsed encoding), decodes to plain dicts.
+    """
+
+    if typed and supports_typed(method):
+        try:
+            envelope = _msgspec_decoder(method).decode(data)
+        except msgspec.ValidationError:
+            return loads(data)
+        if envelope.error is not None:
+            return {"error": envelope.error}
+        return {"result": envelope.result}
+    return loads(data)
+
+
+def context_slot(result):
+    """Context slot of a withContext result in either shape, or None"""
+
+    if isinstance(result, dict):
+        return result.get('context', {}).get('slot')
+    context = getattr(result, 'context', None)
+    return context.slot if context is not None else None
+
+
+def iter_keyed_accounts(result):
+    """Yield (pubkey, base64 data) from getProgramAccounts results in either shape
+
+    Accepts the plain list and the withContext {"context", "value"} shape,
+    decoded as dicts or as structs. Account data is left as base64 text.
+    """
+
+    if isinstance(result, dict):
+        result = result['value']
+    elif not isinstance(result, list):
+        result = result.value
+
+    if result and not isinstance(result[0], dict):
+        return ((account.pubkey, account.account.data[0]) for account in result)
+    return ((account['pubkey'], account['account']['data'][0]) for account in result)
+
@@ -0,0 +1,55 @@
+# rpc_endpoints.py
+ROACORE_TOKEN_MINT = "5tB5D6DGJMxxHYmNkfJNG237x6pZGEwTzGpUUh62yQJ7"
+
+# Shared by every tool; patch or extend this list in place to add endpoints
+RPC_ENDPOINTS = [
+    {
+        "url": "https://api.mainnet-beta.solana.com",
+        "name": "Solana Official RPC",
+        "type": "Public"
+    },
+    {
+        "url": "https://rpc.ankr.com/solana",
+        "name": "Ankr RPC",
+        "type": "Public"
+    }
+    # Add your premium RPC here (QuickNode, Helius, ...)
+    # {
+    #     "url": "https://your-premium-rpc-url.com/",
+    #     "name": "Premium RPC",
+    #     "type": "Premium"
+    # }
+]
+
+
+def endpoint_urls(endpoints=None):
+    return [endpoint_info["url"] for endpoint_info in endpoints or RPC_ENDPOINTS]
+
+
+def call_solana_rpc_with_timing(endpoint, method, params=None, timeout=60, max_attempts=None,
+                                deadline=None, log=None):
+    """Call Solana RPC under the retry policy, printing the response time
+
+    log(message, level) receives the call and retry messages; without it
+    only retries are printed.
+    """
+
+    # Keeps the HTTP client off the import path of this module
+    from retry_policy import call_rpc_with_retry, classify_error
+
+    def log_retry(attempt, error, delay):
+        message = f"{error} ({classify_error(error)}), retrying in {delay:.2f}s"
+        if log is not None:
+            log(message, "WARNING")
+        else:
+            print(f"   ⚠️  {message}")
+
+    if log is not None:
+        log(f"Calling {method}", "INFO")
+    result, response_time = call_rpc_with_retry(
+        endpoint, method, params, timeout=timeout, max_attempts=max_attempts, deadline=deadline,
+        on_retry=log_retry
+    )
+
+    print(f"   Response time: {response_time:.2f}s")
+    return result, response_time
@@ -0,0 +1,145 @@
+# slot_snapshot.py
+from retry_policy import ERROR_FATAL, classify_error
+from rpc_client import RpcError, call_rpc_batch
+from rpc_decode import context_slot
+
+SNAPSHOT_CONFIG = {
+    # Every pinned read uses this commitment; consistency comes from the common slot, not from finalized
+    "commitment": "confirmed",
+    # Re-read rounds for pieces behind the pin before the snapshot is reported inconsistent
+    "max_rounds": 3,
+    # A piece may trail the pin by this many slots and still count as consistent
+    "slot_tolerance": 0,
+    # Methods whose config accepts minContextSlot; nodes ignore it for the rest (getTokenSupply,
+    # getTokenLargestAccounts), which only converge by re-reading until their context slot reaches the pin
+    "pinnable_methods": ("getAccountInfo", "getMultipleAccounts", "getProgramAccounts")
+}
+
+
+def pin_params(params, commitment=None, min_context_slot=None):
+    """Copy of params with commitment and minContextSlot set in the trailing config object"""
+
+    params = list(params or [])
+    config = dict(params.pop()) if params and isinstance(params[-1], dict) else {}
+    if commitment is not None:
+        config["commitment"] = commitment
+    if min_context_slot is not None:
+        config["minContextSlot"] = min_context_slot
+    params.append(config)
+    return params
+
+
+class PinnedSnapshot:
+    """Named RPC reads that all describe the same context slot
+
+    pieces maps a name to (method, params) of a method whose result carries
+    a context slot. The first round reads every piece in one batch; the
+    highest slot seen becomes the pin. Then only the stale pieces (behind
+    the pin, or failed with a retryable error) are read again in one batch,
+    until none is left or max_rounds is spent. Methods that accept it get
+    minContextSlot=pin, so a lagging node answers with an error instead of
+    old data; the others are simply re-read until their context slot
+    reaches the pin. A re-read can land past the pin as the chain advances,
+    which moves the pin forward and makes the other pieces stale. The pin
+    never moves back. min_context_slot starts the pin at a slot already
+    known. Reads never come from the response cache, which may hold
+    answers from older slots.
+    """
+
+    def __init__(self, endpoint, pieces, commitment=None, timeout=60, slot_tolerance=None,
+                 min_context_slot=None):
+        self.endpoint = endpoint
+        self.pieces = dict(pieces)
+        self.commitment = commitment or SNAPSHOT_CONFIG["commitment"]
+        self.timeout = timeout
+        self.slot_tolerance = SNAPSHOT_CONFIG["slot_tolerance"] if slot_tolerance is None else slot_tolerance
+        self.results = {}
+        self.slots = {}
+        self.errors = {}
+        self.pin = min_context_slot
+        self.rounds = 0
+        self.refetched = 0
+        self.response_time = 0.0
+
+    def _read(self, names):
+        pinnable = SNAPSHOT_CONFIG["pinnable_methods"]
+        calls = [
+            (method, pin_params(params, self.commitment, self.pin if method in pinnable else None))
+            for method, params in (self.pieces[name] for name in names)
+        ]
+        results, response_time = call_rpc_batch(self.endpoint, calls, timeout=self.timeout, use_cache=False)
+        self.rounds += 1
+        self.response_time += response_time
+
+        for name, result in zip(names, results):
+            if isinstance(result, RpcError):
+                # An earlier result is kept; the piece stays stale
+                self.errors[name] = result
+                continue
+            self.errors.pop(name, None)
+            self.results[name] = result
+            self.slots[name] = context_slot(result)
+            if self.slots[name] is not None and (self.pin is None or self.slots[name] > self.pin):
+                self.pin = self.slots[name]
+
+    def lagging(self):
+        """Pieces whose latest result is from a slot behind the pin"""
+        return [
+            name for name, slot in self.slots.items()
+            if slot is not None and slot + self.slot_tolerance < self.pin
+        ]
+
+    def stale(self):
+        """Pieces to re-read: lagging, or failed with a retryable error"""
+
+        stale = []
+        lagging = self.lagging()
+        for name in self.pieces:
+            error = self.errors.get(name)
+            if error is not None:
+                if classify_error(error) != ERROR_FATAL:
+                    stale.append(name)
+            elif name in lagging:
+                stale.append(name)
+        return stale
+
+    @property
+    def consistent(self):
+        """True when nothing is left to re-read (pieces that failed for good are not counted)"""
+        return not self.stale()
+
+    def slot_range(self):
+        slots = [slot for slot in self.slots.values() if slot is not None]
+        return (min(slots), max(slots)) if slots else (None, None)
+
+    def run(self, max_rounds=None):
+        """Read every piece, then re-read the stale ones for up to max_rounds extra rounds"""
+
+        max_rounds = SNAPSHOT_CONFIG["max_rounds"] if max_rounds is None else max_rounds
+        self._read(list(self.pieces))
+        for _ in range(max_rounds):
+            names = self.stale()
+            if not names:
+                break
+            self.refetched += len(names)
+            self._read(names)
+        return self
+
+    def result(self, name):
+        """Latest result of one piece; raises its error if it was never read"""
+        if name not in self.results:
+            raise self.errors[name]
+        return self.results[name]
+
+    def summary(self):
+        """Slot consistency details for reports and metadata"""
+        low, high = self.slot_range()
+        return {
+            "slot": self.pin,
+            "slot_consistent": self.consistent,
+            "slot_spread": high - low if low is not None else None,
+            "context_slots": dict(self.slots),
+            "pinned_rounds": self.rounds,
+            "pinned_refetches": self.refetched,
+            "commitment": self.commitment
+        }
@@ -0,0 +1,235 @@
+# snapshot_store.py
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+
+from base58 import b58decode, b58encode
+from holder_stats import STATS_CONFIG, top_n_sum
+from holder_table import PUBKEY_LENGTH, HolderTable, np, use_numpy
+from lazy_import import lazy_module, module_available
+
+PYARROW_AVAILABLE = module_available("pyarrow")
+pa = lazy_module("pyarrow")
+
+STORE_CONFIG = {
+    "root": os.path.join("output", "snapshots"),
+    "history_days": 30
+}
+
+SNAPSHOT_MAGIC = b"HSNP"
+SNAPSHOT_VERSION = 1
+# magic, version, decimals, slot, unix timestamp, row count, raw total supply
+SNAPSHOT_HEADER = struct.Struct("<4sHBxQdQQ")
+AMOUNT_SIZE = 8
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def write_snapshot(path, table, slot, decimals, total_supply_raw, timestamp):
+    """Write a holder table as one columnar snapshot file
+
+    Layout after the header: the address column (32 raw bytes per row, sorted
+    so lookups can binary-search the mapped file), the owner column (32 bytes
+    per row) and the u64 amount column, all little-endian and 8-byte aligned.
+    """
+
+    addresses = [b58decode(address, PUBKEY_LENGTH) for address in table.addresses]
+    order = sorted(range(len(addresses)), key=addresses.__getitem__)
+    owners = table.owners
+
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'wb') as snapshot_file:
+        snapshot_file.write(SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, decimals, slot or 0, timestamp, len(order), total_supply_raw
+        ))
+        snapshot_file.write(b''.join(addresses[row] for row in order))
+        snapshot_file.write(b''.join(owners[row * PUBKEY_LENGTH:(row + 1) * PUBKEY_LENGTH] for row in order))
+        snapshot_file.write(array('Q', (table.amounts[row] for row in order)).tobytes())
+    os.replace(temp_file, path)
+
+
+class SnapshotReader:
+    """Memory-mapped, read-only view of one snapshot file
+
+    Nothing is parsed up front: single-address lookups binary-search the
+    mapped address column and amounts_view() wraps the mapped amount column
+    without copying.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.decimals, self.slot, self.timestamp,
+         self.count, self.total_supply_raw) = SNAPSHOT_HEADER.unpack_from(self._map, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"Not a version {SNAPSHOT_VERSION} snapshot file: {path}")
+
+        self._addresses_at = SNAPSHOT_HEADER.size
+        self._owners_at = self._addresses_at + self.count * PUBKEY_LENGTH
+        self._amounts_at = self._owners_at + self.count * PUBKEY_LENGTH
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        try:
+            self._map.close()
+        except BufferError:
+            # A NumPy view still references the mapping; it is released with it
+            pass
+        self._file.close()
+
+    def address_bytes(self, row):
+        start = self._addresses_at + row * PUBKEY_LENGTH
+        return self._map[start:start + PUBKEY_LENGTH]
+
+    def amount_at(self, row):
+        start = self._amounts_at + row * AMOUNT_SIZE
+        return int.from_bytes(self._map[start:start + AMOUNT_SIZE], 'little')
+
+    def find(self, address):
+        """Row of a base58 address, or None"""
+
+        key = b58decode(address, PUBKEY_LENGTH)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.address_bytes(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self.address_bytes(low) == key:
+            return low
+        return None
+
+    def amount_of(self, address):
+        """Raw amount held by an address in this snapshot (0 if absent)"""
+        row = self.find(address)
+        return 0 if row is None else self.amount_at(row)
+
+    def amounts_view(self):
+        """Raw amounts as a zero-copy NumPy view of the mapping, or an array('Q') copy"""
+        if use_numpy(self.count):
+            return np.frombuffer(self._map, dtype=np.uint64, count=self.count, offset=self._amounts_at)
+        amounts = array('Q')
+        amounts.frombytes(self._map[self._amounts_at:self._amounts_at + self.count * AMOUNT_SIZE])
+        return amounts
+
+    def to_table(self):
+        """Load the whole snapshot into a HolderTable"""
+
+        table = HolderTable()
+        table.addresses = [b58encode(self.address_bytes(row)) for row in range(self.count)]
+        table.owners = bytearray(self._map[self._owners_at:self._amounts_at])
+        table.amounts.frombytes(self._map[self._amounts_at:self._amounts_at + self.count * AMOUNT_SIZE])
+        return table
+
+    def to_arrow(self):
+        """Snapshot as a pyarrow Table (requires pyarrow)"""
+
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("pyarrow is not installed")
+        table = self.to_table()
+        return pa.table({
+            "address": table.addresses,
+            "owner": [table.owner_at(row) for row in range(len(table))],
+            "amount": pa.array(table.amounts, type=pa.uint64())
+        })
+
+
+class SnapshotStore:
+    """Append-only per-mint store of holder snapshots
+
+    Each run adds one columnar snapshot file plus one manifest line holding
+    its slot, time and precomputed top-N totals, so concentration history is
+    answered from the manifest alone and balance history maps one file per
+    snapshot without parsing it.
+    """
+
+    def __init__(self, token_mint, root=None):
+        self.token_mint = token_mint
+        self.directory = os.path.join(root or STORE_CONFIG["root"], token_mint)
+        self.manifest_file = os.path.join(self.directory, MANIFEST_NAME)
+
+    def append(self, table, slot, decimals, total_supply_raw, timestamp=None):
+        """Store a snapshot of a holder table and return its manifest entry"""
+
+        timestamp = time.time() if timestamp is None else timestamp
+        os.makedirs(self.directory, exist_ok=True)
+        filename = f"{slot or 0:012d}_{int(timestamp * 1000)}.snap"
+        write_snapshot(os.path.join(self.directory, filename), table, slot, decimals, total_supply_raw, timestamp)
+
+        amounts = table.amounts_view()
+        entry = {
+            "file": filename,
+            "slot": slot,
+            "timestamp": timestamp,
+            "decimals": decimals,
+            "holders": len(table),
+            "total_supply_raw": total_supply_raw,
+            "total_held_amount": table.total_amount(),
+            "top_amounts": {str(top): top_n_sum(amounts, top) for top in STATS_CONFIG["top_ns"]}
+        }
+        with open(self.manifest_file, 'a', encoding='utf-8') as manifest:
+            manifest.write(json.dumps(entry, separators=(',', ':')) + "\n")
+        return entry
+
+    def entries(self, since=None, until=None):
+        """Manifest entries in write order, optionally within [since, until] unix times"""
+
+        if not os.path.exists(self.manifest_file):
+            return []
+        entries = []
+        with open(self.manifest_file, 'r', encoding='utf-8') as manifest:
+            for line in manifest:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn last line from an interrupted append
+                    continue
+                if since is not None and entry["timestamp"] < since:
+                    continue
+                if until is not None and entry["timestamp"] > until:
+                    continue
+                entries.append(entry)
+        return entries
+
+    def latest(self):
+        entries = self.entries()
+        return entries[-1] if entries else None
+
+    def open(self, entry):
+        """Memory-map the snapshot file of a manifest entry"""
+        return SnapshotReader(os.path.join(self.directory, entry["file"]))
+
+    def balance_history(self, address, since=None, until=None):
+        """[(slot, timestamp, raw amount)] for one address across stored snapshots"""
+
+        history = []
+        for entry in self.entries(since, until):
+            with self.open(entry) as reader:
+                history.append((entry["slot"], entry["timestamp"], reader.amount_of(address)))
+        return history
+
+    def concentration_history(self, top_n=20, since=None, until=None):
+        """[(slot, timestamp, top-N share of supply in %)] across stored snapshots"""
+
+        history = []
+        for entry in self.entries(since, until):
+            top_amount = entry["top_amounts"].get(str(top_n))
+            if top_amount is None:
+                with self.open(entry) as reader:
+                    top_amount = top_n_sum(reader.amounts_view(), top_n)
+            total = entry["total_supply_raw"] or entry["total_held_amount"]
+            history.append((entry["slot"], entry["timestamp"], top_amount * 100 / total if total else 0.0))
+        return history
@@ -0,0 +1,86 @@
+# test_async_rpc.py
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+import async_rpc
+import rpc_client
+from rpc_cache import ResponseCache
+
+
+class FakeResponse:
+
+    def __init__(self, body):
+        self.status = 200
+        self.headers = {}
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def read(self):
+        return self.body
+
+
+class FakeSession:
+    """Stands in for the aiohttp session: answers every batch item with its method name"""
+
+    def __init__(self):
+        self.posts = []
+
+    def post(self, endpoint, json=None):
+        self.posts.append(json)
+        payloads = json if isinstance(json, list) else [json]
+        return FakeResponse(_encode([
+            {"jsonrpc": "2.0", "id": payload["id"], "result": {"context": {"slot": 1}, "value": payload["method"]}}
+            for payload in payloads
+        ]))
+
+
+def _encode(replies):
+    return json.dumps(replies).encode()
+
+
+class BatchMethodTest(unittest.TestCase):
+
+    def test_most_frequent_method(self):
+        calls = [("getSlot", []), ("getBalance", ["a"]), ("getBalance", ["b"])]
+        self.assertEqual(async_rpc.batch_method(calls), "getBalance")
+
+    def test_first_method_on_tie(self):
+        self.assertEqual(async_rpc.batch_method([("getTokenSupply", []), ("getSlot", [])]), "getTokenSupply")
+        self.assertIsNone(async_rpc.batch_method([]))
+
+
+class AiohttpTransportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = async_rpc.AsyncRpcClient()
+        self.client._session = FakeSession()
+        self.addCleanup(rpc_client.install_cache, None)
+
+    def test_batch_uses_the_response_cache(self):
+        rpc_client.install_cache(ResponseCache())
+        calls = [("getTokenSupply", ["mint"]), ("getTokenLargestAccounts", ["mint"])]
+
+        first, _ = asyncio.run(self.client.call_batch("http://rpc.invalid", calls))
+        second, _ = asyncio.run(self.client.call_batch("http://rpc.invalid", calls))
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.client._session.posts), 1)
+
+    def test_cassette_goes_through_rpc_client(self):
+        cassette = mock.Mock(replaying=True)
+        rpc_client.install_cassette(cassette)
+        self.addCleanup(rpc_client.install_cassette, None)
+        with mock.patch.object(async_rpc, "call_rpc_batch", return_value=([1], 0.0)) as call_rpc_batch:
+            asyncio.run(self.client.call_batch("http://rpc.invalid", [("getSlot", [])]))
+        call_rpc_batch.assert_called_once()
+        self.assertEqual(self.client._session.posts, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+# test_holder_index.py
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+import holder_table
+from holder_index import HolderIndex, answer_queries, to_raw_amount
+from holder_table import HolderTable
+
+QUERIES = {
+    "above": [Decimal("-1"), Decimal("0.5"), Decimal("4"), Decimal(2 ** 70)],
+    "between": [
+        (Decimal("0.5"), Decimal("5.9")), (Decimal("-3"), Decimal(2 ** 70)), (Decimal("1.2"), Decimal("1.8"))
+    ],
+    "percentiles": [(-10, 50), (90, 120)]
+}
+
+
+class HolderIndexTest(unittest.TestCase):
+
+    def answers(self, numpy):
+        table = HolderTable()
+        for row, amount in enumerate([0, 1, 5, 9, 2 ** 50] * 1000):
+            table.append(f"holder{row}", None, amount)
+        with mock.patch.object(holder_table, "NUMPY_AVAILABLE", numpy):
+            return answer_queries(HolderIndex(table), QUERIES)
+
+    def test_bounds_are_clamped_the_same_with_and_without_numpy(self):
+        vectorized, fallback = self.answers(True), self.answers(False)
+        self.assertEqual(vectorized, fallback)
+        self.assertEqual([answer["holders"] for answer in fallback["above"]], [5000, 4000, 3000, 0])
+        self.assertEqual([answer["holders"] for answer in fallback["between"]], [2000, 5000, 0])
+        self.assertEqual([answer["holders"] for answer in fallback["percentiles"]], [2500, 500])
+
+    def test_bounds_round_towards_whole_raw_amounts(self):
+        self.assertEqual(to_raw_amount("1.239", 2), 123)
+        self.assertEqual(to_raw_amount("-0.5", 0), -1)
+        with self.assertRaises(ValueError):
+            to_raw_amount("nan", 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+# test_holder_table.py
+import unittest
+from unittest import mock
+
+import holder_table
+from holder_table import HolderTable
+
+
+class TopIndicesTest(unittest.TestCase):
+
+    def table(self):
+        table = HolderTable()
+        for row, amount in enumerate([5, 9, 5, 0, 9, 2 ** 64 - 1, 5, 1] * 700):
+            table.append(f"holder{row}", None, amount)
+        return table
+
+    def test_ties_keep_row_order_with_and_without_numpy(self):
+        table = self.table()
+        for n in (None, 1, 3, 700, 1500, 2800, len(table)):
+            with mock.patch.object(holder_table, "NUMPY_AVAILABLE", True):
+                vectorized = table.top_indices(n)
+            with mock.patch.object(holder_table, "NUMPY_AVAILABLE", False):
+                fallback = table.top_indices(n)
+            self.assertEqual(vectorized, fallback)
+            self.assertEqual(len(vectorized), len(table) if n is None else n)
+
+
+if __name__ == "__main__":
+    unittest.main()
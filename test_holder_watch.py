@@ -0,0 +1,116 @@
+# test_holder_watch.py
+import asyncio
+import base64
+import json
+import types
+import unittest
+from unittest import mock
+
+import holder_watch
+from holder_table import HolderTable
+from token_accounts import TOKEN_ACCOUNT_SIZE
+
+
+class Stop(Exception):
+    pass
+
+
+class FakeWebSocket:
+    """Hands out queued messages, idles past one flush, then fails like a dropped connection"""
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.idled = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def send(self, message):
+        pass
+
+    async def recv(self):
+        if not self.messages:
+            if not self.idled:
+                self.idled = True
+                await asyncio.sleep(1)
+            raise OSError("connection dropped")
+        return self.messages.pop(0)
+
+
+def fake_websockets(messages):
+    return types.SimpleNamespace(
+        connect=lambda url, max_size=None: FakeWebSocket(messages), WebSocketException=type("WSE", (Exception,), {})
+    )
+
+
+def notification(address, owner, amount, slot):
+    data = bytes(32) + owner + amount.to_bytes(8, 'little')
+    data += bytes(TOKEN_ACCOUNT_SIZE - len(data))
+    return json.dumps({"method": "programNotification", "params": {"result": {
+        "context": {"slot": slot},
+        "value": {"pubkey": address, "account": {"data": [base64.b64encode(data).decode(), "base64"]}}
+    }}})
+
+
+class HolderWatcherTest(unittest.TestCase):
+
+    def watcher(self, events):
+        return holder_watch.HolderWatcher(["http://rpc.invalid"], "mint", full_scan=True, on_event=events.append)
+
+    def test_full_scan_polls_the_sharded_scan(self):
+        table = HolderTable()
+        table.append("a", b"\x01" * 32, 5)
+        scan = types.SimpleNamespace(to_table=lambda: table, max_slot=42)
+        with mock.patch.object(holder_watch, "scan_all_holders", return_value=scan) as scan_all:
+            self.assertEqual(self.watcher([]).fetch_state(), (table, 42))
+        scan_all.assert_called_once_with(["http://rpc.invalid"], "mint")
+
+    def test_malformed_notifications_are_skipped(self):
+        events = []
+        watcher = self.watcher(events)
+        messages = [
+            json.dumps({"jsonrpc": "2.0", "id": 1, "result": 7}),
+            "not json",
+            json.dumps({"method": "programNotification", "params": {}}),
+            notification("a", b"\x02" * 32, 9, 100)
+        ]
+        with mock.patch.object(holder_watch, "websockets", fake_websockets(messages), create=True), \
+                mock.patch.dict(holder_watch.WATCH_CONFIG, {"flush_interval": 0.01}):
+            with self.assertRaises(OSError):
+                asyncio.run(watcher._subscribe("ws://rpc.invalid"))
+
+        errors = [event for event in events if event["type"] == holder_watch.EVENT_ERROR]
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(watcher.subscription_id, 7)
+        self.assertEqual((watcher.table.addresses, list(watcher.table.amounts), watcher.slot), (["a"], [9], 100))
+
+    def test_backoff_restarts_after_a_confirmed_subscription(self):
+        watcher = self.watcher([])
+        confirmed = iter([False, True, False, False])
+        attempts = []
+
+        async def subscribe(url):
+            if next(confirmed):
+                watcher.subscription_id = 7
+            raise OSError("connection dropped")
+
+        def backoff(attempt):
+            attempts.append(attempt)
+            if len(attempts) == 4:
+                raise Stop()
+            return 0
+
+        with mock.patch.object(holder_watch, "websockets", fake_websockets([]), create=True), \
+                mock.patch.object(holder_watch, "backoff_delay", backoff), \
+                mock.patch.object(watcher, "_subscribe", subscribe), \
+                mock.patch.object(watcher, "poll_once", return_value=[]):
+            with self.assertRaises(Stop):
+                asyncio.run(watcher._run_subscription())
+        self.assertEqual(attempts, [0, 0, 1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# test_program_scan.py
+import unittest
+from unittest import mock
+
+import program_scan
+import retry_policy
+from holder_table import HolderTable
+from rpc_client import RpcError, RpcTimeoutError
+
+
+class ShardSplitTest(unittest.TestCase):
+
+    def scan(self, error, **config):
+        calls = []
+
+        def fail(url, method, params, **kwargs):
+            calls.append(params)
+            raise error
+
+        with mock.patch.object(program_scan, "call_rpc_with_retry", fail), \
+                mock.patch.dict(program_scan.SCAN_CONFIG, dict({"max_shard_bytes": 1, "max_workers": 4}, **config)):
+            scan = program_scan.ShardedHolderScan(["http://rpc.invalid"], "mint")
+            try:
+                scan.run()
+            except RpcError:
+                pass
+        return scan, calls
+
+    def test_fatal_error_makes_one_request(self):
+        scan, calls = self.scan(RpcError({"code": -32602, "message": "Invalid param: could not find mint"}))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(list(scan.failed), [b""])
+
+    def test_timeout_splits_the_shard(self):
+        scan, calls = self.scan(RpcTimeoutError("timed out"))
+        self.assertEqual(len(calls), 1 + 256)
+        self.assertEqual(len(scan.failed), 256)
+
+    def test_root_timeout_splits_without_retrying(self):
+        attempts = []
+
+        def time_out(url, method, params, **kwargs):
+            attempts.append(params)
+            raise RpcTimeoutError("timed out")
+
+        with mock.patch.object(retry_policy, "call_rpc", time_out), \
+                mock.patch.object(retry_policy, "get_rate_limiter", return_value=None), \
+                mock.patch.object(retry_policy, "backoff_delay", return_value=0), \
+                mock.patch.dict(program_scan.SCAN_CONFIG, {"max_shard_bytes": 1, "max_workers": 4}):
+            scan = program_scan.ShardedHolderScan(["http://rpc.invalid"], "mint")
+            scan.run()
+        # One attempt at the root, then the full retry policy on the 256 shards that cannot split further
+        self.assertEqual(len(attempts), 1 + 256 * retry_policy.RETRY_CONFIG["max_attempts"])
+
+    def test_splits_stop_at_max_shards(self):
+        scan, calls = self.scan(RpcTimeoutError("timed out"), max_shard_bytes=2, max_shards=300)
+        self.assertEqual(len(calls), 1 + 256)
+        self.assertEqual(scan.shard_count, 256)
+
+    def test_fatal_error_is_raised(self):
+        error = RpcError({"code": -32602, "message": "Invalid param"})
+        with mock.patch.object(program_scan, "call_rpc_with_retry", side_effect=error):
+            with self.assertRaises(RpcError):
+                program_scan.scan_all_holders(["http://rpc.invalid"], "mint")
+
+
+def shard_table(*rows):
+    table = HolderTable()
+    for address, owner, amount in rows:
+        table.append(address, owner, amount)
+    return table
+
+
+class ShardMergeTest(unittest.TestCase):
+
+    def test_shards_are_concatenated(self):
+        scan = program_scan.ShardedHolderScan(["http://rpc.invalid"], "mint")
+        scan._merge(b"\x01", 10, shard_table(("a", b"\x01" * 32, 5), ("b", b"\x01" * 32, 7)))
+        scan._merge(b"\x02", 11, shard_table(("c", b"\x02" * 32, 9)))
+        table = scan.to_table()
+        self.assertEqual(table.addresses, ["a", "b", "c"])
+        self.assertEqual(list(table.amounts), [5, 7, 9])
+        self.assertEqual(bytes(table.owners), b"\x01" * 64 + b"\x02" * 32)
+
+    def test_newest_slot_wins_when_an_account_changed_owner(self):
+        scan = program_scan.ShardedHolderScan(["http://rpc.invalid"], "mint")
+        scan._merge(b"\x02", 12, shard_table(("a", b"\x02" * 32, 6)))
+        scan._merge(b"\x01", 10, shard_table(("a", b"\x01" * 32, 5), ("b", b"\x01" * 32, 7)))
+        table = scan.to_table()
+        self.assertEqual(table.addresses, ["b", "a"])
+        self.assertEqual(list(table.amounts), [7, 6])
+        self.assertEqual(table.owners[32:], bytearray(b"\x02" * 32))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# test_slot_snapshot.py
+import unittest
+from unittest import mock
+
+import slot_snapshot
+from mock_rpc_server import MockChain, MockRpcError
+
+PIECES = {
+    "supply": ("getTokenSupply", ["mint"]),
+    "mint_account": ("getAccountInfo", ["mint", {"encoding": "jsonParsed"}]),
+    "largest_accounts": ("getTokenLargestAccounts", ["mint"])
+}
+
+
+class FakeNode:
+    """call_rpc_batch stand-in answering each round's calls from a list of slots per method"""
+
+    def __init__(self, rounds):
+        self.rounds = list(rounds)
+        self.batches = []
+
+    def __call__(self, endpoint, calls, timeout=None, use_cache=True):
+        self.batches.append(calls)
+        slots = self.rounds.pop(0)
+        return [{"context": {"slot": slots[method]}, "value": None} for method, _ in calls], 0.01
+
+
+class PinnedSnapshotTest(unittest.TestCase):
+
+    def run_snapshot(self, rounds, **kwargs):
+        node = FakeNode(rounds)
+        with mock.patch.object(slot_snapshot, "call_rpc_batch", node):
+            snapshot = slot_snapshot.PinnedSnapshot("http://rpc.invalid", PIECES, **kwargs).run()
+        return snapshot, node.batches
+
+    def test_min_context_slot_only_on_methods_that_accept_it(self):
+        _, batches = self.run_snapshot([
+            {"getTokenSupply": 100, "getAccountInfo": 105, "getTokenLargestAccounts": 105},
+            {"getTokenSupply": 105}
+        ], min_context_slot=90)
+        configs = {method: params[-1] for method, params in batches[0]}
+        self.assertEqual(configs["getAccountInfo"]["minContextSlot"], 90)
+        self.assertNotIn("minContextSlot", configs["getTokenSupply"])
+        self.assertNotIn("minContextSlot", configs["getTokenLargestAccounts"])
+
+    def test_only_stale_pieces_are_read_again(self):
+        snapshot, batches = self.run_snapshot([
+            {"getTokenSupply": 100, "getAccountInfo": 105, "getTokenLargestAccounts": 105},
+            {"getTokenSupply": 104},
+            {"getTokenSupply": 105}
+        ])
+        self.assertEqual([[method for method, _ in batch] for batch in batches[1:]],
+                         [["getTokenSupply"], ["getTokenSupply"]])
+        self.assertTrue(snapshot.consistent)
+        self.assertEqual((snapshot.pin, snapshot.refetched), (105, 2))
+
+    def test_lagging_piece_is_reported_after_max_rounds(self):
+        with mock.patch.dict(slot_snapshot.SNAPSHOT_CONFIG, {"max_rounds": 1}):
+            snapshot, batches = self.run_snapshot([
+                {"getTokenSupply": 100, "getAccountInfo": 105, "getTokenLargestAccounts": 105},
+                {"getTokenSupply": 101}
+            ], slot_tolerance=2)
+        self.assertEqual(len(batches), 2)
+        self.assertFalse(snapshot.consistent)
+        self.assertEqual(snapshot.summary()["slot_spread"], 4)
+
+
+class MockChainTest(unittest.TestCase):
+
+    def test_token_methods_ignore_min_context_slot(self):
+        chain = MockChain(holders=3, decimals=0, start_slot=1000, seed=1, lag_rate=1.0, lag_slots=3)
+        future = {"minContextSlot": 10 ** 9}
+        with self.assertRaises(MockRpcError):
+            chain.call("getAccountInfo", [chain.mint, dict(future, encoding="jsonParsed")])
+        supply = chain.call("getTokenSupply", [chain.mint, future])
+        self.assertLess(supply["context"]["slot"], 10 ** 9)
+        largest = chain.call("getTokenLargestAccounts", [chain.mint, future])
+        self.assertLess(largest["context"]["slot"], 10 ** 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+# token_accounts.py
+import base64
+
+from holder_table import PUBKEY_LENGTH
+from parallel_decode import decode_holder_slices
+from rpc_decode import iter_keyed_accounts
+
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+
+# SPL Token account layout (165 bytes)
+TOKEN_ACCOUNT_SIZE = 165
+MINT_OFFSET = 0
+OWNER_OFFSET = 32
+AMOUNT_OFFSET = 64
+
+# Only the owner and amount fields are requested from the RPC
+HOLDER_SLICE = {"offset": OWNER_OFFSET, "length": AMOUNT_OFFSET + 8 - OWNER_OFFSET}
+
+
+def build_holder_scan_params(token_mint, commitment="confirmed", extra_filters=None, with_context=False):
+    """Build getProgramAccounts params for all token accounts of a mint"""
+
+    filters = [
+        {"dataSize": TOKEN_ACCOUNT_SIZE},
+        {"memcmp": {"offset": MINT_OFFSET, "bytes": token_mint}}
+    ]
+    if extra_filters:
+        filters.extend(extra_filters)
+
+    config = {
+        "encoding": "base64",
+        "commitment": commitment,
+        "dataSlice": HOLDER_SLICE,
+        "filters": filters
+    }
+    if with_context:
+        config["withContext"] = True
+    return [TOKEN_PROGRAM_ID, config]
+
+
+def decode_token_account(data):
+    """Decode (owner bytes, raw amount) from full base64 token account data"""
+    raw = base64.b64decode(data)
+    if len(raw) < AMOUNT_OFFSET + 8:
+        # Closed account
+        return None, 0
+    return raw[OWNER_OFFSET:OWNER_OFFSET + PUBKEY_LENGTH], int.from_bytes(raw[AMOUNT_OFFSET:AMOUNT_OFFSET + 8], 'little')
+
+
+def decode_program_accounts(accounts, table=None, skip_zero=True):
+    """Decode getProgramAccounts results straight into a HolderTable
+
+    Large results are decoded across the process pool of parallel_decode.
+    """
+
+    pairs = list(iter_keyed_accounts(accounts))
+    addresses = [address for address, _ in pairs]
+    slices = [data for _, data in pairs]
+    return decode_holder_slices(addresses, slices, skip_zero, table)
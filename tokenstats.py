@@ -1,88 +1,29 @@
 # token_stats_enhanced_en.py
-import requests
 import json
-import time
+import sys
 from datetime import datetime
 
-ROACORE_TOKEN_MINT = "5tB5D6DGJMxxHYmNkfJNG237x6pZGEwTzGpUUh62yQJ7"
+from endpoint_health import route_endpoints
+from rpc_benchmark import OUTCOME_OK, default_suite, probe_endpoint
+from rpc_endpoints import ROACORE_TOKEN_MINT, RPC_ENDPOINTS, call_solana_rpc_with_timing
 
 
-def call_solana_rpc_with_timing(endpoint, method, params=None, timeout=60):
-    """Call Solana RPC with response time measurement"""
-
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": method
-    }
-
-    if params:
-        payload["params"] = params
-
-    start_time = time.time()
-
-    try:
-        response = requests.post(endpoint, json=payload, timeout=timeout)
-        end_time = time.time()
-        response_time = end_time - start_time
-
-        print(f"   Response time: {response_time:.2f}s")
-
-        if response.status_code == 200:
-            result = response.json()
-            if 'error' in result:
-                error_details = result['error']
-                raise Exception(f"RPC Error: {error_details}")
-            return result['result'], response_time
-        else:
-            raise Exception(f"HTTP Error: {response.status_code}")
-
-    except requests.exceptions.Timeout:
-        end_time = time.time()
-        response_time = end_time - start_time
-        raise Exception(f"Timeout after {response_time:.2f} seconds")
-    except requests.exceptions.ConnectionError:
-        raise Exception("Connection Error")
-
-
-def test_rpc_capabilities(endpoint):
-    """Test RPC capabilities"""
+def test_rpc_capabilities(endpoint, token_mint=ROACORE_TOKEN_MINT):
+    """Test RPC capabilities with one sample per call of the benchmark suite (see rpc_benchmark)"""
 
     print(f"\n🔍 RPC Capability Test: {endpoint}")
     print("-" * 50)
 
-    tests = [
-        ("getHealth", [], "Basic connection"),
-        ("getVersion", [], "Version info"),
-        ("getSlot", [], "Current slot"),
-        ("getTokenSupply", [ROACORE_TOKEN_MINT], "Token supply"),
-        ("getTokenLargestAccounts", [ROACORE_TOKEN_MINT], "Largest accounts")
-    ]
-
-    results = {}
-
-    for method, params, description in tests:
-        try:
-            print(f"   Testing: {description} ({method})")
-            result, response_time = call_solana_rpc_with_timing(
-                endpoint, method, params, timeout=30
-            )
-            results[method] = {
-                'success': True,
-                'response_time': response_time,
-                'data_size': len(str(result)) if result else 0
-            }
-            print(f"   ✅ Success (Data size: {results[method]['data_size']} bytes)")
-
-        except Exception as e:
-            results[method] = {
-                'success': False,
-                'error': str(e),
-                'response_time': None
-            }
-            print(f"   ❌ Failed: {e}")
-
-    return results
+    suite = default_suite(token_mint)
+    samples = probe_endpoint(endpoint, suite, timeout=30)
+    for name, method, _ in suite:
+        sample = samples[method]
+        print(f"   Testing: {name} ({method})")
+        if sample['outcome'] == OUTCOME_OK:
+            print(f"   ✅ Success ({sample['latency']:.2f}s, data size: {sample['bytes']} bytes)")
+        else:
+            print(f"   ❌ Failed: {sample['outcome']} after {sample['latency']:.2f}s")
+    return samples
 
 
 def get_token_supply_enhanced(endpoint, token_mint):
@@ -127,34 +68,64 @@ def get_token_largest_accounts_enhanced(endpoint, token_mint):
 
         except Exception as e:
             print(f"   ❌ {method['description']} failed: {e}")
-            # Wait before trying next method
-            time.sleep(2)
             continue
 
     raise Exception("All methods failed")
 
 
-def analyze_token_enhanced(token_mint):
+def analyze_token_raced(token_mint, hedge=False):
+    """Race supply + largest accounts across all endpoints, first valid answer wins"""
+
+    from async_rpc import race_rpc_batch
+
+    print(f"\n🏁 Racing {len(RPC_ENDPOINTS)} endpoints...")
+
+    by_url = {endpoint_info["url"]: endpoint_info for endpoint_info in RPC_ENDPOINTS}
+    results, response_time, endpoint = race_rpc_batch(list(by_url), [
+        ("getTokenSupply", [token_mint]),
+        ("getTokenLargestAccounts", [token_mint])
+    ], timeout=60, hedge=hedge)
+    supply_info, largest_accounts = results
+    endpoint_info = by_url[endpoint]
+
+    decimals = supply_info['value']['decimals']
+    total_supply = float(supply_info['value']['amount']) / (10 ** decimals)
+
+    holders = []
+    for account in largest_accounts['value']:
+        balance = float(account['amount']) / (10 ** decimals)
+        holders.append({
+            'address': account['address'],
+            'balance': balance
+        })
+
+    print(f"✅ Winner: {endpoint_info['name']} in {response_time:.2f}s")
+
+    return {
+        'holders': holders,
+        'total_supply': total_supply,
+        'decimals': decimals,
+        'success': True,
+        'endpoint_info': endpoint_info,
+        'performance': {
+            'supply_time': response_time,
+            'accounts_time': response_time,
+            'total_time': response_time
+        }
+    }
+
+
+def analyze_token_enhanced(token_mint, race=False):
     """Enhanced token analysis (with RPC testing)"""
 
-    endpoints = [
-        {
-            "url": "https://api.mainnet-beta.solana.com",
-            "name": "Solana Official RPC",
-            "type": "Public"
-        },
-        {
-            "url": "https://rpc.ankr.com/solana",
-            "name": "Ankr RPC",
-            "type": "Public"
-        },
-        # QuickNode is private info, so commented out
-        # {
-        #     "url": "https://your-quicknode-url.com/",
-        #     "name": "QuickNode",
-        #     "type": "Premium"
-        # }
-    ]
+    if race:
+        try:
+            return analyze_token_raced(token_mint)
+        except Exception as e:
+            print(f"❌ Endpoint race failed, trying endpoints in sequence: {e}")
+
+    # Fastest healthy endpoint first, based on what earlier runs measured
+    endpoints = route_endpoints(RPC_ENDPOINTS, "getTokenLargestAccounts")
 
     for endpoint_info in endpoints:
         endpoint = endpoint_info["url"]
@@ -167,8 +138,8 @@ def analyze_token_enhanced(token_mint):
         capabilities = test_rpc_capabilities(endpoint)
 
         # 2. Attempt token analysis (only if capability test succeeded)
-        if capabilities.get('getTokenSupply', {}).get('success') and \
-                capabilities.get('getTokenLargestAccounts', {}).get('success'):
+        required = ("getTokenSupply", "getTokenLargestAccounts")
+        if all(capabilities[method]['outcome'] == OUTCOME_OK for method in required):
 
             try:
                 print(f"\n📊 Starting token analysis...")
@@ -217,10 +188,6 @@ def analyze_token_enhanced(token_mint):
         else:
             print(f"❌ Required RPC methods not supported")
 
-        # Wait before trying next endpoint
-        print(f"\n⏱️  Waiting 3 seconds before next endpoint...")
-        time.sleep(3)
-
     return {'success': False, 'error': 'All endpoints failed'}
 
 
@@ -229,7 +196,7 @@ if __name__ == "__main__":
     print(f"Token address: {ROACORE_TOKEN_MINT}")
     print(f"Analysis start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
-    result = analyze_token_enhanced(ROACORE_TOKEN_MINT)
+    result = analyze_token_enhanced(ROACORE_TOKEN_MINT, race="--race" in sys.argv)
 
     if result['success']:
         holders = result['holders']
@@ -1,24 +1,70 @@
 # token_stats_advanced_en.py
-import requests
 import json
-import time
 import csv
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
 import argparse
+import contextlib
 import os
+import sys
+import time
 
-ROACORE_TOKEN_MINT = "5tB5D6DGJMxxHYmNkfJNG237x6pZGEwTzGpUUh62yQJ7"
+from endpoint_health import route_endpoints
+from holder_stats import holder_statistics
+from holder_table import HolderTable
+from instrumentation import (
+    enable as enable_instrumentation, is_enabled as instrumentation_enabled, span, timing_breakdown,
+    write_otel_trace, write_prometheus
+)
+from lazy_import import is_loaded
+from rpc_cache import ResponseCache
+from rpc_client import (
+    RPC_CONFIG, RpcError, call_rpc_batch, close_sessions, get_cache, get_cassette, install_cache, install_cassette,
+    unwrap_batch_result
+)
+from rpc_endpoints import ROACORE_TOKEN_MINT, RPC_ENDPOINTS
+from rpc_endpoints import call_solana_rpc_with_timing as call_rpc_with_timing
+
+# getTokenLargestAccounts never returns more than this many accounts
+LARGEST_ACCOUNTS_LIMIT = 20
 
 # Configuration
 CONFIG = {
     "default_timeout": 60,
-    "retry_delay": 3,
     "max_retries": 3,
+    # Overall budget for one call including retries and backoff
+    "call_deadline": 180,
     "output_dir": "output",
-    "enable_logging": True
+    "enable_logging": True,
+    "full_scan_timeout": 300,
+    # Owner-prefix bytes per initial getProgramAccounts shard (0 = try one request first)
+    "scan_shard_bytes": 0,
+    # None (sequential), "race" (all endpoints at once) or "hedge" (p95-delayed)
+    "race_mode": None,
+    # Mints analyzed at the same time in multi-mint mode
+    "mint_concurrency": 4,
+    # Merge token accounts into wallet-level holders by owner
+    "aggregate_owners": False,
+    # Append every analysis to the on-disk snapshot store
+    "store_snapshots": False,
+    # Read supply and holders at one common context slot (see slot_snapshot)
+    "pin_slot": False,
+    # Range, percentile, top-N and rank questions answered over the analyzed holders (see holder_index)
+    "holder_queries": None,
+    # Add the balance histogram, Lorenz curve and inequality indices (see holder_distribution)
+    "distribution": False,
+    # Stream every holder row to this path ({mint} is replaced), "-" or an open stream
+    "stream_export": None,
+    "stream_compression": None,
+    # Largest first once the table is built, or (False) in scan order as each shard arrives
+    "stream_ranked": True
 }
 
 
+class PartialExportError(Exception):
+    """A streamed export failed after rows went out where they cannot be taken back"""
+
+
 def setup_output_directory():
     """Create output directory if it doesn't exist"""
     if not os.path.exists(CONFIG["output_dir"]):
@@ -26,11 +72,18 @@ def setup_output_directory():
         print(f"Created output directory: {CONFIG['output_dir']}")
 
 
+# (second, formatted timestamp) reused by every log line within the same second
+_log_timestamp = (None, "")
+
+
 def log_message(message, log_type="INFO"):
     """Log messages with timestamp"""
+    global _log_timestamp
     if CONFIG["enable_logging"]:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] [{log_type}] {message}")
+        second = int(time.time())
+        if _log_timestamp[0] != second:
+            _log_timestamp = (second, datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S"))
+        print(f"[{_log_timestamp[1]}] [{log_type}] {message}")
 
 
 def call_solana_rpc_with_timing(endpoint, method, params=None, timeout=None):
@@ -38,62 +91,50 @@ def call_solana_rpc_with_timing(endpoint, method, params=None, timeout=None):
 
     if timeout is None:
         timeout = CONFIG["default_timeout"]
+    return call_rpc_with_timing(
+        endpoint, method, params, timeout=timeout, max_attempts=CONFIG["max_retries"],
+        deadline=CONFIG["call_deadline"], log=log_message
+    )
 
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": method
-    }
 
-    if params:
-        payload["params"] = params
+def call_solana_rpc_batch(endpoint, calls, timeout=None):
+    """Send several independent RPC calls in a single batch round trip"""
 
-    for attempt in range(CONFIG["max_retries"]):
-        start_time = time.time()
+    if timeout is None:
+        timeout = CONFIG["default_timeout"]
 
-        try:
-            log_message(f"Calling {method} (attempt {attempt + 1}/{CONFIG['max_retries']})")
-            response = requests.post(endpoint, json=payload, timeout=timeout)
-            end_time = time.time()
-            response_time = end_time - start_time
-
-            print(f"   Response time: {response_time:.2f}s")
-
-            if response.status_code == 200:
-                result = response.json()
-                if 'error' in result:
-                    error_details = result['error']
-                    if attempt < CONFIG["max_retries"] - 1:
-                        log_message(f"RPC Error (retrying): {error_details}", "WARNING")
-                        time.sleep(CONFIG["retry_delay"])
-                        continue
-                    else:
-                        raise Exception(f"RPC Error: {error_details}")
-                return result['result'], response_time
-            else:
-                if attempt < CONFIG["max_retries"] - 1:
-                    log_message(f"HTTP Error {response.status_code} (retrying)", "WARNING")
-                    time.sleep(CONFIG["retry_delay"])
-                    continue
-                else:
-                    raise Exception(f"HTTP Error: {response.status_code}")
-
-        except requests.exceptions.Timeout:
-            end_time = time.time()
-            response_time = end_time - start_time
-            if attempt < CONFIG["max_retries"] - 1:
-                log_message(f"Timeout after {response_time:.2f}s (retrying)", "WARNING")
-                time.sleep(CONFIG["retry_delay"])
-                continue
-            else:
-                raise Exception(f"Timeout after {response_time:.2f} seconds")
-        except requests.exceptions.ConnectionError:
-            if attempt < CONFIG["max_retries"] - 1:
-                log_message("Connection error (retrying)", "WARNING")
-                time.sleep(CONFIG["retry_delay"])
-                continue
-            else:
-                raise Exception("Connection Error")
+    log_message(f"Calling batch: {', '.join(method for method, _ in calls)}")
+    results, response_time = call_rpc_batch(endpoint, calls, timeout=timeout)
+
+    print(f"   Response time: {response_time:.2f}s")
+    return results, response_time
+
+
+def build_token_metadata(token_mint, supply_result, account_result=None):
+    """Build token metadata from getTokenSupply and getAccountInfo results"""
+
+    metadata = {
+        "mint_address": token_mint,
+        "decimals": supply_result['value']['decimals'],
+        "total_supply": int(supply_result['value']['amount']) / (10 ** supply_result['value']['decimals']),
+        "total_supply_raw": int(supply_result['value']['amount']),
+        "timestamp": datetime.now().isoformat()
+    }
+
+    # Try to extract additional info from account data
+    if account_result and 'data' in account_result['value']:
+        account_data = account_result['value']['data']
+        if isinstance(account_data, dict) and 'parsed' in account_data:
+            parsed_data = account_data['parsed']
+            if 'info' in parsed_data:
+                info = parsed_data['info']
+                metadata.update({
+                    "mint_authority": info.get('mintAuthority'),
+                    "freeze_authority": info.get('freezeAuthority'),
+                    "is_initialized": info.get('isInitialized', False)
+                })
+
+    return metadata
 
 
 def get_token_metadata(endpoint, token_mint):
@@ -102,53 +143,176 @@ def get_token_metadata(endpoint, token_mint):
     log_message("Fetching token metadata...")
 
     try:
-        # Get token supply
+        # Token supply and mint account info in one round trip
+        results, batch_time = call_solana_rpc_batch(endpoint, [
+            ("getTokenSupply", [token_mint]),
+            ("getAccountInfo", [token_mint, {"encoding": "jsonParsed"}])
+        ])
+        supply_result = unwrap_batch_result(results[0])
+
+        account_result = None
+        if isinstance(results[1], RpcError):
+            log_message(f"Mint account info unavailable: {results[1]}", "WARNING")
+        else:
+            account_result = results[1]
+
+        metadata = build_token_metadata(token_mint, supply_result, account_result)
+        metadata.update({
+            "supply_query_time": batch_time,
+            "account_query_time": batch_time
+        })
+        return metadata
+
+    except Exception as e:
+        log_message(f"Failed to get complete metadata: {e}", "ERROR")
+        # Return basic metadata
         supply_result, supply_time = call_solana_rpc_with_timing(
             endpoint, "getTokenSupply", [token_mint]
         )
+        metadata = build_token_metadata(token_mint, supply_result)
+        metadata["supply_query_time"] = supply_time
+        return metadata
 
-        # Get account info for additional metadata
-        account_result, account_time = call_solana_rpc_with_timing(
-            endpoint, "getAccountInfo", [token_mint, {"encoding": "jsonParsed"}]
-        )
 
-        metadata = {
-            "mint_address": token_mint,
-            "decimals": supply_result['value']['decimals'],
-            "total_supply": float(supply_result['value']['amount']) / (10 ** supply_result['value']['decimals']),
-            "supply_query_time": supply_time,
-            "account_query_time": account_time,
-            "timestamp": datetime.now().isoformat()
-        }
+def build_snapshot_calls(token_mint):
+    """Batch calls for a metadata + supply + largest accounts + slot snapshot"""
+    return [
+        ("getTokenSupply", [token_mint]),
+        ("getAccountInfo", [token_mint, {"encoding": "jsonParsed"}]),
+        ("getTokenLargestAccounts", [token_mint]),
+        ("getSlot", [])
+    ]
+
+
+def parse_token_snapshot(token_mint, results, response_time):
+    """Turn snapshot batch results into (metadata, largest_accounts)"""
+
+    supply_result, account_result, largest_accounts, slot = [
+        unwrap_batch_result(result) for result in results
+    ]
+
+    metadata = build_token_metadata(token_mint, supply_result, account_result)
+    metadata.update({
+        "slot": slot,
+        "supply_query_time": response_time,
+        "account_query_time": response_time
+    })
+    return metadata, largest_accounts
+
+
+def get_token_snapshot(endpoint, token_mint):
+    """Fetch metadata, supply, largest accounts and current slot in a single batch"""
 
-        # Try to extract additional info from account data
-        if account_result and 'data' in account_result['value']:
-            account_data = account_result['value']['data']
-            if isinstance(account_data, dict) and 'parsed' in account_data:
-                parsed_data = account_data['parsed']
-                if 'info' in parsed_data:
-                    info = parsed_data['info']
-                    metadata.update({
-                        "mint_authority": info.get('mintAuthority'),
-                        "freeze_authority": info.get('freezeAuthority'),
-                        "is_initialized": info.get('isInitialized', False)
-                    })
+    log_message("Fetching batched token snapshot...")
+
+    results, response_time = call_solana_rpc_batch(endpoint, build_snapshot_calls(token_mint))
+    metadata, largest_accounts = parse_token_snapshot(token_mint, results, response_time)
+    return metadata, largest_accounts, response_time
+
+
+def build_pinned_pieces(token_mint):
+    """Named reads of a slot-pinned snapshot; all of them carry a context slot"""
+    return {
+        "supply": ("getTokenSupply", [token_mint]),
+        "mint_account": ("getAccountInfo", [token_mint, {"encoding": "jsonParsed"}]),
+        "largest_accounts": ("getTokenLargestAccounts", [token_mint])
+    }
 
+
+def log_pinned_snapshot(snapshot):
+    low, high = snapshot.slot_range()
+    if not snapshot.consistent:
+        log_message(f"Snapshot pieces still span slots {low}-{high} after {snapshot.rounds} rounds", "WARNING")
+    elif snapshot.refetched:
+        log_message(f"Re-read {snapshot.refetched} piece(s) to pin slot {snapshot.pin}")
+
+
+def get_token_snapshot_pinned(endpoint, token_mint):
+    """Supply, mint account and largest accounts read at one common context slot
+
+    Pieces behind the common slot are re-read until they reach it, so the
+    top-N percentages never mix a supply and balances from different slots,
+    at confirmed commitment instead of finalized.
+    """
+
+    from slot_snapshot import PinnedSnapshot
+
+    log_message("Fetching slot-pinned token snapshot...")
+
+    snapshot = PinnedSnapshot(endpoint, build_pinned_pieces(token_mint), timeout=CONFIG["default_timeout"]).run()
+    print(f"   Response time: {snapshot.response_time:.2f}s")
+    log_pinned_snapshot(snapshot)
+
+    account_result = None
+    try:
+        account_result = snapshot.result("mint_account")
+    except RpcError as e:
+        log_message(f"Mint account info unavailable: {e}", "WARNING")
+
+    metadata = build_token_metadata(token_mint, snapshot.result("supply"), account_result)
+    metadata.update(snapshot.summary())
+    metadata.update({
+        "supply_query_time": snapshot.response_time,
+        "account_query_time": snapshot.response_time
+    })
+    return metadata, snapshot.result("largest_accounts"), snapshot.response_time
+
+
+def pin_supply_to_slot(endpoint, metadata, slot):
+    """Re-read the supply at or after slot (a finished scan's) and record the gap between the two
+
+    getTokenSupply ignores minContextSlot, so the supply is re-read until
+    its context slot reaches the scan's. It cannot be held at that slot
+    either, and the scan is too expensive to re-read, so the slot gap is
+    reported.
+    """
+
+    from slot_snapshot import PinnedSnapshot
+
+    snapshot = PinnedSnapshot(
+        endpoint, {"supply": ("getTokenSupply", [metadata['mint_address']])},
+        timeout=CONFIG["default_timeout"], min_context_slot=slot
+    ).run()
+    try:
+        supply = snapshot.result("supply")['value']
+    except RpcError as e:
+        # The scan is too expensive to throw away; keep the earlier supply and say so
+        log_message(f"Supply could not be re-read at slot {slot}: {e}", "WARNING")
+        metadata.update({"slot_consistent": False, "supply_slot_gap": None, "commitment": snapshot.commitment})
         return metadata
 
-    except Exception as e:
-        log_message(f"Failed to get complete metadata: {e}", "ERROR")
-        # Return basic metadata
-        supply_result, supply_time = call_solana_rpc_with_timing(
-            endpoint, "getTokenSupply", [token_mint]
-        )
-        return {
-            "mint_address": token_mint,
-            "decimals": supply_result['value']['decimals'],
-            "total_supply": float(supply_result['value']['amount']) / (10 ** supply_result['value']['decimals']),
-            "supply_query_time": supply_time,
-            "timestamp": datetime.now().isoformat()
-        }
+    supply_slot = snapshot.slots.get("supply")
+    gap = supply_slot - slot if supply_slot is not None else None
+    metadata.update({
+        "total_supply": int(supply['amount']) / (10 ** supply['decimals']),
+        "total_supply_raw": int(supply['amount']),
+        "supply_slot": supply_slot,
+        "supply_slot_gap": gap,
+        "slot_consistent": gap is not None and abs(gap) <= snapshot.slot_tolerance,
+        "commitment": snapshot.commitment
+    })
+    if not metadata["slot_consistent"]:
+        log_message(f"Supply read at slot {supply_slot}, holders at slot {slot}", "WARNING")
+    return metadata
+
+
+def get_token_snapshot_raced(endpoints, token_mint, hedge=False):
+    """Race the batched snapshot across endpoints and keep the first valid answer"""
+
+    from async_rpc import race_rpc_batch
+
+    mode = "Hedging" if hedge else "Racing"
+    log_message(f"{mode} snapshot across {len(endpoints)} endpoints...")
+
+    by_url = {endpoint_info["url"]: endpoint_info for endpoint_info in endpoints}
+    results, response_time, endpoint = race_rpc_batch(
+        list(by_url), build_snapshot_calls(token_mint), timeout=CONFIG["default_timeout"], hedge=hedge,
+        method="getTokenLargestAccounts"
+    )
+    print(f"   Response time: {response_time:.2f}s ({endpoint})")
+
+    metadata, largest_accounts = parse_token_snapshot(token_mint, results, response_time)
+    return metadata, largest_accounts, response_time, by_url[endpoint]
 
 
 def get_token_holders_comprehensive(endpoint, token_mint, top_n=20):
@@ -183,41 +347,96 @@ def get_token_holders_comprehensive(endpoint, token_mint, top_n=20):
 
         except Exception as e:
             log_message(f"❌ {method['description']} failed: {e}", "WARNING")
-            time.sleep(2)
             continue
 
     raise Exception("All holder query methods failed")
 
 
-def calculate_holder_statistics(holders, total_supply):
-    """Calculate comprehensive holder statistics"""
+def get_all_token_holders(endpoint, token_mint, on_shard=None):
+    """Enumerate every token account of a mint via getProgramAccounts, returns (table, time, method, slot)
 
-    if not holders:
-        return {}
+    on_shard(prefix, slot, table) receives each shard's HolderTable as it finishes.
+    """
 
-    balances = [h['balance'] for h in holders]
+    from program_scan import scan_all_holders
 
-    stats = {
-        "total_holders_analyzed": len(holders),
-        "top_5_balance": sum(balances[:5]),
-        "top_10_balance": sum(balances[:10]) if len(balances) >= 10 else sum(balances),
-        "top_20_balance": sum(balances[:20]) if len(balances) >= 20 else sum(balances),
-        "largest_holder_balance": max(balances) if balances else 0,
-        "smallest_analyzed_balance": min(balances) if balances else 0,
-        "average_balance": sum(balances) / len(balances) if balances else 0,
-        "median_balance": sorted(balances)[len(balances) // 2] if balances else 0
-    }
+    log_message("Enumerating all token accounts via getProgramAccounts...")
+
+    start_time = time.time()
+    scan = scan_all_holders(
+        [endpoint], token_mint, shard_bytes=CONFIG["scan_shard_bytes"], timeout=CONFIG["full_scan_timeout"],
+        on_shard=on_shard
+    )
+    response_time = time.time() - start_time
+
+    table = scan.to_table()
+    log_message(
+        f"✅ Decoded {len(table):,} funded token accounts from {len(scan.completed):,} shard(s) "
+        f"({scan.requests:,} requests) in {response_time:.2f}s"
+    )
+    if scan.min_slot != scan.max_slot:
+        log_message(f"Shards were read between slots {scan.min_slot} and {scan.max_slot}", "WARNING")
+    method_used = "Full enumeration (getProgramAccounts)"
+    if len(scan.completed) > 1:
+        method_used = f"Sharded enumeration ({len(scan.completed)} getProgramAccounts shards)"
+    return table, response_time, method_used, scan.max_slot
+
+
+def export_target(metadata):
+    target = CONFIG["stream_export"]
+    return target.format(mint=metadata['mint_address']) if isinstance(target, str) else target
+
+
+def export_target_name(target):
+    return target if isinstance(target, str) else 'stdout'
+
+
+def export_rewritable(target):
+    """True if a retried export replaces what an earlier attempt wrote (a file opened afresh)"""
+    return isinstance(target, str) and target != "-"
 
-    # Calculate percentages
-    if total_supply > 0:
-        stats.update({
-            "top_5_percentage": (stats["top_5_balance"] / total_supply) * 100,
-            "top_10_percentage": (stats["top_10_balance"] / total_supply) * 100,
-            "top_20_percentage": (stats["top_20_balance"] / total_supply) * 100,
-            "largest_holder_percentage": (stats["largest_holder_balance"] / total_supply) * 100
-        })
 
-    return stats
+def streams_during_scan():
+    """True when --export rows can go out shard by shard instead of after the table is ranked"""
+    return CONFIG["stream_export"] is not None and not CONFIG["stream_ranked"] and not CONFIG["aggregate_owners"]
+
+
+def get_all_token_holders_exported(endpoint, token_mint, metadata):
+    """get_all_token_holders writing each shard's rows to the export as soon as the shard arrives
+
+    Shards cover disjoint owner prefixes and a failed shard yields no rows,
+    so every account is written once. Rows come in scan order, not ranked.
+    If the scan fails, a file export is rewritten by the next endpoint's
+    attempt; rows already sent to stdout or a stream cannot be, so the
+    failure is raised as PartialExportError to stop the endpoint fallback.
+    """
+
+    from holder_export import iter_table_rows, open_export
+
+    target = export_target(metadata)
+    with span("export.stream") as export_span:
+        with open_export(target, metadata['decimals'], compression=CONFIG["stream_compression"]) as writer:
+            try:
+                scanned = get_all_token_holders(
+                    endpoint, token_mint,
+                    on_shard=lambda prefix, slot, table: writer.write(iter_table_rows(table, ranked=False))
+                )
+            except Exception as e:
+                if writer.rows and not export_rewritable(target):
+                    raise PartialExportError(
+                        f"Scan failed after {writer.rows:,} rows were streamed to "
+                        f"{export_target_name(target)}; not retrying on another endpoint: {e}"
+                    ) from e
+                raise
+        export_span.set("rows", writer.rows)
+    log_message(f"Streamed {writer.rows:,} holder rows to {export_target_name(target)} during the scan")
+    return scanned
+
+
+def calculate_holder_statistics(table, metadata):
+    """Calculate comprehensive holder statistics from exact raw amounts"""
+
+    return holder_statistics(table, metadata['total_supply_raw'], metadata['decimals'])
 
 
 def export_to_csv(holders, metadata, stats, filename=None):
@@ -288,88 +507,616 @@ def export_to_json(data, filename=None):
         return None
 
 
-def analyze_token_comprehensive(token_mint, top_n=20, export_csv=False, export_json=False):
+def store_snapshot(metadata, table):
+    """Append the token account table to the mint's snapshot store"""
+
+    from snapshot_store import SnapshotStore
+
+    try:
+        entry = SnapshotStore(metadata['mint_address']).append(
+            table, metadata.get('slot'), metadata['decimals'], metadata['total_supply_raw']
+        )
+        log_message(f"Snapshot stored: {entry['file']} ({entry['holders']:,} accounts)")
+        return entry
+    except (OSError, ValueError) as e:
+        log_message(f"Failed to store snapshot: {e}", "ERROR")
+        return None
+
+
+def print_history(token_mint, days=None, address=None, top_n=20):
+    """Print top-N concentration (or one address's balance) over stored snapshots"""
+
+    from snapshot_store import STORE_CONFIG, SnapshotStore
+
+    days = days or STORE_CONFIG["history_days"]
+    store = SnapshotStore(token_mint)
+    since = datetime.now().timestamp() - days * 86400
+    entries = store.entries(since)
+    if not entries:
+        print(f"\n❌ No stored snapshots for {token_mint} in the last {days} days (run with --store)")
+        return
+
+    if address:
+        print(f"\n📈 Balance history of {address} (last {days} days)")
+        scale = 10 ** entries[-1]['decimals']
+        for slot, timestamp, amount in store.balance_history(address, since):
+            when = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"   {when}  slot {slot}  {amount / scale:,.6f}")
+    else:
+        print(f"\n📈 Top {top_n} concentration (last {days} days)")
+        for slot, timestamp, share in store.concentration_history(top_n, since):
+            when = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"   {when}  slot {slot}  {share:.2f}%")
+
+
+def print_snapshot_diff(token_mint, top_n=20, min_delta=0.0):
+    """Print an NDJSON diff between the two most recent stored snapshots"""
+
+    from holder_diff import diff_tables, diff_to_ndjson
+    from snapshot_store import SnapshotStore
+
+    store = SnapshotStore(token_mint)
+    entries = store.entries()
+    if len(entries) < 2:
+        print(f"\n❌ Need two stored snapshots of {token_mint} to diff (run with --store)")
+        return None
+
+    old_entry, new_entry = entries[-2:]
+    with store.open(old_entry) as old_reader, store.open(new_entry) as new_reader:
+        old_table, new_table = old_reader.to_table(), new_reader.to_table()
+
+    decimals = new_entry['decimals']
+    report = diff_tables(
+        old_table, new_table, total_supply_raw=new_entry['total_supply_raw'], decimals=decimals, top_n=top_n,
+        min_delta=int(min_delta * 10 ** decimals), old_slot=old_entry['slot'], new_slot=new_entry['slot']
+    )
+    print(diff_to_ndjson(report))
+    return report
+
+
+def answer_stored_queries(token_mint, queries):
+    """Answer holder queries from the latest stored snapshot, without any RPC call"""
+
+    from holder_index import HolderIndex, answer_queries
+    from snapshot_store import SnapshotStore
+
+    store = SnapshotStore(token_mint)
+    entry = store.latest()
+    if entry is None:
+        print(f"\n❌ No stored snapshots of {token_mint} to query (run with --store)")
+        return None
+
+    with store.open(entry) as reader:
+        table = reader.to_table()
+    answers = answer_queries(HolderIndex(table), queries, entry['decimals'], entry['total_supply_raw'])
+    when = datetime.fromtimestamp(entry['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+    print(f"\n🔎 Stored snapshot of {when}, slot {entry['slot']} ({len(table):,} holders)")
+    print_query_answers(answers)
+    return answers
+
+
+def finalize_analysis(metadata, table, endpoint_info, method_used, accounts_time, top_n=20,
+                      total_accounts=None, export_csv=False, export_json=False, streamed=False):
+    """Compute statistics, build the result dict and run requested exports
+
+    streamed means the rows already went to the stream export during the scan.
+    """
+
+    if CONFIG["store_snapshots"]:
+        with span("snapshot.store"):
+            store_snapshot(metadata, table)
+
+    owner_details = None
+    if CONFIG["aggregate_owners"]:
+        from owner_resolution import aggregate_holders
+
+        try:
+            log_message("Aggregating token accounts by owner...")
+            with span("owners.aggregate", accounts=len(table)):
+                table, owner_details = aggregate_holders(endpoint_info['url'], table, label_top=top_n)
+            log_message(f"✅ Merged into {len(table):,} owners")
+        except Exception as e:
+            log_message(f"Owner aggregation failed, reporting token accounts: {e}", "WARNING")
+
+    if CONFIG["stream_export"] is not None and not streamed:
+        from holder_export import iter_table_rows, stream_export
+
+        target = export_target(metadata)
+        try:
+            with span("export.stream") as export_span:
+                rows = stream_export(
+                    iter_table_rows(table, ranked=CONFIG["stream_ranked"]), target, metadata['decimals'],
+                    compression=CONFIG["stream_compression"]
+                )
+                export_span.set("rows", rows)
+            log_message(f"Streamed {rows:,} holder rows to {export_target_name(target)}")
+        except (OSError, RuntimeError, ValueError) as e:
+            log_message(f"Failed to stream export: {e}", "ERROR")
+
+    queries = index = None
+    if CONFIG["holder_queries"]:
+        from holder_index import HolderIndex, answer_queries
+
+        with span("holders.index", holders=len(table)):
+            index = HolderIndex(table)
+        queries = answer_queries(index, CONFIG["holder_queries"], metadata['decimals'], metadata['total_supply_raw'])
+
+    distribution = None
+    if CONFIG["distribution"]:
+        from holder_distribution import holder_distribution
+
+        with span("holders.distribution", holders=len(table)):
+            distribution = holder_distribution(
+                table, metadata['total_supply_raw'], metadata['decimals'],
+                ordered=index.ordered if index is not None else None,
+                cumulative=index.cumulative if index is not None else None
+            )
+
+    # Only the reported top N become dicts, statistics run on the whole table
+    with span("holders.process", holders=len(table)):
+        holders = table.to_holders(metadata['decimals'], limit=top_n)
+        if owner_details is not None:
+            for holder in holders:
+                holder.update(owner_details.get(holder['address'], {}))
+    with span("stats"):
+        stats = calculate_holder_statistics(table, metadata)
+
+    # Prepare comprehensive result
+    result = {
+        'success': True,
+        'metadata': metadata,
+        'holders': holders,
+        'statistics': stats,
+        'endpoint_info': endpoint_info,
+        'method_used': method_used,
+        'query_time': accounts_time,
+        'total_accounts': total_accounts,
+        'holder_level': 'owner' if owner_details is not None else 'token_account',
+        'analysis_timestamp': datetime.now().isoformat()
+    }
+    if queries is not None:
+        result['queries'] = queries
+    if distribution is not None:
+        result['distribution'] = distribution
+
+    log_message(f"✅ Analysis completed using {endpoint_info['name']}")
+    log_message(f"Total query time: {accounts_time:.2f}s")
+    log_message(f"Method used: {method_used}")
+
+    if instrumentation_enabled():
+        result['timings'] = timing_breakdown()
+
+    # Export data if requested
+    if export_csv:
+        with span("export.csv"):
+            csv_file = export_to_csv(holders, metadata, stats)
+        result['csv_export'] = csv_file
+
+    if export_json:
+        with span("export.json"):
+            json_file = export_to_json(result)
+        result['json_export'] = json_file
+
+    return result
+
+
+def analyze_token_comprehensive(token_mint, top_n=20, export_csv=False, export_json=False, full_scan=False):
     """Comprehensive token analysis with all features"""
 
-    endpoints = [
-        {
-            "url": "https://api.mainnet-beta.solana.com",
-            "name": "Solana Official RPC",
-            "type": "Public"
-        },
-        {
-            "url": "https://rpc.ankr.com/solana",
-            "name": "Ankr RPC",
-            "type": "Public"
-        }
-        # Add your premium RPC here
-        # {
-        #     "url": "https://your-premium-rpc-url.com/",
-        #     "name": "Premium RPC",
-        #     "type": "Premium"
-        # }
-    ]
+    # getTokenLargestAccounts cannot serve more than 20 holders
+    if top_n > LARGEST_ACCOUNTS_LIMIT and not full_scan:
+        log_message(f"Top {top_n} exceeds getTokenLargestAccounts limit, using full enumeration")
+        full_scan = True
+
+    # Race all endpoints at once instead of waiting out each failure in turn;
+    # pinned re-reads must go to the endpoint that set the pin, so they do not race
+    if CONFIG["race_mode"] and not full_scan and not CONFIG["pin_slot"]:
+        try:
+            with span("holders.fetch", method="getTokenLargestAccounts", race=CONFIG["race_mode"]):
+                metadata, largest_accounts, accounts_time, endpoint_info = get_token_snapshot_raced(
+                    RPC_ENDPOINTS, token_mint, hedge=CONFIG["race_mode"] == "hedge"
+                )
+            with span("holders.decode"):
+                table = HolderTable.from_largest_accounts(largest_accounts)
+            return finalize_analysis(
+                metadata, table, endpoint_info,
+                f"Batched snapshot ({CONFIG['race_mode']})", accounts_time, top_n,
+                export_csv=export_csv, export_json=export_json
+            )
+        except Exception as e:
+            log_message(f"❌ Endpoint race failed, trying endpoints in sequence: {e}", "WARNING")
 
-    for endpoint_info in endpoints:
+    # Fastest healthy endpoint first, based on what earlier runs measured
+    routed_method = "getProgramAccounts" if full_scan else "getTokenLargestAccounts"
+    for endpoint_info in route_endpoints(RPC_ENDPOINTS, routed_method):
         endpoint = endpoint_info["url"]
         log_message(f"Trying: {endpoint_info['name']} ({endpoint_info['type']})")
         log_message(f"URL: {endpoint}")
 
         try:
-            # Get token metadata
-            metadata = get_token_metadata(endpoint, token_mint)
+            total_accounts = None
+            streamed = False
+            if full_scan:
+                # Get token metadata
+                metadata = get_token_metadata(endpoint, token_mint)
+
+                # Enumerate every holder
+                with span("holders.fetch", method="getProgramAccounts"):
+                    if streams_during_scan():
+                        table, accounts_time, method_used, slot = get_all_token_holders_exported(
+                            endpoint, token_mint, metadata
+                        )
+                        streamed = True
+                    else:
+                        table, accounts_time, method_used, slot = get_all_token_holders(endpoint, token_mint)
+                metadata['slot'] = slot
+                if CONFIG["pin_slot"] and slot is not None:
+                    # The scan cannot be re-read cheaply, so the supply follows it instead
+                    pin_supply_to_slot(endpoint, metadata, slot)
+                total_accounts = len(table)
+            else:
+                try:
+                    # Metadata and largest accounts in a single round trip
+                    with span("holders.fetch", method="getTokenLargestAccounts"):
+                        if CONFIG["pin_slot"]:
+                            metadata, largest_accounts, accounts_time = get_token_snapshot_pinned(
+                                endpoint, token_mint
+                            )
+                            method_used = f"Slot-pinned snapshot ({metadata['commitment']})"
+                        else:
+                            metadata, largest_accounts, accounts_time = get_token_snapshot(endpoint, token_mint)
+                            method_used = "Batched snapshot"
+                except Exception as e:
+                    log_message(f"Batched snapshot failed, using separate calls: {e}", "WARNING")
+                    metadata = get_token_metadata(endpoint, token_mint)
+                    largest_accounts, accounts_time, method_used = get_token_holders_comprehensive(
+                        endpoint, token_mint, top_n
+                    )
+                    metadata['slot'] = largest_accounts['context']['slot']
+
+                # Process holder data
+                with span("holders.decode"):
+                    table = HolderTable.from_largest_accounts(largest_accounts)
+
+            return finalize_analysis(
+                metadata, table, endpoint_info, method_used, accounts_time, top_n,
+                total_accounts, export_csv=export_csv, export_json=export_json, streamed=streamed
+            )
+
+        except PartialExportError as e:
+            # Another endpoint would stream the same rows a second time
+            log_message(f"❌ {e}", "ERROR")
+            return {'success': False, 'error': str(e)}
+        except Exception as e:
+            log_message(f"❌ Failed with {endpoint_info['name']}: {e}", "ERROR")
+            continue
+
+    return {'success': False, 'error': 'All endpoints failed'}
+
+
+def load_mints_file(path):
+    """Read mints from a file: one per line, optional label after the address, # comments"""
+
+    mints = []
+    with open(path, encoding='utf-8') as mints_file:
+        for line in mints_file:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            parts = line.replace(',', ' ').split(None, 1)
+            mints.append((parts[0], parts[1].strip() if len(parts) > 1 else None))
+    return mints
+
+
+def analyze_mints(mints, top_n=20, full_scan=False, max_workers=None):
+    """Analyze several mints through a bounded thread pool
+
+    mints is a list of addresses or (address, label) pairs. All workers share
+    the per-endpoint keep-alive sessions, rate limiters, health registry and
+    response cache, so concurrency never exceeds what a single run is allowed
+    to send. Results keep the input order.
+    """
+
+    max_workers = max_workers or CONFIG["mint_concurrency"]
+    # The same mint listed twice is only analyzed once, under its first label
+    labels = {}
+    for mint in mints:
+        address, label = mint if isinstance(mint, tuple) else (mint, None)
+        labels[address] = labels.get(address) or label
+    unique_mints = list(labels)
+
+    def analyze(token_mint):
+        started = time.time()
+        try:
+            result = analyze_token_comprehensive(token_mint, top_n=top_n, full_scan=full_scan)
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        result['elapsed_time'] = time.time() - started
+        return result
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    log_message(f"Analyzing {len(unique_mints)} mints with up to {max_workers} in flight...")
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_mints)) or 1) as executor:
+        by_mint = dict(zip(unique_mints, executor.map(analyze, unique_mints)))
+    total_time = time.time() - start_time
+
+    results = [
+        dict(by_mint[address], mint_address=address, label=labels[address] or address[:8])
+        for address in unique_mints
+    ]
+    success = any(result['success'] for result in results)
+
+    return {
+        'success': success,
+        'error': None if success else 'All mints failed',
+        'results': results,
+        'total_time': total_time,
+        'analysis_timestamp': datetime.now().isoformat()
+    }
+
+
+def export_multi_mint_csv(combined, filename=None):
+    """Export one summary row per mint to a CSV file"""
+
+    if filename is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"{CONFIG['output_dir']}/multi_mint_summary_{timestamp}.csv"
+
+    try:
+        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["# Multi-Mint Token Holder Analysis"])
+            writer.writerow(["# Generated:", combined['analysis_timestamp']])
+            writer.writerow([])
+            writer.writerow([
+                "Label", "Mint", "Total Supply", "Decimals", "Holders Analyzed", "Top 5 %", "Top 10 %",
+                "Largest Holder %", "Gini", "HHI", "Nakamoto", "Provider", "Query Time", "Error"
+            ])
+            for result in combined['results']:
+                if not result['success']:
+                    writer.writerow([result['label'], result['mint_address']] + [""] * 11 + [result['error']])
+                    continue
+                metadata, stats = result['metadata'], result['statistics']
+                writer.writerow([
+                    result['label'],
+                    result['mint_address'],
+                    f"{metadata['total_supply']:.6f}",
+                    metadata['decimals'],
+                    stats.get('total_holders_analyzed', 0),
+                    f"{stats.get('top_5_percentage', 0):.4f}",
+                    f"{stats.get('top_10_percentage', 0):.4f}",
+                    f"{stats.get('largest_holder_percentage', 0):.4f}",
+                    f"{stats.get('gini_coefficient', 0):.6f}",
+                    f"{stats.get('hhi', 0):.2f}",
+                    stats.get('nakamoto_coefficient'),
+                    result['endpoint_info']['name'],
+                    f"{result['query_time']:.2f}",
+                    ""
+                ])
+
+        log_message(f"Data exported to: {filename}")
+        return filename
+
+    except Exception as e:
+        log_message(f"Failed to export CSV: {e}", "ERROR")
+        return None
+
+
+def print_multi_mint_report(combined):
+    """Print one combined report for a multi-mint run"""
+
+    results = combined['results']
+    succeeded = sum(1 for result in results if result['success'])
+
+    print(f"\n🏆 Multi-Mint Analysis Complete ({succeeded}/{len(results)} succeeded)")
+    print("=" * 80)
+    print(f"   Wall time: {combined['total_time']:.2f}s "
+          f"(sum of per-mint times: {sum(result['elapsed_time'] for result in results):.2f}s)")
+
+    for result in results:
+        print(f"\n📊 {result['label']} ({result['mint_address']})")
+        if not result['success']:
+            print(f"   ❌ Failed: {result['error']}")
+            continue
+
+        metadata, stats = result['metadata'], result['statistics']
+        print(f"   Total Supply: {metadata['total_supply']:,.2f} (decimals {metadata['decimals']})")
+        print(f"   Provider: {result['endpoint_info']['name']} via {result['method_used']} "
+              f"in {result['query_time']:.2f}s")
+        if not stats:
+            print("   No funded holders found")
+            continue
+        print(f"   Holders Analyzed: {stats['total_holders_analyzed']:,}")
+        print(f"   Top 5 / Top 10: {stats.get('top_5_percentage', 0):.2f}% / {stats.get('top_10_percentage', 0):.2f}%")
+        print(f"   Largest Holder: {stats.get('largest_holder_percentage', 0):.4f}%")
+        print(f"   Gini: {stats['gini_coefficient']:.4f}  HHI: {stats['hhi']:,.1f}  "
+              f"Nakamoto: {stats['nakamoto_coefficient'] if stats['nakamoto_coefficient'] is not None else '-'}")
 
-            # Get holder information
-            largest_accounts, accounts_time, method_used = get_token_holders_comprehensive(
-                endpoint, token_mint, top_n
+    # Export Information
+    if combined.get('csv_export'):
+        print(f"\n📁 CSV exported to: {combined['csv_export']}")
+    if combined.get('json_export'):
+        print(f"📁 JSON exported to: {combined['json_export']}")
+
+
+def print_watch_event(event, decimals):
+    """Print one holder diff event from watch mode"""
+
+    from holder_diff import (
+        EVENT_DISTRIBUTION, EVENT_ENTERED_TOP, EVENT_ERROR, EVENT_LEFT_TOP, EVENT_RANK_CHANGE, EVENT_SNAPSHOT
+    )
+
+    scale = 10 ** decimals
+    event_type = event['type']
+    if event_type == EVENT_SNAPSHOT:
+        log_message(f"Watching {event['holders']:,} holders at slot {event['slot']}")
+    elif event_type == EVENT_ERROR:
+        log_message(event['error'], "ERROR")
+    elif event_type == EVENT_DISTRIBUTION:
+        if event['holders']:
+            log_message(
+                f"Slot {event['slot']}: {event['holders']:,} holders, Gini {event['gini_coefficient']:.4f}, "
+                f"Theil {event['theil_index']:.4f}, HHI {event['hhi']:,.1f}, "
+                f"Nakamoto {event['nakamoto_coefficient']}", "DIST"
             )
+    elif event_type == EVENT_RANK_CHANGE:
+        old_rank = event['old_rank'] or "-"
+        new_rank = event['new_rank'] or "-"
+        log_message(f"Rank {old_rank} -> {new_rank}: {event['address']}", "DIFF")
+    elif event_type == EVENT_ENTERED_TOP:
+        log_message(f"entered top: {event['address']} (now {event['new_amount'] / scale:,.6f}) "
+                    f"@ slot {event['slot']}", "DIFF")
+    elif event_type == EVENT_LEFT_TOP:
+        log_message(f"left top: {event['address']} (was {event['old_amount'] / scale:,.6f}) "
+                    f"@ slot {event['slot']}", "DIFF")
+    else:
+        delta = (event['new_amount'] - event['old_amount']) / scale
+        log_message(
+            f"{event_type}: {event['address']} {delta:+,.6f} ROA "
+            f"(now {event['new_amount'] / scale:,.6f}) @ slot {event['slot']}", "DIFF"
+        )
 
-            # Process holder data
-            holders = []
-            for account in largest_accounts['value']:
-                balance = float(account['amount']) / (10 ** metadata['decimals'])
-                holders.append({
-                    'address': account['address'],
-                    'balance': balance
-                })
 
-            # Calculate statistics
-            stats = calculate_holder_statistics(holders, metadata['total_supply'])
+def fetch_holder_snapshot(token_mint, full_scan=False):
+    """(metadata, HolderTable) from the first routed endpoint that answers, for service mode"""
+
+    routed_method = "getProgramAccounts" if full_scan else "getTokenLargestAccounts"
+    for endpoint_info in route_endpoints(RPC_ENDPOINTS, routed_method):
+        endpoint = endpoint_info["url"]
+        try:
+            if full_scan:
+                metadata = get_token_metadata(endpoint, token_mint)
+                table, _, _, metadata['slot'] = get_all_token_holders(endpoint, token_mint)
+            else:
+                metadata, largest_accounts, _ = get_token_snapshot(endpoint, token_mint)
+                table = HolderTable.from_largest_accounts(largest_accounts)
+            return metadata, table
+        except Exception as e:
+            log_message(f"❌ Failed with {endpoint_info['name']}: {e}", "ERROR")
+    raise Exception("All endpoints failed")
 
-            # Prepare comprehensive result
-            result = {
-                'success': True,
-                'metadata': metadata,
-                'holders': holders,
-                'statistics': stats,
-                'endpoint_info': endpoint_info,
-                'method_used': method_used,
-                'query_time': accounts_time,
-                'analysis_timestamp': datetime.now().isoformat()
-            }
 
-            log_message(f"✅ Analysis completed using {endpoint_info['name']}")
-            log_message(f"Total query time: {accounts_time:.2f}s")
-            log_message(f"Method used: {method_used}")
+def serve_token_holders(token_mint, full_scan=False, interval=60, host=None, port=None):
+    """Service mode: keep the latest snapshot in memory and serve it over HTTP"""
 
-            # Export data if requested
-            if export_csv:
-                csv_file = export_to_csv(holders, metadata, stats)
-                result['csv_export'] = csv_file
+    from holder_service import run_service
 
-            if export_json:
-                json_file = export_to_json(result)
-                result['json_export'] = json_file
+    # The service is the cache; a TTL cache underneath would only serve refreshes stale data
+    install_cache(None)
 
-            return result
+    def on_event(event):
+        if event['type'] == 'refresh':
+            log_message(f"Snapshot at slot {event['slot']}: {event['holders']:,} holders "
+                        f"in {event['duration']:.2f}s")
+        else:
+            log_message(event['error'], "ERROR")
 
+    def on_listening(address):
+        log_message(f"Serving holder analytics on http://{address[0]}:{address[1]} "
+                    f"(/holders /holder/ADDRESS /stats /distribution /diff /health)")
+
+    run_service(
+        lambda: fetch_holder_snapshot(token_mint, full_scan), host=host, port=port,
+        refresh_interval=interval, on_event=on_event, on_listening=on_listening
+    )
+
+
+def watch_token_holders(token_mint, top_n=20, full_scan=False, interval=60, subscribe=False):
+    """Long-running watch mode: keep holders in memory and print only the changes"""
+
+    from holder_watch import HolderWatcher
+
+    metadata = None
+    for endpoint_info in route_endpoints(RPC_ENDPOINTS, "getTokenSupply"):
+        try:
+            metadata = get_token_metadata(endpoint_info["url"], token_mint)
+            break
         except Exception as e:
             log_message(f"❌ Failed with {endpoint_info['name']}: {e}", "ERROR")
-            log_message("Waiting before trying next endpoint...", "INFO")
-            time.sleep(3)
+    if metadata is None:
+        print_analysis_report({'success': False, 'error': 'All endpoints failed'})
+        return
+
+    watcher = HolderWatcher(
+        RPC_ENDPOINTS, token_mint, full_scan=full_scan, top_n=top_n, interval=interval,
+        on_event=lambda event: print_watch_event(event, metadata['decimals']),
+        distribution=CONFIG["distribution"], decimals=metadata['decimals']
+    )
+    try:
+        watcher.run(subscribe=subscribe)
+    except KeyboardInterrupt:
+        log_message("Watch mode stopped")
+
+
+def print_query_answers(answers):
+    """Print the answers of holder queries (see holder_index.answer_queries)"""
+
+    def share(answer):
+        percentage = answer['percentage']
+        return f"{answer['balance']:,.6f} ROA" + (f" ({percentage:.4f}%)" if percentage is not None else "")
+
+    print(f"\n🔎 Holder Queries")
+    print("-" * 80)
+    for answer in answers.get('above', []):
+        print(f"   Holders above {answer['min_balance']} ROA: {answer['holders']:,} holding {share(answer)}")
+    for answer in answers.get('between', []):
+        print(f"   Holders with {answer['low']}-{answer['high']} ROA: {answer['holders']:,} holding {share(answer)}")
+    for answer in answers.get('percentiles', []):
+        print(f"   Percentiles {answer['low']:g}-{answer['high']:g} (smallest first): "
+              f"{answer['holders']:,} holders holding {share(answer)}")
+    for answer in answers.get('top', []):
+        print(f"   Top {answer['n']:,} holders: {share(answer)}")
+    for answer in answers.get('ranks', []):
+        if answer['rank'] is None:
+            print(f"   {answer['address']}: not among the {answer['of']:,} analyzed holders")
+        else:
+            print(f"   {answer['address']}: rank {answer['rank']:,} of {answer['of']:,}, {share(answer)}")
+
+
+def print_distribution(distribution):
+    """Print the log-scale balance histogram and Lorenz points (see holder_distribution)"""
+
+    if not distribution.get('holders'):
+        return
+    histogram = distribution['histogram']
+    largest = max(histogram['counts'])
+    total = distribution['total_balance']
+
+    def edge(value):
+        return f"{value:,.0f}" if value >= 100 else f"{value:,.6g}"
+
+    print(f"\n📊 Balance Distribution ({distribution['holders']:,} holders)")
+    print("-" * 80)
+    edges = histogram['edges']
+    for low, high, count, balance in zip(edges, edges[1:], histogram['counts'], histogram['balances']):
+        if not count:
             continue
+        bar = "█" * max(1, round(count * 30 / largest))
+        print(f"   {edge(low):>15} - {edge(high):<15} ROA {count:>9,} {balance * 100 / total:7.2f}%  {bar}")
 
-    return {'success': False, 'error': 'All endpoints failed'}
+    lorenz = distribution['lorenz']
+    for bottom in (0.5, 0.9, 0.99):
+        point = next((i for i, holders in enumerate(lorenz['holders']) if holders >= bottom), None)
+        if point is not None:
+            print(f"   Bottom {lorenz['holders'][point] * 100:g}% of holders hold {lorenz['share'][point] * 100:.4f}%")
+    print(f"   Gini: {distribution['gini_coefficient']:.4f}  Theil: {distribution['theil_index']:.4f}  "
+          f"HHI: {distribution['hhi']:,.1f}  Nakamoto: {distribution['nakamoto_coefficient']}")
+
+
+def print_timing_breakdown(breakdown):
+    """Print per-stage timings, slowest total first"""
+
+    print("\n⏱️  Timing Breakdown")
+    print("=" * 80)
+    if not breakdown:
+        print("   No stages recorded")
+        return
+    print(f"   {'stage':<24}{'count':>8}{'total s':>10}{'mean ms':>10}{'max ms':>10}")
+    for name, stats in breakdown.items():
+        print(f"   {name:<24}{stats['count']:>8,}{stats['total']:>10.3f}"
+              f"{stats['mean'] * 1000:>10.1f}{stats['max'] * 1000:>10.1f}")
 
 
 def print_analysis_report(result):
@@ -397,20 +1144,39 @@ def print_analysis_report(result):
     print(f"   Total Supply: {metadata['total_supply']:,.2f} ROA")
     print(f"   Decimals: {metadata['decimals']}")
     print(f"   Analysis Time: {metadata['timestamp']}")
+    if 'supply_slot_gap' in metadata:
+        gap = metadata['supply_slot_gap']
+        if gap is None:
+            state = "⚠️  supply not re-read"
+        else:
+            if metadata['slot_consistent']:
+                state = "supply at the same slot"
+            else:
+                state = f"supply read {abs(gap)} slot(s) {'later' if gap > 0 else 'earlier'}"
+        print(f"   Slot: {metadata['slot']} (holder scan, {state})")
+    elif 'slot_consistent' in metadata:
+        state = "consistent" if metadata['slot_consistent'] else "⚠️  pieces from different slots"
+        print(f"   Slot: {metadata['slot']} (pinned, {state})")
 
     # RPC Information
     print(f"\n🌐 RPC Information")
     print(f"   Provider: {endpoint_info['name']} ({endpoint_info['type']})")
     print(f"   Method Used: {result['method_used']}")
     print(f"   Query Time: {result['query_time']:.2f}s")
+    if result.get('total_accounts') is not None:
+        print(f"   Funded Token Accounts: {result['total_accounts']:,}")
 
     # Top Holders
-    print(f"\n🥇 Top {min(10, len(holders))} Holders")
+    level = "Wallets" if result.get('holder_level') == 'owner' else "Holders"
+    print(f"\n🥇 Top {min(10, len(holders))} {level}")
     print("-" * 80)
     for i, holder in enumerate(holders[:10], 1):
         percentage = (holder['balance'] / metadata['total_supply']) * 100
         print(f"{i:2d}. {holder['address']}")
         print(f"    Balance: {holder['balance']:,.6f} ROA ({percentage:.4f}%)")
+        if holder.get('kind'):
+            name = f" - {holder['name']}" if holder.get('name') else ""
+            print(f"    Owner: {holder['kind']}{name}, {holder['token_accounts']} token account(s)")
         print("-" * 80)
 
     # Statistics
@@ -422,6 +1188,16 @@ def print_analysis_report(result):
         f"   Largest Holder: {stats['largest_holder_balance']:,.6f} ROA ({stats.get('largest_holder_percentage', 0):.4f}%)")
     print(f"   Average Balance: {stats['average_balance']:,.6f} ROA")
     print(f"   Median Balance: {stats['median_balance']:,.6f} ROA")
+    print(f"   Gini Coefficient: {stats['gini_coefficient']:.4f}")
+    print(f"   Theil Index: {stats['theil_index']:.4f}")
+    print(f"   HHI: {stats['hhi']:,.1f}")
+    if stats['nakamoto_coefficient'] is not None:
+        print(f"   Nakamoto Coefficient: {stats['nakamoto_coefficient']} holders control >50% of supply")
+
+    if result.get('queries'):
+        print_query_answers(result['queries'])
+    if result.get('distribution'):
+        print_distribution(result['distribution'])
 
     # Export Information
     if 'csv_export' in result and result['csv_export']:
@@ -430,45 +1206,314 @@ def print_analysis_report(result):
         print(f"📁 JSON exported to: {result['json_export']}")
 
 
-def main():
+def main(argv=None, prog=None):
     """Main function with command line argument support"""
 
-    parser = argparse.ArgumentParser(description='ROA CORE Token Holder Analysis')
+    parser = argparse.ArgumentParser(prog=prog, description='ROA CORE Token Holder Analysis')
     parser.add_argument('--top', type=int, default=20, help='Number of top holders to analyze (default: 20)')
     parser.add_argument('--csv', action='store_true', help='Export results to CSV file')
     parser.add_argument('--json', action='store_true', help='Export results to JSON file')
     parser.add_argument('--quiet', action='store_true', help='Reduce log output')
     parser.add_argument('--timeout', type=int, default=60, help='Request timeout in seconds (default: 60)')
-
-    args = parser.parse_args()
+    parser.add_argument('--pool-size', type=int, default=None,
+                        help='Max keep-alive connections per RPC endpoint (default: 10)')
+    parser.add_argument('--no-compression', action='store_true', help='Disable gzip/brotli response compression')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the RPC response cache')
+    parser.add_argument('--cache-file', default=None,
+                        help='SQLite file to persist cached RPC responses between runs')
+    parser.add_argument('--race', action='store_true',
+                        help='Send the snapshot to all endpoints at once and keep the first valid answer')
+    parser.add_argument('--hedge', action='store_true',
+                        help='Like --race, but only fall over to the next endpoint after its p95 latency')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and print holder changes instead of a one-shot report')
+    parser.add_argument('--interval', type=int, default=60,
+                        help='Watch mode polling / service refresh interval in seconds (default: 60)')
+    parser.add_argument('--serve', action='store_true',
+                        help='Run an HTTP service answering holder queries from an in-memory snapshot')
+    parser.add_argument('--host', default=None, help='Service mode bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=None, help='Service mode port (default: 8080)')
+    parser.add_argument('--subscribe', action='store_true',
+                        help='Watch mode: follow programSubscribe notifications instead of polling')
+    parser.add_argument('--pin-slot', action='store_true',
+                        help='Read supply and holders at one common context slot '
+                             '(with --all: report the supply vs scan slot gap)')
+    parser.add_argument('--all', action='store_true',
+                        help='Enumerate all token accounts via getProgramAccounts (implied by --top > 20)')
+    parser.add_argument('--export', default=None, metavar='PATH',
+                        help='Stream every holder row as NDJSON or CSV (by extension, .gz/.zst compress); '
+                             '"-" writes NDJSON to stdout, {mint} is replaced by the mint address')
+    parser.add_argument('--compress', choices=['gzip', 'zstd'], default=None,
+                        help='Compression for --export when the file name does not imply one')
+    parser.add_argument('--unranked', action='store_true',
+                        help='--export rows in scan order, written as each getProgramAccounts shard arrives '
+                             '(default: largest first after the scan)')
+    parser.add_argument('--shard-bytes', type=int, choices=[0, 1, 2], default=None,
+                        help='Split the full scan into 256^N owner-prefix shards up front (default: only on failure)')
+    parser.add_argument('--by-owner', action='store_true',
+                        help='Merge token accounts per owner wallet and label program-owned/PDA holders')
+    parser.add_argument('--store', action='store_true',
+                        help='Append this run to the snapshot store (output/snapshots)')
+    parser.add_argument('--history', nargs='?', const='', default=None, metavar='ADDRESS',
+                        help='Print top-N concentration, or one address balance, from stored snapshots')
+    parser.add_argument('--diff', action='store_true',
+                        help='Print an NDJSON diff of the two latest stored snapshots (with --store: this run vs the last)')
+    parser.add_argument('--min-delta', type=float, default=0.0,
+                        help='Diff: ignore balance changes smaller than this many tokens')
+    parser.add_argument('--days', type=int, default=None, help='History window in days (default: 30)')
+    parser.add_argument('--above', action='append', type=balance_arg, default=None, metavar='BALANCE',
+                        help='Query: holders with more than BALANCE ROA and their share (repeatable)')
+    parser.add_argument('--between', action='append', nargs=2, type=balance_arg, default=None,
+                        metavar=('LOW', 'HIGH'),
+                        help='Query: holders with LOW to HIGH ROA and their share (repeatable)')
+    parser.add_argument('--percentile-share', action='append', nargs=2, type=float, default=None,
+                        metavar=('LOW', 'HIGH'),
+                        help='Query: share held between two percentiles, smallest holders first, e.g. 1 99')
+    parser.add_argument('--top-sum', action='append', type=int, default=None, metavar='N',
+                        help='Query: balance and share of the N largest holders (repeatable)')
+    parser.add_argument('--rank', action='append', default=None, metavar='ADDRESS',
+                        help='Query: rank and share of one holder address (repeatable)')
+    parser.add_argument('--distribution', action='store_true',
+                        help='Add the log-scale balance histogram, Lorenz curve and Theil/Gini/HHI/Nakamoto '
+                             'indices (every change in watch mode)')
+    parser.add_argument('--from-store', action='store_true',
+                        help='Answer the query flags from the latest stored snapshot instead of fetching')
+    parser.add_argument('--mints', nargs='+', default=None, metavar='MINT',
+                        help='Analyze several mints in one run and print a combined report')
+    parser.add_argument('--mints-file', default=None,
+                        help='File with one mint per line (optional label after the address)')
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help='Mints analyzed at the same time in multi-mint mode (default: 4)')
+
+    parser.add_argument('--record', default=None, metavar='FILE',
+                        help='Record every RPC request/response pair to a cassette file')
+    parser.add_argument('--replay', default=None, metavar='FILE',
+                        help='Answer RPC calls from a recorded cassette instead of the network')
+    parser.add_argument('--replay-latency', type=replay_latency, default=None, metavar='SECONDS',
+                        help='Delay per replayed response: seconds or "recorded" (default: none)')
+
+    parser.add_argument('--timings', action='store_true',
+                        help='Record per-stage timings and print the breakdown after the report')
+    parser.add_argument('--metrics', default=None, metavar='FILE',
+                        help='Write stage timings in Prometheus text format (enables timings)')
+    parser.add_argument('--trace', default=None, metavar='FILE',
+                        help='Write recorded spans as an OpenTelemetry OTLP/JSON trace (enables timings)')
+
+    args = parser.parse_args(argv)
+    if args.export == "-" and (args.mints or args.mints_file):
+        parser.error("--export - cannot interleave several mints on stdout, use a path with {mint}")
+    if args.record and args.replay:
+        parser.error("--record and --replay cannot be combined")
+    queries = holder_queries(args)
+    if args.from_store and not queries:
+        parser.error("--from-store needs at least one query flag (--above, --between, --percentile-share, "
+                     "--top-sum, --rank)")
+    CONFIG["holder_queries"] = queries
+    CONFIG["distribution"] = args.distribution
+
+    # Before any session exists, so connection setup is timed as well
+    if args.timings or args.metrics or args.trace:
+        enable_instrumentation()
 
     # Update configuration
     if args.quiet:
         CONFIG["enable_logging"] = False
     CONFIG["default_timeout"] = args.timeout
+    if args.pool_size is not None:
+        RPC_CONFIG["pool_maxsize"] = args.pool_size
+    if args.no_compression:
+        RPC_CONFIG["compression"] = False
+    # A cassette must see every call, so cached answers would leave holes in a recording
+    if not args.no_cache and not (args.record or args.replay):
+        install_cache(ResponseCache(sqlite_path=args.cache_file))
+    CONFIG["stream_compression"] = args.compress
+    CONFIG["stream_ranked"] = not args.unranked
+    cassette = open_cassette(args)
+    try:
+        if args.export == "-":
+            # Rows own stdout; logs and the report go to stderr
+            CONFIG["stream_export"] = sys.stdout
+            CONFIG["enable_logging"] = False
+            with contextlib.redirect_stdout(sys.stderr):
+                run(args)
+                write_instrumentation(args)
+            return
+        CONFIG["stream_export"] = args.export
+        run(args)
+        write_instrumentation(args)
+    finally:
+        if cassette is not None:
+            cassette.close()
+            install_cassette(None)
+
+
+def balance_arg(value):
+    """Token balance command line value, kept exact"""
+    try:
+        balance = Decimal(value)
+    except InvalidOperation:
+        raise argparse.ArgumentTypeError(f"invalid balance: {value}")
+    if not balance.is_finite():
+        raise argparse.ArgumentTypeError(f"invalid balance: {value}")
+    return balance
+
+
+def holder_queries(args):
+    """Query flags as the dict holder_index.answer_queries takes, or None"""
+
+    queries = {
+        "above": args.above,
+        "between": args.between,
+        "percentiles": args.percentile_share,
+        "top": args.top_sum,
+        "ranks": args.rank
+    }
+    return {name: values for name, values in queries.items() if values} or None
+
+
+def replay_latency(value):
+    """--replay-latency value: "recorded" or seconds"""
+    return value if value == "recorded" else float(value)
+
+
+def open_cassette(args):
+    """Install the record/replay cassette requested on the command line, or None"""
+
+    if not (args.record or args.replay):
+        return None
+    from retry_policy import RETRY_CONFIG
+    from rpc_cassette import Cassette
+
+    if args.replay:
+        cassette = Cassette(args.replay, "replay", latency=args.replay_latency)
+        # Nothing reaches an endpoint, so there is nothing to rate limit
+        RETRY_CONFIG["default_rate"] = None
+        RETRY_CONFIG["endpoint_rates"] = {}
+        log_message(f"Replaying {cassette.records:,} recorded exchanges from {args.replay}")
+    else:
+        cassette = Cassette(args.record, "record")
+        log_message(f"Recording RPC traffic to {args.record}")
+    install_cassette(cassette)
+    return cassette
+
+
+def write_instrumentation(args):
+    """Print and write the timing outputs requested on the command line"""
+
+    if not instrumentation_enabled():
+        return
+    if args.timings:
+        print_timing_breakdown(timing_breakdown())
+    if args.metrics:
+        print(f"📈 Metrics written to: {write_prometheus(args.metrics)}")
+    if args.trace:
+        print(f"🧵 Trace written to: {write_otel_trace(args.trace)}")
+
+
+def close_workers():
+    """Close pooled HTTP sessions and any decode worker processes"""
+
+    close_sessions()
+    # The pool only exists after a large scan; no need to import it otherwise
+    if is_loaded("parallel_decode"):
+        from parallel_decode import shutdown_decode_pool
+        shutdown_decode_pool()
+
+
+def run(args):
+    """Run the analysis mode selected on the command line"""
+
+    if args.shard_bytes is not None:
+        CONFIG["scan_shard_bytes"] = args.shard_bytes
+    if args.by_owner:
+        CONFIG["aggregate_owners"] = True
+    if args.pin_slot:
+        CONFIG["pin_slot"] = True
+    if args.store:
+        CONFIG["store_snapshots"] = True
+    if args.hedge:
+        CONFIG["race_mode"] = "hedge"
+    elif args.race:
+        CONFIG["race_mode"] = "race"
+    if CONFIG["race_mode"] and get_cassette() is not None:
+        # Racing has its own async transport, which a cassette does not see
+        log_message("Endpoint racing is disabled while recording or replaying", "WARNING")
+        CONFIG["race_mode"] = None
 
     # Setup
     setup_output_directory()
 
-    print("ROA CORE Token Comprehensive Analysis")
-    print(f"Token address: {ROACORE_TOKEN_MINT}")
-    print(f"Analysis start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Analyzing top {args.top} holders")
-    if args.csv:
-        print("✓ CSV export enabled")
-    if args.json:
-        print("✓ JSON export enabled")
-
-    # Run analysis
-    result = analyze_token_comprehensive(
-        ROACORE_TOKEN_MINT,
-        top_n=args.top,
-        export_csv=args.csv,
-        export_json=args.json
-    )
+    try:
+        if args.history is not None:
+            print_history(ROACORE_TOKEN_MINT, days=args.days, address=args.history or None, top_n=args.top)
+            return
+
+        if args.from_store:
+            answer_stored_queries(ROACORE_TOKEN_MINT, CONFIG["holder_queries"])
+            return
+
+        if args.diff and not args.store:
+            print_snapshot_diff(ROACORE_TOKEN_MINT, top_n=args.top, min_delta=args.min_delta)
+            return
+
+        if args.serve:
+            serve_token_holders(
+                ROACORE_TOKEN_MINT, full_scan=args.all, interval=args.interval, host=args.host, port=args.port
+            )
+            return
+
+        if args.watch:
+            watch_token_holders(
+                ROACORE_TOKEN_MINT, top_n=args.top, full_scan=args.all or args.top > LARGEST_ACCOUNTS_LIMIT,
+                interval=args.interval, subscribe=args.subscribe
+            )
+            return
+
+        if args.mints or args.mints_file:
+            mints = [(mint, None) for mint in args.mints or []]
+            if args.mints_file:
+                mints.extend(load_mints_file(args.mints_file))
+
+            print("Multi-Mint Token Comprehensive Analysis")
+            print(f"Mints: {len(mints)}")
+            print(f"Analysis start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+            combined = analyze_mints(mints, top_n=args.top, full_scan=args.all, max_workers=args.concurrency)
+            if args.csv:
+                combined['csv_export'] = export_multi_mint_csv(combined)
+            if args.json:
+                combined['json_export'] = export_to_json(combined)
+            print_multi_mint_report(combined)
+        else:
+            print("ROA CORE Token Comprehensive Analysis")
+            print(f"Token address: {ROACORE_TOKEN_MINT}")
+            print(f"Analysis start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            print(f"Analyzing top {args.top} holders")
+            if args.csv:
+                print("✓ CSV export enabled")
+            if args.json:
+                print("✓ JSON export enabled")
+
+            # Run analysis
+            result = analyze_token_comprehensive(
+                ROACORE_TOKEN_MINT,
+                top_n=args.top,
+                export_csv=args.csv,
+                export_json=args.json,
+                full_scan=args.all
+            )
 
-    # Print report
-    print_analysis_report(result)
+            # Print report
+            print_analysis_report(result)
+            if args.diff and result['success']:
+                print_snapshot_diff(ROACORE_TOKEN_MINT, top_n=args.top, min_delta=args.min_delta)
+    finally:
+        # Every mode, including the early returns, releases the cache and worker pool
+        cache = get_cache()
+        if cache is not None:
+            log_message(f"Cache: {cache.stats()}")
+            cache.close()
+        close_workers()
 
 
 if __name__ == "__main__":